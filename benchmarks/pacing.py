@@ -0,0 +1,118 @@
+"""
+Compare how evenly audio is paced under CPU load.
+
+Sends 1 KB chunks of 128 kbps audio to a null sink and records when every chunk is sent. The token bucket pacer is
+compared with sleeping for the duration of every chunk (relative pacing). If python-shout is installed and the STREAM_*
+variables from the .env file point to a server, shout.sync() is measured as well.
+
+Usage:
+    python benchmarks/pacing.py [--seconds 10] [--load-threads 2] [--load-processes 2]
+"""
+import argparse
+import multiprocessing
+import os
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from streaming.pacing import TokenBucketPacer  # noqa: E402
+
+CHUNK = 1024
+BITRATE = 128
+CHUNK_SECONDS = CHUNK * 8 / (BITRATE * 1000)
+
+
+def busy_loop(stop):
+    while not stop.is_set():
+        sum(i * i for i in range(1000))
+
+
+def pace_token_bucket(seconds):
+    pacer = TokenBucketPacer(lead=0.5, burst=0.5)
+    times = []
+    for _ in range(int(seconds / CHUNK_SECONDS)):
+        pacer.pace_bytes(CHUNK, BITRATE)
+        times.append(time.monotonic())
+    return times
+
+
+def pace_relative_sleep(seconds):
+    times = []
+    for _ in range(int(seconds / CHUNK_SECONDS)):
+        times.append(time.monotonic())
+        time.sleep(CHUNK_SECONDS)
+    return times
+
+
+def pace_shout_sync(seconds):
+    import shout
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    connection = shout.Shout()
+    connection.format = "mp3"
+    connection.host = os.getenv("STREAM_HOST")
+    connection.port = int(os.getenv("STREAM_PORT"))
+    connection.password = os.getenv("STREAM_PASSWORD")
+    connection.mount = os.getenv("STREAM_MOUNT_POINT")
+    connection.open()
+
+    silence = bytes([0xFF, 0xFB, 0x90, 0x04]) + bytes(413)
+    buffer = (silence * (CHUNK // len(silence) + 1))[:CHUNK]
+    times = []
+    for _ in range(int(seconds / CHUNK_SECONDS)):
+        connection.sync()
+        connection.send(buffer)
+        times.append(time.monotonic())
+    connection.close()
+    return times
+
+
+def report(name, times):
+    skip = 10
+    intervals = [b - a for a, b in zip(times[skip:], times[skip + 1:])]
+    drift = [(t - times[skip]) - i * CHUNK_SECONDS for i, t in enumerate(times[skip:])]
+    print(f"{name:<16} interval mean {statistics.mean(intervals) * 1000:7.2f} ms  "
+          f"jitter (stdev) {statistics.pstdev(intervals) * 1000:6.2f} ms  "
+          f"max late {max(drift) * 1000:7.2f} ms  final drift {drift[-1] * 1000:7.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--load-threads", type=int, default=2)
+    parser.add_argument("--load-processes", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    stop_threads = threading.Event()
+    stop_processes = multiprocessing.Event()
+    workers = [threading.Thread(target=busy_loop, args=(stop_threads,), daemon=True)
+               for _ in range(args.load_threads)]
+    workers += [multiprocessing.Process(target=busy_loop, args=(stop_processes,), daemon=True)
+                for _ in range(args.load_processes)]
+
+    for worker in workers:
+        worker.start()
+
+    print(f"chunk {CHUNK_SECONDS * 1000:.2f} ms, {args.load_threads} busy threads, "
+          f"{args.load_processes} busy processes")
+
+    try:
+        report("token bucket", pace_token_bucket(args.seconds))
+        report("relative sleep", pace_relative_sleep(args.seconds))
+
+        if os.getenv("STREAM_HOST") or os.path.isfile(".env"):
+            try:
+                report("shout.sync()", pace_shout_sync(args.seconds))
+            except Exception as exception:
+                print("shout.sync()     skipped:", exception)
+    finally:
+        stop_threads.set()
+        stop_processes.set()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Simulate a day of programming on a virtual clock and report the programme, callback timings and memory growth.
+
+The library, jingles and advertisements are empty files, every item gets the default duration of the simulation.
+The callbacks do a little work so their overhead shows up in the timings.
+
+Usage:
+    python benchmarks/simulation.py [--songs 2000] [--hours 24] [--seed 1]
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from streaming import Playlist  # noqa: E402
+from streaming.intake import RequestIntake  # noqa: E402
+from streaming.simulation import SimulatedStream  # noqa: E402
+
+
+def make_playlist(directory: str, prefix: str, count: int) -> Playlist:
+    os.makedirs(directory)
+    for index in range(count):
+        open(os.path.join(directory, f"{prefix}{index:05}.mp3"), "wb").close()
+
+    playlist = Playlist()
+    playlist.from_directory(directory)
+    playlist.set_loop(True)
+    return playlist
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--songs", type=int, default=2000)
+    parser.add_argument("--hours", type=float, default=24)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp()
+    stream = SimulatedStream("sim", root, "", "", "sim", "", "localhost", 8000, "", default_duration=210.0)
+    stream.jingle_or_advertisement_chance = 30
+    stream.set_playlist(make_playlist(os.path.join(root, "music"), "song", args.songs))
+    stream.set_jingles(make_playlist(os.path.join(root, "jingles"), "jingle", 10))
+    stream.set_advertisements(make_playlist(os.path.join(root, "ads"), "ad", 10))
+    stream.set_request_intake(RequestIntake(min_replay_interval=3 * 3600))
+
+    titles = []
+
+    @stream.nextsong()
+    def next_song(song):
+        titles.append(f"{song.get_artist()} - {song.get_song_name()}")
+
+    report = stream.run(args.hours * 3600, seed=args.seed)
+
+    print(f"simulated {report['simulated_seconds'] / 3600:.1f} h in {report['wall_seconds']:.2f} s "
+          f"({report['speedup']:.0f}x)")
+    print("items:", report['items'])
+    print("first items:", [(round(event['started_at']), event['kind'], event['name'])
+                           for event in report['programme'][:5]])
+    print("timings (ms):")
+    for name, timing in sorted(report['timings'].items(), key=lambda item: -item[1]['total_ms']):
+        print(f"  {name:28} n={timing['count']:6} mean={timing['mean_ms']:.3f} max={timing['max_ms']:.3f}")
+
+    memory = report['memory']
+    print(f"memory: start {memory['start'] / 1024:.0f} KiB, end {memory['end'] / 1024:.0f} KiB, "
+          f"growth {memory['growth'] / 1024:.0f} KiB, peak {memory['peak'] / 1024:.0f} KiB")
+    for line in memory['top_growth'][:5]:
+        print("  ", line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Measure the time between a skip and the first byte of the next item.
+
+Streams generated 128 kbps files to a NullOutput with the token bucket pacer and skips at random moments. The
+latency should never exceed one pacing interval, the duration of a single chunk.
+
+Usage:
+    python benchmarks/skip_latency.py [--skips 20] [--chunk-size 8192]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from streaming import Playlist, Stream  # noqa: E402
+from streaming.outputs import NullOutput  # noqa: E402
+from streaming.pacing import TokenBucketPacer  # noqa: E402
+
+# A silent MPEG-1 Layer III frame, 128 kbps, 44.1 kHz, stereo.
+FRAME = bytes([0xFF, 0xFB, 0x90, 0x04]) + bytes(413)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--skips", type=int, default=20)
+    parser.add_argument("--chunk-size", type=int, default=8192)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    for index in range(3):
+        with open(os.path.join(directory, f"song{index}.mp3"), "wb") as fp:
+            fp.write(FRAME * 3000)
+
+    skipped_at = []
+    latencies = []
+
+    def on_send(buffer):
+        if skipped_at:
+            latencies.append(time.monotonic() - skipped_at.pop())
+
+    stream = Stream("bench", directory, "", "", "bench", "", "localhost", 8000, "", output=NullOutput(on_send))
+    stream.chunk_size = args.chunk_size
+    stream.jingle_or_advertisement_chance = 0
+    stream.set_pacer(TokenBucketPacer(lead=0.5, burst=0.5))
+
+    playlist = Playlist()
+    playlist.from_directory(directory)
+    playlist.set_loop(True)
+    stream.set_playlist(playlist)
+
+    thread = threading.Thread(target=stream.start, daemon=True)
+    thread.start()
+
+    interval = args.chunk_size * 8 / 128000
+    for _ in range(args.skips):
+        time.sleep(random.uniform(interval, interval * 3))
+        skipped_at.append(time.monotonic())
+        stream.next_song()
+
+    time.sleep(interval * 2)
+    stream.stop()
+    thread.join()
+
+    print(f"pacing interval {interval * 1000:.1f} ms, {len(latencies)} skips")
+    print(f"skip to first new byte: mean {statistics.mean(latencies) * 1000:.1f} ms, "
+          f"max {max(latencies) * 1000:.1f} ms")
+    print("within one pacing interval:", max(latencies) <= interval)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Measure the time from process start until the first audio byte is sent.
+
+Generates a library of small MP3 files and starts a child process that streams it to a NullOutput, once after loading
+and probing the whole library (the classic startup) and once with load_directory_in_background(). The time includes
+interpreter startup and imports.
+
+Usage:
+    python benchmarks/time_to_first_byte.py [--files 5000] [--runs 3]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+# A silent MPEG-1 Layer III frame, 128 kbps, 44.1 kHz, stereo.
+FRAME = bytes([0xFF, 0xFB, 0x90, 0x04]) + bytes(413)
+
+CHILD = """
+import os, sys
+from streaming import Playlist, Stream
+from streaming.outputs import NullOutput
+
+def on_send(buffer):
+    print("first byte", flush=True)
+    os._exit(0)
+
+stream = Stream("bench", sys.argv[1], "", "", "bench", "", "localhost", 8000, "", output=NullOutput(on_send))
+playlist = Playlist()
+
+if sys.argv[2] == "background":
+    playlist.load_directory_in_background(sys.argv[1])
+else:
+    playlist.from_directory(sys.argv[1])
+    playlist.probe_songs()
+
+stream.set_playlist(playlist)
+stream.start()
+"""
+
+
+def measure(directory: str, mode: str) -> float:
+    start = time.monotonic()
+    subprocess.run([sys.executable, "-c", CHILD, directory, mode], cwd=ROOT, check=True, stdout=subprocess.DEVNULL)
+    return time.monotonic() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=5000)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    for index in range(args.files):
+        with open(os.path.join(directory, f"song{index:06d}.mp3"), "wb") as fp:
+            fp.write(FRAME * 100)
+
+    print(f"{args.files} files")
+    for mode in ("blocking", "background"):
+        times = [measure(directory, mode) for _ in range(args.runs)]
+        print(f"{mode:<12} time to first byte: median {statistics.median(times) * 1000:8.1f} ms  "
+              f"min {min(times) * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+import io
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from .cache import FileCache
+
+logger = logging.getLogger(__name__)
+
+
+class AudioCache:
+    """
+    Keeps the audio of short, frequently played files in memory within a byte budget.
+
+    Pinned files (the jingles and advertisements) are loaded up front and never evicted, even when they alone take more
+    than the budget. Other files are admitted after they were played admit_after times and are evicted least recently
+    used first when the budget is needed. An admitted file is loaded on a background thread, the play that admitted it
+    is read from disk. A cached file is played from memory without opening it. Every check_interval seconds the size
+    and modification time of a cached file are compared on the next play, a changed file is dropped and read from disk
+    again.
+
+    Attributes:
+        budget (int): The maximum number of bytes held in memory.
+        max_item_size (int): Larger files are never cached.
+        admit_after (int): The number of plays after which a file that is not pinned is cached.
+        check_interval (float): The number of seconds between two modification time checks of a cached file.
+        hits (int): The number of plays from memory.
+        misses (int): The number of plays from disk.
+        admissions (int): The number of files added to the cache.
+        evictions (int): The number of files removed to stay within the budget.
+        invalidations (int): The number of files dropped because they changed on disk.
+    """
+
+    def __init__(self, budget: int = 64 * 1024 * 1024, max_item_size: int = 16 * 1024 * 1024, admit_after: int = 2,
+                 check_interval: float = 30.0, max_tracked: int = 10000):
+        self.budget = budget
+        self.max_item_size = max_item_size
+        self.admit_after = admit_after
+        self.check_interval = check_interval
+        self.max_tracked = max_tracked
+
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.pinned = set()
+        self.plays = OrderedDict()
+        self.loading = set()
+        self.loaded = threading.Condition(self.lock)
+        self.size = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.admissions = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def pin(self, playlist) -> None:
+        """
+        Load all songs of a playlist into memory and keep them there.
+
+        Parameters:
+            playlist (Playlist): The playlist to pin, for example the jingles.
+
+        Returns:
+            None
+        """
+        for song in playlist.get_all_songs():
+            file = os.path.abspath(song.get_filename())
+            with self.lock:
+                self.pinned.add(file)
+
+            self._load(file)
+
+    def unpin(self, playlist) -> None:
+        """
+        Allow the songs of a playlist to be evicted again.
+        """
+        with self.lock:
+            for song in playlist.get_all_songs():
+                self.pinned.discard(os.path.abspath(song.get_filename()))
+
+    def open(self, file: str, count: bool = True) -> io.BytesIO or None:
+        """
+        Open a file from memory.
+
+        A file that is admitted by this play is loaded on a background thread, this play reads it from disk.
+
+        Parameters:
+            file (str): The path of the file.
+            count (bool): False for reads that are not plays, like warming up the next playlist. They neither count
+                as a hit or miss nor towards admit_after.
+
+        Returns:
+            io.BytesIO or None: The cached file, or None if the file has to be read from disk.
+        """
+        key = os.path.abspath(file)
+        now = time.monotonic()
+
+        with self.lock:
+            entry = self.entries.get(key)
+            check = entry is not None and now - entry['checked_at'] >= self.check_interval
+
+        # The file is checked without holding the lock, so a slow disk does not hold up other threads.
+        signature = FileCache.signature(key) if check else None
+
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and check:
+                if signature != entry['signature']:
+                    self._remove(key)
+                    self.invalidations += 1
+                    entry = None
+                else:
+                    entry['checked_at'] = now
+
+            if entry is not None:
+                if count:
+                    self.entries.move_to_end(key)
+                    self.hits += 1
+                return io.BytesIO(entry['data'])
+
+            if not count:
+                return None
+
+            self.misses += 1
+            plays = self.plays.pop(key, 0) + 1
+            self.plays[key] = plays
+            if len(self.plays) > self.max_tracked:
+                self.plays.popitem(last=False)
+
+            if (key in self.pinned or plays >= self.admit_after) and key not in self.loading:
+                self.loading.add(key)
+                threading.Thread(target=self._load_in_background, args=(key,), daemon=True).start()
+
+        return None
+
+    def wait_until_loaded(self, timeout: float = None) -> bool:
+        """
+        Wait until the files admitted on a background thread are loaded.
+
+        Parameters:
+            timeout (float): The maximum number of seconds to wait, None waits forever.
+
+        Returns:
+            bool: True if no file is being loaded anymore, False on timeout.
+        """
+        with self.loaded:
+            return self.loaded.wait_for(lambda: not self.loading, timeout)
+
+    def _load_in_background(self, key: str) -> None:
+        try:
+            self._load(key)
+        finally:
+            with self.loaded:
+                self.loading.discard(key)
+                self.loaded.notify_all()
+
+    def _load(self, key: str) -> bytes or None:
+        signature = FileCache.signature(key)
+        if signature is None or signature[0] > self.max_item_size:
+            return None
+
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry['signature'] == signature:
+                return entry['data']
+
+        try:
+            with open(key, "rb") as fp:
+                data = fp.read()
+        except OSError:
+            return None
+
+        with self.lock:
+            if key in self.entries:
+                self._remove(key)
+
+            pinned = key in self.pinned
+            if not self._make_room(len(data), pinned):
+                logger.warning("Audio cache budget of %d bytes is full, %s is not cached", self.budget, key)
+                return data
+
+            if pinned and self.size + len(data) > self.budget:
+                logger.warning("Pinned files exceed the audio cache budget of %d bytes, %s is cached anyway",
+                               self.budget, key)
+
+            self.entries[key] = {'data': data, 'signature': signature, 'checked_at': time.monotonic()}
+            self.size += len(data)
+            self.admissions += 1
+            self.plays.pop(key, None)
+
+        return data
+
+    def _make_room(self, size: int, pinned: bool) -> bool:
+        """
+        Evict unpinned files, least recently used first, until size bytes fit. Called with the lock held.
+
+        A pinned file is always admitted: every unpinned file is evicted if needed and the cache may go over the
+        budget when the pinned files alone do not fit.
+
+        Returns:
+            bool: True if the file can be added, False if it does not fit and is not pinned.
+        """
+        if self.size + size <= self.budget:
+            return True
+
+        evictable = [key for key in self.entries if key not in self.pinned]
+        if not pinned and self.size - sum(len(self.entries[key]['data']) for key in evictable) + size > self.budget:
+            return False
+
+        for key in evictable:
+            if self.size + size <= self.budget:
+                break
+
+            self._remove(key)
+            self.evictions += 1
+
+        return True
+
+    def _remove(self, key: str) -> None:
+        entry = self.entries.pop(key)
+        self.size -= len(entry['data'])
+
+    def clear(self) -> None:
+        """
+        Drop all cached files, pinned files are loaded again on their next play.
+        """
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+    def get_stats(self) -> dict:
+        """
+        Returns the hit and miss counts, the hit rate and the memory use.
+        """
+        with self.lock:
+            plays = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / plays, 4) if plays else 0.0,
+                "admissions": self.admissions,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "items": len(self.entries),
+                "bytes": self.size,
+                "pinned_bytes": sum(len(entry['data']) for key, entry in self.entries.items() if key in self.pinned),
+                "budget": self.budget,
+            }
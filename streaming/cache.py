@@ -0,0 +1,106 @@
+import json
+import os
+import threading
+
+
+class FileCache:
+    """
+    A small persistent cache of per-file results.
+
+    Entries are keyed by path and are only returned as long as the size and modification time of the file match
+    the values recorded when the entry was stored, so edited or replaced files are picked up automatically.
+
+    Attributes:
+        cache_path (str): The JSON file used to persist the cache, None keeps the cache in memory only.
+        entries (dict): The cached entries by absolute file path.
+    """
+
+    def __init__(self, cache_path: str = None):
+        self.cache_path = cache_path
+        self.entries = {}
+        self.lock = threading.Lock()
+        self.is_dirty = False
+
+        if cache_path and os.path.isfile(cache_path):
+            self.load()
+
+    @staticmethod
+    def signature(file: str) -> list or None:
+        """
+        Returns the [size, mtime] signature of a file or None if the file does not exist.
+        """
+        try:
+            stat = os.stat(file)
+        except OSError:
+            return None
+
+        return [stat.st_size, stat.st_mtime_ns]
+
+    def get(self, file: str) -> dict or None:
+        """
+        Get the cached value for a file.
+
+        Parameters:
+            file (str): The path of the file.
+
+        Returns:
+            dict or None: The cached value or None if it is missing or out of date.
+        """
+        key = os.path.abspath(file)
+        with self.lock:
+            entry = self.entries.get(key)
+
+        if entry is None or entry['signature'] != self.signature(file):
+            return None
+
+        return entry['value']
+
+    def set(self, file: str, value: dict) -> None:
+        """
+        Store the value for a file together with its current size and modification time.
+
+        Parameters:
+            file (str): The path of the file.
+            value (dict): A JSON serializable value.
+
+        Returns:
+            None
+        """
+        entry = {'signature': self.signature(file), 'value': value}
+        with self.lock:
+            self.entries[os.path.abspath(file)] = entry
+            self.is_dirty = True
+
+    def load(self) -> None:
+        """
+        Load the cache from disk. A corrupt cache file is ignored and will be overwritten on the next save.
+        """
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as fp:
+                entries = json.load(fp)
+        except (OSError, ValueError):
+            return
+
+        with self.lock:
+            self.entries = entries if isinstance(entries, dict) else {}
+            self.is_dirty = False
+
+    def save(self) -> None:
+        """
+        Write the cache to disk if it changed. The file is replaced atomically.
+        """
+        if not self.cache_path:
+            return
+
+        with self.lock:
+            if not self.is_dirty:
+                return
+
+            data = json.dumps(self.entries)
+            self.is_dirty = False
+
+        temp_path = self.cache_path + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as fp:
+            fp.write(data)
+
+        os.replace(temp_path, self.cache_path)
@@ -0,0 +1,145 @@
+import json
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class Checkpoint:
+    """
+    Periodically persists the playback state of a stream so it can resume after a restart.
+
+    The stream hands over a small state dictionary at every item boundary and only updates the byte offset while
+    sending audio, so checkpointing costs the audio loop a single attribute assignment per chunk. A background
+    thread writes the latest state to disk every interval seconds, the file is replaced atomically so a crash
+    while writing never leaves a corrupt checkpoint behind.
+
+    Attributes:
+        path (str): The file the checkpoint is written to.
+        interval (float): The number of seconds between writes.
+        offset (int): The byte offset within the item that is currently being streamed.
+    """
+
+    def __init__(self, path: str, interval: float = 5.0):
+        self.path = path
+        self.interval = interval
+        self.offset = 0
+        self.state = None
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.last_written = None
+
+    def update(self, state: dict) -> None:
+        """
+        Set the state at an item boundary and reset the byte offset.
+
+        Parameters:
+            state (dict): A JSON serializable description of the playback position.
+
+        Returns:
+            None
+        """
+        with self.lock:
+            self.state = state
+            self.offset = 0
+
+    def set_offset(self, offset: int) -> None:
+        """
+        Set the byte offset within the current item.
+
+        Parameters:
+            offset (int): The number of bytes of the current item that have been sent.
+
+        Returns:
+            None
+        """
+        self.offset = offset
+
+    def snapshot(self) -> dict or None:
+        """
+        Returns the latest state including the current byte offset or None if there is no state yet.
+        """
+        with self.lock:
+            if self.state is None:
+                return None
+
+            return dict(self.state, offset=self.offset)
+
+    def save(self) -> None:
+        """
+        Write the latest state to disk if it changed since the last write.
+        """
+        state = self.snapshot()
+        if state is None or state == self.last_written:
+            return
+
+        temp_path = self.path + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as fp:
+            json.dump(state, fp)
+            fp.flush()
+            os.fsync(fp.fileno())
+
+        os.replace(temp_path, self.path)
+        self.last_written = state
+
+    def load(self) -> dict or None:
+        """
+        Read the checkpoint from disk.
+
+        Returns:
+            dict or None: The stored state or None if there is no (valid) checkpoint.
+        """
+        try:
+            with open(self.path, 'r', encoding='utf-8') as fp:
+                state = json.load(fp)
+        except (OSError, ValueError):
+            return None
+
+        return state if isinstance(state, dict) else None
+
+    def clear(self) -> None:
+        """
+        Remove the checkpoint from disk and forget the current state.
+        """
+        with self.lock:
+            self.state = None
+            self.offset = 0
+
+        self.last_written = None
+        if os.path.isfile(self.path):
+            os.remove(self.path)
+
+    def start(self) -> None:
+        """
+        Start writing the checkpoint in the background.
+        """
+        if self.thread and self.thread.is_alive():
+            return
+
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self) -> None:
+        """
+        Stop the background writer and write the final state. A failing write is logged, not raised, so the
+        stream can always shut down.
+        """
+        self.stop_event.set()
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join()
+
+        self.thread = None
+        self._save_logged()
+
+    def run(self) -> None:
+        while not self.stop_event.wait(self.interval):
+            self._save_logged()
+
+    def _save_logged(self) -> None:
+        try:
+            self.save()
+        except OSError as error:
+            logger.warning("Can't write the checkpoint to %s: %s", self.path, error)
@@ -0,0 +1,281 @@
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl
+
+from .intake import RequestRejected
+from .song import OGG_EXTENSIONS, Song
+
+
+class ControlServer:
+    """
+    A small HTTP control API for a running stream, listening on localhost only by default.
+
+    Routes:
+        GET  /status   The current item, its kind, whether the stream is playing and, when used, the underruns and
+                       the audio cache statistics.
+        GET  /queue    The requests waiting to be played.
+        GET  /upcoming The next items, ?count=N for more than 5 (at most 50).
+        GET  /recent   The songs that played most recently, requires a PlayHistory on the stream.
+        POST /skip     Skip the current item.
+        POST /stop     Stop the stream.
+        POST /enqueue  Request a song, the body is a JSON object with file and optionally name, artist and
+                       requested_by. Only audio files in the music directory of the stream or in the current
+                       playlist can be requested.
+        GET  /trace    The recorded spans as a Chrome trace, ?format=otlp for OTLP/JSON. Requires a Tracer.
+        POST /profiler/start  Start sampling the audio thread, the body may hold the interval in seconds.
+        POST /profiler/stop   Stop sampling and return the functions seen most often.
+
+    POST requests need a Content-Type of application/json, so a web page can't send them with a simple cross-origin
+    request. Skips and stops set the events of the stream, which interrupt the pacer right away instead of waiting for
+    the audio loop to poll a flag.
+
+    Attributes:
+        stream (Stream): The stream to control.
+        host (str): The address to listen on.
+        port (int): The port to listen on, 0 picks a free port.
+    """
+
+    def __init__(self, stream, host: str = "127.0.0.1", port: int = 8765):
+        self.stream = stream
+        self.host = host
+        self.port = port
+        self.server = None
+        self.thread = None
+
+    def status(self) -> dict:
+        """
+        Returns the status of the stream.
+        """
+        song = self.stream.get_current_song()
+        status = {
+            "playing": self.stream.has_started,
+            "kind": self.stream.current_kind,
+            "current": song.to_dict() if song else None,
+        }
+
+        if self.stream.watchdog:
+            status["underruns"] = self.stream.watchdog.get_stats()
+
+        if self.stream.audio_cache:
+            status["audio_cache"] = self.stream.audio_cache.get_stats()
+
+        return status
+
+    def queue(self) -> list[dict]:
+        """
+        Returns the requests waiting to be played.
+        """
+        if self.stream.request_intake:
+            songs = self.stream.request_intake.get_queue()
+        elif self.stream.current_playlist:
+            songs = self.stream.current_playlist.get_requested_songs()
+        else:
+            songs = []
+
+        return [song.to_dict() for song in songs]
+
+    def upcoming(self, count: int or str = 5) -> list[dict]:
+        """
+        Returns the items that will play next, see Stream.get_upcoming(). More than MAX_UPCOMING items are not
+        looked up.
+
+        Raises:
+            ValueError: If count is not a positive whole number.
+        """
+        if isinstance(count, str) and count.isdigit():
+            count = int(count)
+
+        if isinstance(count, bool) or not isinstance(count, int) or count < 1:
+            raise ValueError("count must be a positive whole number.")
+
+        return [dict(song.to_dict(), kind=kind) for kind, song in self.stream.get_upcoming(count)]
+
+    def recent(self) -> list[dict]:
+        """
+        Returns the songs that played most recently, newest first.
+        """
+        if self.stream.history is None:
+            return []
+
+        return self.stream.history.get_recent()
+
+    def skip(self) -> dict:
+        self.stream.next_song()
+        return {"ok": True}
+
+    def stop_stream(self) -> dict:
+        self.stream.stop()
+        return {"ok": True}
+
+    def enqueue(self, data: dict) -> dict:
+        """
+        Request a song through the request intake of the stream, or directly on the playlist without one.
+
+        Raises:
+            RequestRejected: If the request intake rejects the song.
+            ValueError: If no file was given, or the file is not a song of the library that can be streamed.
+        """
+        if not isinstance(data, dict) or not data.get("file"):
+            raise ValueError("Missing file.")
+
+        song = Song.from_dict(dict(data, file=self._resolve_file(str(data["file"]))))
+        if not self.stream.is_playable(song):
+            raise ValueError(f"{data['file']} can't be streamed.")
+
+        if self.stream.request_intake:
+            self.stream.request_intake.request(song)
+        elif self.stream.current_playlist:
+            self.stream.current_playlist.add_song_and_play_next(song, remove_after=True)
+        else:
+            raise RequestRejected("There is no playlist.")
+
+        return {"ok": True}
+
+    def _resolve_file(self, file: str) -> str:
+        """
+        Returns the path of a requested file within the music directory of the stream or the current playlist, so
+        the API can't be used to send other files to the listeners.
+
+        Raises:
+            ValueError: If the file is not an audio file of the library or does not exist.
+        """
+        if os.path.splitext(file)[1].lower() not in (".mp3",) + OGG_EXTENSIONS:
+            raise ValueError(f"{file} is not an audio file.")
+
+        if self.stream.music_directory:
+            root = os.path.realpath(self.stream.music_directory)
+            path = os.path.realpath(os.path.join(root, file))
+            if os.path.commonpath([root, path]) == root and os.path.isfile(path):
+                return path
+
+        playlist = self.stream.current_playlist
+        if playlist:
+            path = os.path.abspath(file)
+            for song in playlist.get_all_songs():
+                if os.path.abspath(song.get_filename()) == path and os.path.isfile(path):
+                    return song.get_filename()
+
+        raise ValueError(f"{file} is not part of the library.")
+
+    def trace(self, trace_format: str = "chrome") -> dict:
+        """
+        Returns the spans recorded by the tracer of the stream.
+
+        Raises:
+            ValueError: If the stream has no tracer or the format is unknown.
+        """
+        if self.stream.tracer is None:
+            raise ValueError("Tracing is off.")
+
+        if trace_format == "chrome":
+            return self.stream.tracer.to_chrome_trace()
+        if trace_format == "otlp":
+            return self.stream.tracer.to_otlp()
+
+        raise ValueError(f"Unknown trace format {trace_format}.")
+
+    def start_profiler(self, data: dict) -> dict:
+        """
+        Start the sampling profiler of the stream.
+
+        Raises:
+            RequestRejected: If the stream is not running.
+            ValueError: If the interval is not a number or too short, see Stream.start_profiler().
+        """
+        try:
+            interval = float(data.get("interval", 0.005) if isinstance(data, dict) else data)
+        except (TypeError, ValueError):
+            raise ValueError("The interval has to be a number of seconds.")
+
+        try:
+            self.stream.start_profiler(interval)
+        except RuntimeError as error:
+            raise RequestRejected(str(error))
+
+        return {"ok": True}
+
+    def stop_profiler(self) -> dict:
+        """
+        Stop the sampling profiler and return the functions that were seen most often.
+        """
+        profiler = self.stream.stop_profiler()
+        if profiler is None:
+            return {"samples": 0, "top": []}
+
+        return {"samples": profiler.sample_count, "top": profiler.get_top()}
+
+    def start(self) -> None:
+        """
+        Start serving in a background thread.
+        """
+        control = self
+
+        class Handler(BaseHTTPRequestHandler):
+            routes = {
+                ("GET", "/status"): lambda data: control.status(),
+                ("GET", "/queue"): lambda data: control.queue(),
+                ("GET", "/upcoming"): lambda data: control.upcoming(data.get("count", 5)),
+                ("GET", "/recent"): lambda data: control.recent(),
+                ("POST", "/skip"): lambda data: control.skip(),
+                ("POST", "/stop"): lambda data: control.stop_stream(),
+                ("POST", "/enqueue"): lambda data: control.enqueue(data),
+                ("GET", "/trace"): lambda data: control.trace(data.get("format", "chrome")),
+                ("POST", "/profiler/start"): lambda data: control.start_profiler(data),
+                ("POST", "/profiler/stop"): lambda data: control.stop_profiler(),
+            }
+
+            def handle_route(self, method: str) -> None:
+                path, _, query = self.path.partition("?")
+                route = self.routes.get((method, path))
+                if route is None:
+                    self.respond(404, {"error": "Not found."})
+                    return
+
+                if method == "POST" and self.headers.get_content_type() != "application/json":
+                    self.respond(415, {"error": "Expected application/json."})
+                    return
+
+                try:
+                    length = int(self.headers.get("Content-Length") or 0)
+                    data = json.loads(self.rfile.read(length)) if length else {}
+                    if query and isinstance(data, dict):
+                        data.update(parse_qsl(query))
+                    self.respond(200, route(data))
+                except RequestRejected as rejected:
+                    self.respond(409, {"error": rejected.reason})
+                except ValueError as error:
+                    self.respond(400, {"error": str(error)})
+
+            def respond(self, code: int, body) -> None:
+                payload = json.dumps(body).encode("utf-8")
+                self.send_response(code)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_GET(self):
+                self.handle_route("GET")
+
+            def do_POST(self):
+                self.handle_route("POST")
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def stop(self) -> None:
+        """
+        Stop serving.
+        """
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
@@ -0,0 +1,204 @@
+import json
+import logging
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+
+from .song import Song
+
+logger = logging.getLogger(__name__)
+
+
+class PlayHistory:
+    """
+    A fixed size ring buffer of the items that aired.
+
+    Memory use is bounded by the capacity: the per track and per artist "last played" indexes only hold entries for
+    events that are still in the buffer. Lookups are O(1). Finished events can be appended to a JSON lines file for
+    royalty reporting, the file is only ever appended to. The file is written by a background thread so the audio
+    thread never waits for the disk, use flush() to wait for the events written so far.
+
+    Attributes:
+        capacity (int): The number of events kept in memory.
+        export_path (str or None): The file finished events are appended to.
+        clock (callable): Returns the current time in seconds since the epoch.
+    """
+
+    def __init__(self, capacity: int = 1000, export_path: str = None, clock=time.time):
+        self.capacity = capacity
+        self.export_path = export_path
+        self.clock = clock
+        self.lock = threading.Lock()
+
+        self.songs = [None] * capacity
+        self.kinds = [None] * capacity
+        self.started_at = [0.0] * capacity
+        self.played = [0.0] * capacity
+        self.skipped = [False] * capacity
+        self.sequence = 0
+
+        self.last_by_file = {}
+        self.last_by_artist = {}
+
+        self.export_queue = deque()
+        self.export_condition = threading.Condition()
+        self.export_thread = None
+
+    def record(self, song: Song, kind: str = "song") -> int:
+        """
+        Record that an item started playing.
+
+        Parameters:
+            song (Song): The item that started playing.
+            kind (str, optional): The kind of item (song, announcement, jingle or advertisement).
+
+        Returns:
+            int: The sequence number of the event, to be passed to finish().
+        """
+        now = self.clock()
+
+        with self.lock:
+            sequence = self.sequence
+            slot = sequence % self.capacity
+
+            evicted = self.songs[slot]
+            if evicted is not None:
+                evicted_sequence = sequence - self.capacity
+                if self.last_by_file.get(evicted.get_filename(), (None,))[0] == evicted_sequence:
+                    del self.last_by_file[evicted.get_filename()]
+                if self.last_by_artist.get(evicted.get_artist(), (None,))[0] == evicted_sequence:
+                    del self.last_by_artist[evicted.get_artist()]
+
+            self.songs[slot] = song
+            self.kinds[slot] = kind
+            self.started_at[slot] = now
+            self.played[slot] = 0.0
+            self.skipped[slot] = False
+            self.sequence += 1
+
+            self.last_by_file[song.get_filename()] = (sequence, now)
+            if song.get_artist():
+                self.last_by_artist[song.get_artist()] = (sequence, now)
+
+        return sequence
+
+    def finish(self, sequence: int, skipped: bool = False) -> None:
+        """
+        Record that an item stopped playing and append it to the export file.
+
+        Parameters:
+            sequence (int): The sequence number returned by record().
+            skipped (bool, optional): True if the item was skipped before its end.
+
+        Returns:
+            None
+        """
+        with self.lock:
+            if sequence < self.sequence - self.capacity or sequence >= self.sequence:
+                return
+
+            slot = sequence % self.capacity
+            self.played[slot] = max(self.clock() - self.started_at[slot], 0.0)
+            self.skipped[slot] = skipped
+            event = self._event(slot)
+
+        if self.export_path:
+            with self.export_condition:
+                self.export_queue.append(event)
+                self.export_condition.notify()
+
+                if self.export_thread is None:
+                    self.export_thread = threading.Thread(target=self._export, daemon=True)
+                    self.export_thread.start()
+
+    def _export(self) -> None:
+        while True:
+            with self.export_condition:
+                self.export_condition.wait_for(lambda: self.export_queue)
+                # The events stay queued until they are written, so flush() waits for the write.
+                events = list(self.export_queue)
+
+            try:
+                with open(self.export_path, "a", encoding="utf-8") as fp:
+                    fp.write("".join(json.dumps(event) + "\n" for event in events))
+            except OSError as error:
+                logger.warning("Can't append %d events to %s: %s", len(events), self.export_path, error)
+
+            with self.export_condition:
+                for _ in events:
+                    self.export_queue.popleft()
+                self.export_condition.notify_all()
+
+    def flush(self, timeout: float = None) -> bool:
+        """
+        Wait until the finished events are appended to the export file.
+
+        Parameters:
+            timeout (float, optional): The maximum number of seconds to wait.
+
+        Returns:
+            bool: True if all events are written, False if the timeout expired.
+        """
+        with self.export_condition:
+            return self.export_condition.wait_for(lambda: not self.export_queue, timeout)
+
+    def _event(self, slot: int) -> dict:
+        song = self.songs[slot]
+        return {
+            "time": datetime.fromtimestamp(self.started_at[slot], timezone.utc).isoformat(),
+            "started_at": self.started_at[slot],
+            "kind": self.kinds[slot],
+            "file": song.get_filename(),
+            "name": song.get_song_name(),
+            "artist": song.get_artist(),
+            "requested_by": song.get_requested_by(),
+            "played": round(self.played[slot], 3),
+            "skipped": self.skipped[slot],
+        }
+
+    def last_played_at(self, file: str) -> float or None:
+        """
+        Returns when the given file last started playing, or None if it is not in the history.
+        """
+        entry = self.last_by_file.get(file)
+        return entry[1] if entry else None
+
+    def artist_last_played_at(self, artist: str) -> float or None:
+        """
+        Returns when a song by the given artist last started playing, or None if it is not in the history.
+        """
+        entry = self.last_by_artist.get(artist)
+        return entry[1] if entry else None
+
+    def played_within(self, file: str, seconds: float) -> bool:
+        """
+        Check if the given file started playing within the last `seconds` seconds.
+        """
+        played_at = self.last_played_at(file)
+        return played_at is not None and self.clock() - played_at < seconds
+
+    def get_recent(self, count: int = 10, kinds: tuple = ("song",)) -> list[dict]:
+        """
+        Returns the most recent events, newest first.
+
+        Parameters:
+            count (int, optional): The maximum number of events to return.
+            kinds (tuple, optional): The kinds of items to include, None includes all kinds.
+
+        Returns:
+            list[dict]: The events.
+        """
+        events = []
+        with self.lock:
+            sequence = self.sequence - 1
+            while sequence >= max(self.sequence - self.capacity, 0) and len(events) < count:
+                slot = sequence % self.capacity
+                if kinds is None or self.kinds[slot] in kinds:
+                    events.append(self._event(slot))
+                sequence -= 1
+
+        return events
+
+    def __len__(self) -> int:
+        return min(self.sequence, self.capacity)
@@ -0,0 +1,198 @@
+import os
+import threading
+import time
+from collections import deque
+
+from .song import Song
+
+
+class RequestRejected(Exception):
+    """
+    Raised when a request or skip is not accepted.
+
+    Attributes:
+        reason (str): A short, human-readable reason that can be relayed to the listener.
+    """
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class RequestIntake:
+    """
+    Accepts song requests and skips from other threads (for example a chat bot) and hands them to the stream.
+
+    Submissions only take a short lock and are collected in a batch. The stream thread takes the whole batch at the
+    next song boundary and adds it to the playlist, so the audio loop is never blocked by a submission. Rate limits and
+    duplicate suppression are applied when a request is submitted.
+
+    Attributes:
+        rate_limit (int): The number of requests and skips a single user may submit within rate_window.
+        rate_window (float): The length of the rate limit window in seconds.
+        max_queue (int): The maximum number of requests waiting to be played.
+        remove_after (bool): Whether requested songs are removed from the playlist after playing.
+        min_replay_interval (float): Reject songs that started playing less than this many seconds ago. Requires a
+            PlayHistory on the stream.
+        min_artist_interval (float): Reject songs by an artist that played less than this many seconds ago.
+        stream (Stream): The stream the requests are for, set by Stream.set_request_intake().
+    """
+
+    def __init__(self, rate_limit: int = 3, rate_window: float = 600.0, max_queue: int = 50,
+                 remove_after: bool = True, min_replay_interval: float = 0.0, min_artist_interval: float = 0.0):
+        self.rate_limit = rate_limit
+        self.rate_window = rate_window
+        self.max_queue = max_queue
+        self.remove_after = remove_after
+        self.min_replay_interval = min_replay_interval
+        self.min_artist_interval = min_artist_interval
+        self.stream = None
+
+        self.lock = threading.Lock()
+        self.pending = []
+        self.user_submissions = {}
+
+    def _check_rate_limit(self, requested_by: str, now: float) -> None:
+        submissions = self.user_submissions.setdefault(requested_by, deque())
+        while submissions and submissions[0] <= now - self.rate_window:
+            submissions.popleft()
+
+        if len(submissions) >= self.rate_limit:
+            retry_after = int(submissions[0] + self.rate_window - now) + 1
+            raise RequestRejected(f"Too many requests, try again in {retry_after} seconds.")
+
+        submissions.append(now)
+
+    def _get_playlist_queue(self) -> list[Song]:
+        """
+        Returns the requests the playlist of the stream already took over, without the one that is playing.
+        """
+        if not self.stream or not self.stream.current_playlist:
+            return []
+
+        playlist = self.stream.current_playlist
+        with playlist.lock:
+            queue = playlist.get_requested_songs()
+            if playlist.forced_next_song is not None and playlist.forced_next_song == playlist.current_index:
+                queue = queue[1:]
+
+        return queue
+
+    def _is_duplicate(self, song: Song, queue: list[Song]) -> bool:
+        filename = song.get_filename()
+        if any(queued.get_filename() == filename for queued in queue):
+            return True
+
+        current_song = self.stream.get_current_song() if self.stream else None
+        return current_song is not None and current_song.get_filename() == filename
+
+    def _check_history(self, song: Song) -> None:
+        history = self.stream.history if self.stream else None
+        if history is None:
+            return
+
+        now = history.clock()
+        played_at = history.last_played_at(song.get_filename())
+        if played_at is not None and now - played_at < self.min_replay_interval:
+            minutes = int((now - played_at) // 60)
+            raise RequestRejected(f"{song.get_song_name()} was played {minutes} minutes ago.")
+
+        played_at = history.artist_last_played_at(song.get_artist()) if song.get_artist() else None
+        if played_at is not None and now - played_at < self.min_artist_interval:
+            minutes = int((now - played_at) // 60)
+            raise RequestRejected(f"{song.get_artist()} was played {minutes} minutes ago.")
+
+    def request(self, song: Song, announcement: Song = None) -> None:
+        """
+        Request a song. The song plays after the requests that are already waiting.
+
+        This method is safe to call from any thread and returns immediately.
+
+        Parameters:
+            song (Song): The requested song, song.get_requested_by() is used for the rate limit.
+            announcement (Song, optional): Played right before the song. It is part of the request: it is only
+                queued when the song is accepted and is not checked for duplicates, so the same announcement file
+                can introduce several requests.
+
+        Returns:
+            None
+
+        Raises:
+            RequestRejected: If the song (or the announcement) can't be found, the song is already requested or
+                playing, was played recently, the queue is full or the user exceeded the rate limit.
+        """
+        for file in (song, announcement):
+            if file is not None and not os.path.isfile(file.get_filename()):
+                raise RequestRejected(f"{file.get_song_name()} can't be found.")
+
+        songs = [announcement, song] if announcement else [song]
+
+        # The playlist lock is never taken while holding the intake lock, playlist callbacks may submit requests.
+        playlist_queue = self._get_playlist_queue()
+
+        with self.lock:
+            queue = playlist_queue + self.pending
+            if self._is_duplicate(song, queue):
+                raise RequestRejected(f"{song.get_song_name()} is already requested.")
+
+            if len(queue) + len(songs) > self.max_queue:
+                raise RequestRejected("The request queue is full.")
+
+            self._check_history(song)
+
+            self._check_rate_limit(song.get_requested_by(), time.monotonic())
+            self.pending.extend(songs)
+
+    def skip(self, requested_by: str = "") -> None:
+        """
+        Skip the item that is currently playing.
+
+        Parameters:
+            requested_by (str, optional): The user asking for the skip, used for the rate limit.
+
+        Returns:
+            None
+
+        Raises:
+            RequestRejected: If the user exceeded the rate limit.
+        """
+        with self.lock:
+            self._check_rate_limit(requested_by, time.monotonic())
+
+        if self.stream:
+            self.stream.next_song()
+
+    def get_queue(self) -> list[Song]:
+        """
+        Returns the requests in the order they will play.
+
+        Returns:
+            list[Song]: The requested songs that did not start playing yet.
+        """
+        queue = self._get_playlist_queue()
+
+        with self.lock:
+            return queue + self.pending
+
+    def flush(self, playlist) -> int:
+        """
+        Hand all pending requests to the playlist. Called by the stream thread at song boundaries.
+
+        Parameters:
+            playlist (Playlist): The playlist to add the requests to.
+
+        Returns:
+            int: The number of requests that were added.
+        """
+        with self.lock:
+            if not self.pending:
+                return 0
+
+            batch = self.pending
+            self.pending = []
+
+        with playlist.lock:
+            for song in batch:
+                playlist.add_song_and_play_next(song, remove_after=self.remove_after)
+
+        return len(batch)
@@ -0,0 +1,242 @@
+import logging
+import os
+from itertools import repeat
+
+from .cache import FileCache
+from .parsers.mp3 import find_frame, id3v2_size, parse_frame_header
+from .song import Song
+
+logger = logging.getLogger(__name__)
+
+STATUS_OK = "ok"
+STATUS_DAMAGED = "damaged"
+STATUS_QUARANTINED = "quarantined"
+
+# Tags that may follow the last frame.
+TRAILING_TAGS = (b"TAG", b"APETAGEX", b"LYRICSBEGIN")
+
+
+def scan_file(file_path: str, sample_rate: int = None, channels: int = None, min_valid: float = 0.9) -> dict:
+    """
+    Check the frames of an MP3 file and find the byte ranges that hold valid audio.
+
+    Every frame header has to be valid and match the first frame (MPEG version, layer, sample rate and channels)
+    and the frame has to be complete. After an invalid frame the scan resyncs at the next pair of valid frames, the
+    skipped bytes are left out of the ranges. Trailing ID3v1, APE and Lyrics3 tags are not errors.
+
+    A file is quarantined if it has no frames, if less than min_valid of its audio bytes are valid or if its format
+    does not match the given sample rate and channels. A file with errors that is not quarantined is damaged and
+    only its valid ranges are played.
+
+    Parameters:
+        file_path (str): The MP3 file.
+        sample_rate (int, optional): The sample rate of the stream, None accepts any sample rate.
+        channels (int, optional): The number of channels of the stream, None accepts any number of channels.
+        min_valid (float, optional): The share of the audio bytes that has to be valid.
+
+    Returns:
+        dict: The status, the reason for a quarantine, the valid ranges as [start, end] byte offsets, the number of
+            frames, the format of the first frame and the errors found.
+    """
+    with open(file_path, "rb") as fp:
+        data = fp.read()
+
+    result = {
+        'status': STATUS_OK,
+        'reason': None,
+        'ranges': [],
+        'frames': 0,
+        'sample_rate': 0,
+        'channels': 0,
+        'errors': [],
+    }
+
+    audio_start = id3v2_size(data)
+    position = find_frame(data, audio_start)
+    if position < 0:
+        result['status'] = STATUS_QUARANTINED
+        result['reason'] = "No MP3 frames found."
+        return result
+
+    first = parse_frame_header(data, position)
+    result['sample_rate'] = first['sample_rate']
+    result['channels'] = first['channels']
+    key = (first['version'], first['layer'], first['sample_rate'], first['channels'])
+
+    if position > audio_start:
+        result['errors'].append(f"{position - audio_start} bytes of garbage before the first frame")
+
+    ranges = result['ranges']
+    range_start = position
+    while position < len(data):
+        frame = parse_frame_header(data, position)
+        valid = frame is not None and (frame['version'], frame['layer'], frame['sample_rate'],
+                                       frame['channels']) == key
+        if valid and position + frame['length'] <= len(data):
+            result['frames'] += 1
+            position += frame['length']
+            continue
+
+        if data.startswith(TRAILING_TAGS, position):
+            break
+
+        if range_start < position:
+            ranges.append([range_start, position])
+
+        if valid:
+            result['errors'].append(f"Truncated frame at {position}")
+            range_start = position = len(data)
+            break
+
+        resync = find_frame(data, position + 1)
+        while resync >= 0 and (parse_frame_header(data, resync)['sample_rate'] != first['sample_rate'] or
+                               parse_frame_header(data, resync)['channels'] != first['channels']):
+            resync = find_frame(data, resync + 1)
+
+        if resync < 0:
+            tag = min((data.find(tag, position) for tag in TRAILING_TAGS if data.find(tag, position) >= 0),
+                      default=len(data))
+            if tag > position:
+                result['errors'].append(f"Lost sync at {position}, {tag - position} bytes skipped")
+            range_start = position = len(data)
+            break
+
+        result['errors'].append(f"Lost sync at {position}, resynced at {resync}")
+        range_start = position = resync
+
+    if range_start < position:
+        ranges.append([range_start, position])
+
+    audio_bytes = max(len(data) - audio_start, 1)
+    valid_bytes = sum(end - start for start, end in ranges)
+
+    if not ranges:
+        result['status'] = STATUS_QUARANTINED
+        result['reason'] = "No complete MP3 frames found."
+    elif (sample_rate and first['sample_rate'] != sample_rate) or (channels and first['channels'] != channels):
+        result['status'] = STATUS_QUARANTINED
+        result['reason'] = (f"{first['sample_rate']} Hz, {first['channels']} channels does not match the stream "
+                            f"({sample_rate} Hz, {channels} channels).")
+    elif valid_bytes / audio_bytes < min_valid:
+        result['status'] = STATUS_QUARANTINED
+        result['reason'] = f"Only {valid_bytes / audio_bytes:.0%} of the file is valid audio."
+    elif result['errors']:
+        result['status'] = STATUS_DAMAGED
+
+    return result
+
+
+class IntegrityIndex:
+    """
+    The result of a validation pass over the library: valid byte ranges per file and the quarantined files.
+
+    The files are scanned on a process pool with scan(), results are stored in a FileCache and reused as long as
+    the size and modification time of a file do not change. While streaming a lookup is a dictionary access.
+
+    Attributes:
+        cache (FileCache): The cache holding the scan results.
+        sample_rate (int or None): The sample rate files have to match, usually the one of the stream.
+        channels (int or None): The number of channels files have to match.
+        min_valid (float): The share of a file that has to be valid audio.
+        ranges (dict): The valid [start, end] byte ranges by absolute file path, for damaged files only.
+        quarantined (dict): The reason by absolute file path, for quarantined files.
+    """
+
+    def __init__(self, cache: FileCache = None, sample_rate: int = None, channels: int = None,
+                 min_valid: float = 0.9):
+        self.cache = cache or FileCache()
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.min_valid = min_valid
+        self.ranges = {}
+        self.quarantined = {}
+
+    def get_settings(self) -> list:
+        return [self.sample_rate, self.channels, self.min_valid]
+
+    def scan(self, songs: list[Song], workers: int = None) -> dict:
+        """
+        Validate the MP3 songs that are not in the cache yet and load the results of all songs.
+
+        Parameters:
+            songs (list[Song]): The songs to check, for example playlist.get_all_songs().
+            workers (int, optional): The number of processes, the number of CPUs by default.
+
+        Returns:
+            dict: The number of files per status.
+        """
+        files = [song.get_filename() for song in songs if song.get_format() == "mp3"]
+        missing = []
+        counts = {STATUS_OK: 0, STATUS_DAMAGED: 0, STATUS_QUARANTINED: 0}
+
+        for file in files:
+            value = self.cache.get(file)
+            if value is not None and value.get('settings') == self.get_settings():
+                self._add(file, value, counts)
+            else:
+                missing.append(file)
+
+        if missing:
+            # Imported here, concurrent.futures takes longer to import than the rest of the package.
+            from concurrent.futures import ProcessPoolExecutor
+
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                results = executor.map(_scan, missing, repeat(self.sample_rate), repeat(self.channels),
+                                       repeat(self.min_valid), chunksize=8)
+
+                for file, result in zip(missing, results):
+                    result['settings'] = self.get_settings()
+                    self.cache.set(file, result)
+                    self._add(file, result, counts)
+
+                    if result['status'] == STATUS_QUARANTINED:
+                        logger.warning("Quarantined %s: %s", file, result['reason'])
+
+        self.cache.save()
+        return counts
+
+    def _add(self, file: str, value: dict, counts: dict) -> None:
+        key = os.path.abspath(file)
+        self.ranges.pop(key, None)
+        self.quarantined.pop(key, None)
+        counts[value['status']] += 1
+
+        if value['status'] == STATUS_QUARANTINED:
+            self.quarantined[key] = value['reason']
+        elif value['status'] == STATUS_DAMAGED:
+            self.ranges[key] = [tuple(byte_range) for byte_range in value['ranges']]
+
+    def is_quarantined(self, file: str) -> bool:
+        return os.path.abspath(file) in self.quarantined
+
+    def get_ranges(self, file: str) -> list or None:
+        """
+        Returns the valid (start, end) byte ranges of a damaged file, None for files without errors.
+        """
+        return self.ranges.get(os.path.abspath(file))
+
+    def get_report(self) -> dict:
+        """
+        Returns the quarantined files with the reason and the damaged files with their errors.
+        """
+        damaged = {}
+        for file in self.ranges:
+            value = self.cache.get(file)
+            damaged[file] = value['errors'] if value else []
+
+        return {"quarantined": dict(self.quarantined), "damaged": damaged}
+
+
+def _scan(file_path: str, sample_rate: int, channels: int, min_valid: float) -> dict:
+    try:
+        return scan_file(file_path, sample_rate, channels, min_valid)
+    except OSError as error:
+        return {
+            'status': STATUS_QUARANTINED,
+            'reason': f"Can't read the file: {error}",
+            'ranges': [],
+            'frames': 0,
+            'sample_rate': 0,
+            'channels': 0,
+            'errors': [],
+        }
@@ -0,0 +1,161 @@
+import threading
+import time
+
+from .song import Song
+
+
+class MetadataUpdater:
+    """
+    Sends metadata updates to the streaming server on a separate worker thread.
+
+    Updates never block the caller. When several updates arrive shortly after each other (skips, short jingles) only
+    the latest one is sent. Failed updates are retried unless a newer update has arrived in the meantime.
+
+    Attributes:
+        connection: The shout connection used to send the metadata.
+        coalesce_delay (float): The number of seconds to wait for a newer update before sending.
+        retries (int): The number of times a failed update is retried.
+        retry_delay (float): The number of seconds between retries, doubled after every failed attempt.
+        hidden_kinds (tuple): The kinds of items (for example jingle, advertisement) whose title is not shown.
+        hidden_title (str or None): The title shown for hidden items. None keeps the previous title.
+        tracer (Tracer or None): Records a span for every attempt to send metadata, set by Stream.set_tracer().
+
+    A metadata update is an HTTP request to the admin interface of the server that can take a while. The connection
+    should not be the one audio is sent on, see the metadata_output argument of Stream.
+    """
+
+    def __init__(self, connection, coalesce_delay: float = 0.25, retries: int = 3, retry_delay: float = 1.0):
+        self.connection = connection
+        self.coalesce_delay = coalesce_delay
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.hidden_kinds = ()
+        self.hidden_title = None
+        self.failures = 0
+        self.tracer = None
+
+        self.pending = None
+        self.generation = 0
+        self.condition = threading.Condition()
+        self.thread = None
+        self.is_running = False
+
+    def hide(self, kinds: tuple = ("jingle", "advertisement"), title: str or None = None) -> None:
+        """
+        Hide the titles of the given kinds of items.
+
+        Parameters:
+            kinds (tuple, optional): The kinds of items to hide.
+            title (str or None, optional): The title to show instead. None keeps the title of the previous item.
+
+        Returns:
+            None
+        """
+        self.hidden_kinds = tuple(kinds)
+        self.hidden_title = title
+
+    def update(self, song: Song, kind: str = "song") -> None:
+        """
+        Queue a metadata update for the given song. This method returns immediately.
+
+        Parameters:
+            song (Song): The song that started playing.
+            kind (str, optional): The kind of item (song, announcement, jingle or advertisement).
+
+        Returns:
+            None
+        """
+        title = song.get_song_name()
+        if kind in self.hidden_kinds:
+            if self.hidden_title is None:
+                return
+
+            title = self.hidden_title
+
+        if not self.is_running:
+            self.start()
+
+        with self.condition:
+            self.pending = {"song": title}
+            self.generation += 1
+            self.condition.notify()
+
+    def start(self) -> None:
+        """
+        Start the worker thread.
+        """
+        with self.condition:
+            if self.is_running:
+                return
+
+            self.is_running = True
+
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self) -> None:
+        """
+        Stop the worker thread. Pending updates are dropped and retries are cancelled, an update that is being sent
+        is waited for so a later start() never runs two workers on the same connection.
+        """
+        with self.condition:
+            self.is_running = False
+            self.pending = None
+            self.condition.notify()
+
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join()
+
+        self.thread = None
+
+    def run(self) -> None:
+        while True:
+            with self.condition:
+                while self.is_running and self.pending is None:
+                    self.condition.wait()
+
+                if not self.is_running:
+                    return
+
+                # Keep waiting while newer updates keep coming in, but never longer than a few delays.
+                generation = self.generation
+                deadline = time.monotonic() + self.coalesce_delay * 4
+                while self.is_running and time.monotonic() < deadline:
+                    self.condition.wait(self.coalesce_delay)
+                    if self.generation == generation:
+                        break
+
+                    generation = self.generation
+
+                metadata = self.pending
+                self.pending = None
+
+            if metadata:
+                self.send(metadata, generation)
+
+    def send(self, metadata: dict, generation: int) -> None:
+        """
+        Send the metadata, retrying with an increasing delay until it succeeds or a newer update arrives.
+        """
+        delay = self.retry_delay
+
+        for attempt in range(self.retries + 1):
+            try:
+                if self.tracer is None:
+                    self.connection.set_metadata(metadata)
+                else:
+                    with self.tracer.span("set_metadata", attempt=attempt, song=metadata.get("song", "")):
+                        self.connection.set_metadata(metadata)
+                return
+            except Exception:
+                self.failures += 1
+
+            if attempt == self.retries:
+                return
+
+            with self.condition:
+                self.condition.wait_for(lambda: self.generation != generation or not self.is_running, delay)
+                if self.generation != generation or not self.is_running:
+                    return
+
+            delay *= 2
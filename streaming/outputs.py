@@ -0,0 +1,45 @@
+# The audio_info keys used by libshout (shout.SHOUT_AI_BITRATE, ...).
+AUDIO_INFO_BITRATE = "bitrate"
+AUDIO_INFO_SAMPLERATE = "samplerate"
+AUDIO_INFO_CHANNELS = "channels"
+
+
+class NullOutput:
+    """
+    An output with the same interface as shout.Shout that discards all audio.
+
+    Used to run a stream without a streaming server, for example in benchmarks. The connection settings
+    (host, port, mount, ...) can be set like on a shout connection but are ignored.
+
+    Attributes:
+        bytes_sent (int): The number of bytes sent since the output was opened.
+        metadata (dict or None): The last metadata that was set.
+        on_send (callable or None): Called with every buffer that is sent.
+    """
+
+    def __init__(self, on_send=None):
+        self.audio_info = {}
+        self.format = "mp3"
+        self.bytes_sent = 0
+        self.metadata = None
+        self.on_send = on_send
+        self.is_open = False
+
+    def open(self) -> None:
+        self.is_open = True
+        self.bytes_sent = 0
+
+    def close(self) -> None:
+        self.is_open = False
+
+    def send(self, buffer: bytes) -> None:
+        self.bytes_sent += len(buffer)
+
+        if self.on_send:
+            self.on_send(buffer)
+
+    def sync(self) -> None:
+        pass
+
+    def set_metadata(self, metadata: dict) -> None:
+        self.metadata = metadata
@@ -0,0 +1,147 @@
+import threading
+import time
+
+
+class MonotonicClock:
+    """
+    The real time clock used for pacing.
+    """
+
+    def now(self) -> float:
+        return time.monotonic()
+
+    def sleep(self, seconds: float, cancel: threading.Event = None) -> bool:
+        """
+        Sleep for the given number of seconds.
+
+        Parameters:
+            seconds (float): The number of seconds to sleep.
+            cancel (threading.Event, optional): An event that ends the sleep early when it is set.
+
+        Returns:
+            bool: True if the sleep was cancelled, False otherwise.
+        """
+        if cancel is not None:
+            return cancel.wait(seconds)
+
+        time.sleep(seconds)
+        return False
+
+
+class TokenBucketPacer:
+    """
+    Paces audio data to real time on a monotonic clock.
+
+    The pacer keeps track of how much audio (in seconds) has been sent since the connection was opened and lets the
+    sender run at most `lead` seconds ahead of real time. Right after connecting `burst` seconds may be sent at once
+    to fill the buffers of the server and the first listeners. When the sender falls behind, for example after a
+    slow file read, it catches up at `catchup` times real time instead of sending everything at once. A backlog
+    larger than `max_debt` seconds is forgiven as it can't be made up without overflowing listener buffers.
+
+    Attributes:
+        lead (float): The number of seconds the sender may run ahead of real time.
+        burst (float): The number of seconds sent without pacing right after connecting.
+        catchup (float): The maximum speed, relative to real time, used to catch up after a stall.
+        max_debt (float): The largest backlog in seconds that will be caught up.
+        clock (MonotonicClock): The clock used for timing.
+        stalls (int): The number of times a backlog larger than max_debt was forgiven.
+    """
+
+    def __init__(self, lead: float = 0.5, burst: float = 2.0, catchup: float = 1.25, max_debt: float = 5.0,
+                 clock: MonotonicClock = None):
+        self.lead = lead
+        self.burst = max(burst, lead)
+        self.catchup = catchup
+        self.max_debt = max_debt
+        self.clock = clock or MonotonicClock()
+        self.stalls = 0
+
+        self.start = None
+        self.sent = 0.0
+        self.last = 0.0
+        self.lock = threading.Lock()
+
+    def reset(self) -> None:
+        """
+        Start pacing from scratch, to be called whenever the connection is (re)opened.
+        """
+        self.start = None
+        self.sent = 0.0
+        self.last = 0.0
+
+    def get_lag(self) -> float:
+        """
+        Returns how many seconds the audio that has been sent is behind real time, negative when it is ahead.
+        """
+        if self.start is None:
+            return 0.0
+
+        return self.clock.now() - self.start - self.sent
+
+    def pace(self, duration: float, cancel: threading.Event = None) -> bool:
+        """
+        Wait until `duration` seconds of audio may be sent.
+
+        Parameters:
+            duration (float): The number of seconds of audio about to be sent.
+            cancel (threading.Event, optional): An event that interrupts the wait.
+
+        Returns:
+            bool: True if the audio may be sent, False if the wait was cancelled.
+        """
+        with self.lock:
+            now = self.clock.now()
+            if self.start is None:
+                self.start = now
+                self.last = now
+
+            ahead = self.sent + duration - (now - self.start)
+            if ahead + self.max_debt < duration:
+                # Forgive the part of a long stall that can't be caught up.
+                self.start += duration - self.max_debt - ahead
+                ahead = duration - self.max_debt
+                self.stalls += 1
+
+            if self.sent < self.burst:
+                wait = ahead - self.burst
+            else:
+                wait = max(ahead - self.lead, self.last + duration / self.catchup - now)
+
+        if wait > 0:
+            if self.clock.sleep(wait, cancel):
+                return False
+
+            now += wait
+
+        with self.lock:
+            self.sent += duration
+            self.last = now
+        return True
+
+    def advance(self, duration: float) -> None:
+        """
+        Account for audio that was sent without pace(), for example filler sent by the underrun watchdog.
+
+        Parameters:
+            duration (float): The number of seconds of audio that were sent.
+
+        Returns:
+            None
+        """
+        with self.lock:
+            if self.start is not None:
+                self.sent += duration
+
+    def pace_bytes(self, size: int, bitrate: int, cancel: threading.Event = None) -> bool:
+        """
+        Wait until `size` bytes of audio with the given bitrate may be sent.
+
+        Parameters:
+            size (int): The number of bytes about to be sent.
+            bitrate (int): The bitrate of the audio in kbps.
+            cancel (threading.Event, optional): An event that interrupts the wait.
+
+        Returns:
+            bool: True if the audio may be sent, False if the wait was cancelled.
+        """
+        return self.pace(size * 8 / (bitrate * 1000), cancel)
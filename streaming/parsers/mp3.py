@@ -0,0 +1,357 @@
+import os
+import struct
+
+MPEG_VERSION_1 = 3
+MPEG_VERSION_2 = 2
+MPEG_VERSION_25 = 0
+
+BITRATES = {
+    (MPEG_VERSION_1, 1): (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+    (MPEG_VERSION_1, 2): (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+    (MPEG_VERSION_1, 3): (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    (MPEG_VERSION_2, 1): (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+    (MPEG_VERSION_2, 2): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+    (MPEG_VERSION_2, 3): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+
+SAMPLE_RATES = {
+    MPEG_VERSION_1: (44100, 48000, 32000),
+    MPEG_VERSION_2: (22050, 24000, 16000),
+    MPEG_VERSION_25: (11025, 12000, 8000),
+}
+
+CHANNEL_MODE_MONO = 3
+
+# The longest possible frame: MPEG 1 Layer II at 384 kbps and 32 kHz with padding.
+MAX_FRAME_LENGTH = 1729
+
+
+def parse_frame_header(data: bytes, offset: int = 0) -> dict or None:
+    """
+    Parse the 4 byte MPEG audio frame header found at the given offset.
+
+    Parameters:
+        data (bytes): The buffer containing the header.
+        offset (int): The position of the header within the buffer.
+
+    Returns:
+        dict or None: The decoded header or None if the bytes are not a valid frame header.
+    """
+    if offset + 4 > len(data):
+        return None
+
+    header = struct.unpack_from(">I", data, offset)[0]
+
+    if header & 0xFFE00000 != 0xFFE00000:
+        return None
+
+    version = (header >> 19) & 0x3
+    layer = 4 - ((header >> 17) & 0x3)
+    bitrate_index = (header >> 12) & 0xF
+    sample_rate_index = (header >> 10) & 0x3
+
+    if version == 1 or layer == 4 or bitrate_index in (0, 15) or sample_rate_index == 3:
+        return None
+
+    table_version = MPEG_VERSION_1 if version == MPEG_VERSION_1 else MPEG_VERSION_2
+    bitrate = BITRATES[(table_version, layer)][bitrate_index]
+    sample_rate = SAMPLE_RATES[version][sample_rate_index]
+    padding = (header >> 9) & 0x1
+    channel_mode = (header >> 6) & 0x3
+
+    if layer == 1:
+        samples = 384
+        length = (12 * bitrate * 1000 // sample_rate + padding) * 4
+    elif layer == 2 or version == MPEG_VERSION_1:
+        samples = 1152
+        length = 144 * bitrate * 1000 // sample_rate + padding
+    else:
+        samples = 576
+        length = 72 * bitrate * 1000 // sample_rate + padding
+
+    return {
+        'version': version,
+        'layer': layer,
+        'protected': not (header >> 16) & 0x1,
+        'bitrate': bitrate,
+        'sample_rate': sample_rate,
+        'padding': padding,
+        'channel_mode': channel_mode,
+        'channels': 1 if channel_mode == CHANNEL_MODE_MONO else 2,
+        'samples': samples,
+        'length': length,
+    }
+
+
+def side_info_size(frame: dict) -> int:
+    """
+    Returns the size of the Layer III side information following the frame header.
+    """
+    if frame['version'] == MPEG_VERSION_1:
+        return 17 if frame['channels'] == 1 else 32
+
+    return 9 if frame['channels'] == 1 else 17
+
+
+def id3v2_size(data: bytes) -> int:
+    """
+    Returns the number of bytes taken by an ID3v2 tag at the start of the buffer, 0 if there is none.
+    """
+    if len(data) < 10 or data[:3] != b"ID3":
+        return 0
+
+    size = (data[6] & 0x7F) << 21 | (data[7] & 0x7F) << 14 | (data[8] & 0x7F) << 7 | (data[9] & 0x7F)
+    footer = 10 if data[5] & 0x10 else 0
+    return 10 + size + footer
+
+
+def find_frame(data: bytes, start: int = 0) -> int:
+    """
+    Find the first frame header at or after start that is followed by another valid header.
+
+    Requiring two consecutive frames keeps us from locking on to a false sync inside tag or cover art data.
+
+    Returns:
+        int: The offset of the frame or -1 when no frame could be found.
+    """
+    position = data.find(b"\xff", start)
+
+    while 0 <= position < len(data) - 3:
+        frame = parse_frame_header(data, position)
+        if frame:
+            following = position + frame['length']
+            if following + 4 > len(data):
+                return position
+
+            second = parse_frame_header(data, following)
+            if second and second['sample_rate'] == frame['sample_rate'] and second['layer'] == frame['layer']:
+                return position
+
+        position = data.find(b"\xff", position + 1)
+
+    return -1
+
+
+def last_frame_end(data: bytes) -> int:
+    """
+    Returns the end of the last complete frame in the buffer.
+
+    The buffer has to start at a frame boundary or before the first frame, data that is not part of a frame (tags,
+    garbage) up to the next frame is counted in.
+
+    Returns:
+        int: The offset right after the last complete frame, 0 if the buffer holds no complete frame.
+    """
+    position = 0
+    end = 0
+
+    while True:
+        frame = parse_frame_header(data, position)
+        if frame is None:
+            position = find_frame(data, position + 1)
+            if position < 0:
+                return end
+            continue
+
+        if position + frame['length'] > len(data):
+            return end
+
+        position += frame['length']
+        end = position
+
+
+def silent_frame(bitrate: int = 128, sample_rate: int = 44100, channels: int = 2) -> bytes:
+    """
+    Build a Layer III frame that decodes to digital silence.
+
+    The side information is all zero (no main data, global gain 0), so every decoder outputs silence. The frame is
+    unpadded, for bitrates where frames alternate between padded and unpadded frames the real bitrate is a little
+    lower than the nominal one.
+
+    Parameters:
+        bitrate (int): The bitrate in kbps, it must exist for the MPEG version of the sample rate.
+        sample_rate (int): The sample rate in Hz.
+        channels (int): 1 for mono, 2 for stereo.
+
+    Returns:
+        bytes: The frame.
+
+    Raises:
+        ValueError: If the bitrate or sample rate can't be used for a Layer III frame.
+    """
+    for version, rates in SAMPLE_RATES.items():
+        if sample_rate in rates:
+            break
+    else:
+        raise ValueError(f"Unsupported sample rate {sample_rate}")
+
+    table_version = MPEG_VERSION_1 if version == MPEG_VERSION_1 else MPEG_VERSION_2
+    bitrates = BITRATES[(table_version, 3)]
+    if bitrate not in bitrates[1:]:
+        raise ValueError(f"Unsupported bitrate {bitrate} for a sample rate of {sample_rate}")
+
+    channel_mode = CHANNEL_MODE_MONO if channels == 1 else 0
+    header = (0xFFE00000 | version << 19 | 1 << 17 | 1 << 16 | bitrates.index(bitrate) << 12 |
+              rates.index(sample_rate) << 10 | channel_mode << 6)
+
+    frame = parse_frame_header(struct.pack(">I", header))
+    return struct.pack(">I", header) + bytes(frame['length'] - 4)
+
+
+class MP3:
+    """
+    Reads the format information of an MP3 file from its headers.
+
+    Only the first few KB of the file are read. The duration comes from a Xing/Info or VBRI header when the
+    encoder wrote one (including LAME encoder delay and padding), otherwise a short frame scan is used to
+    estimate the bitrate from which the duration is derived.
+    """
+
+    def __init__(self, file_path: str, read_size: int = 16384, scan_frames: int = 32):
+        self.file_path = file_path
+        self.read_size = read_size
+        self.scan_frames = scan_frames
+        self.data = self.parse()
+
+    def create_record(self):
+        return {
+            'duration': 0.0,
+            'bitrate': 0,
+            'sample_rate': 0,
+            'channels': 0,
+            'vbr': False,
+            'frames': 0,
+            'audio_start': 0,
+            'audio_end': 0,
+        }
+
+    def parse(self):
+        record = self.create_record()
+        file_size = os.path.getsize(self.file_path)
+
+        with open(self.file_path, 'rb') as fp:
+            data = fp.read(self.read_size)
+
+            # Skip large tags (cover art) by re-reading from the end of the tag instead of the file start.
+            tag_size = id3v2_size(data)
+            base = 0
+            if tag_size and tag_size + 4096 > len(data):
+                fp.seek(tag_size)
+                data = fp.read(self.read_size)
+                base = tag_size
+
+            audio_end = file_size
+            if file_size >= 128:
+                fp.seek(file_size - 128)
+                if fp.read(3) == b"TAG":
+                    audio_end -= 128
+
+        position = find_frame(data, max(0, tag_size - base))
+        if position < 0:
+            return record
+
+        frame = parse_frame_header(data, position)
+        record['sample_rate'] = frame['sample_rate']
+        record['channels'] = frame['channels']
+        record['audio_start'] = base + position
+        record['audio_end'] = audio_end
+
+        info = self.parse_info_frame(data, position, frame)
+        if info:
+            info['audio_start'] += base
+            record.update(info)
+            if info['frames']:
+                samples = info['frames'] * frame['samples'] - info.get('delay', 0) - info.get('padding', 0)
+                record['duration'] = max(samples, 0) / frame['sample_rate']
+
+                audio_bytes = info.get('bytes') or audio_end - record['audio_start']
+                if record['duration'] > 0:
+                    record['bitrate'] = int(round(audio_bytes * 8 / record['duration'] / 1000))
+
+                return record
+
+        return self.scan(data, position, record)
+
+    def parse_info_frame(self, data: bytes, position: int, frame: dict) -> dict or None:
+        """
+        Decode a Xing/Info (with optional LAME extension) or VBRI header stored in the first frame.
+
+        Returns:
+            dict or None: Frame count, byte count and encoder delay/padding, or None if the frame is regular audio.
+                The returned audio_start is relative to the buffer.
+        """
+        if frame['layer'] != 3:
+            return None
+
+        xing = position + 4 + side_info_size(frame)
+        tag = data[xing:xing + 4]
+
+        if tag in (b"Xing", b"Info"):
+            flags = struct.unpack_from(">I", data, xing + 4)[0] if xing + 8 <= len(data) else 0
+            cursor = xing + 8
+            info = {'vbr': tag == b"Xing", 'frames': 0, 'bytes': 0}
+
+            if flags & 0x1 and cursor + 4 <= len(data):
+                info['frames'] = struct.unpack_from(">I", data, cursor)[0]
+                cursor += 4
+            if flags & 0x2 and cursor + 4 <= len(data):
+                info['bytes'] = struct.unpack_from(">I", data, cursor)[0]
+                cursor += 4
+            if flags & 0x4:
+                cursor += 100
+            if flags & 0x8:
+                cursor += 4
+
+            if data[cursor:cursor + 4] == b"LAME" and cursor + 24 <= len(data):
+                delay = data[cursor + 21] << 4 | data[cursor + 22] >> 4
+                padding = (data[cursor + 22] & 0x0F) << 8 | data[cursor + 23]
+                info['delay'] = delay
+                info['padding'] = padding
+
+            # The info frame itself carries no audio.
+            info['audio_start'] = position + frame['length']
+            return info
+
+        vbri = position + 36
+        if data[vbri:vbri + 4] == b"VBRI" and vbri + 18 <= len(data):
+            total_bytes, frames = struct.unpack_from(">II", data, vbri + 10)
+            info = {
+                'vbr': True,
+                'frames': frames,
+                'bytes': total_bytes,
+                'audio_start': position + frame['length'],
+            }
+            return info
+
+        return None
+
+    def scan(self, data: bytes, position: int, record: dict) -> dict:
+        """
+        Estimate bitrate and duration by walking the first frames in the buffer.
+        """
+        total_bits = 0
+        total_samples = 0
+        bitrates = set()
+        frames = 0
+
+        while frames < self.scan_frames:
+            frame = parse_frame_header(data, position)
+            if not frame:
+                break
+
+            bitrates.add(frame['bitrate'])
+            total_bits += frame['bitrate'] * frame['samples']
+            total_samples += frame['samples']
+            frames += 1
+            position += frame['length']
+
+        if not total_samples:
+            return record
+
+        bitrate = total_bits / total_samples
+        audio_bytes = record['audio_end'] - record['audio_start']
+
+        record['vbr'] = len(bitrates) > 1
+        record['bitrate'] = int(round(bitrate))
+        record['duration'] = audio_bytes * 8 / (bitrate * 1000)
+        return record
@@ -0,0 +1,274 @@
+import os
+import struct
+from functools import lru_cache
+
+PAGE_CONTINUED = 0x01
+PAGE_BOS = 0x02
+PAGE_EOS = 0x04
+
+OPUS_SAMPLE_RATE = 48000
+
+CRC_POLYNOMIAL = 0x04C11DB7
+
+
+def _crc_table() -> list:
+    table = []
+    for index in range(256):
+        crc = index << 24
+        for _ in range(8):
+            crc = (crc << 1) ^ CRC_POLYNOMIAL if crc & 0x80000000 else crc << 1
+        table.append(crc & 0xFFFFFFFF)
+    return table
+
+
+CRC_TABLE = _crc_table()
+
+
+def page_checksum(page: bytes) -> int:
+    """
+    Calculate the Ogg CRC32 of a page. The checksum field (bytes 22-25) must be zeroed.
+    """
+    crc = 0
+    for byte in page:
+        crc = ((crc << 8) & 0xFFFFFFFF) ^ CRC_TABLE[(crc >> 24) ^ byte]
+    return crc
+
+
+def _crc_multiply(a: int, b: int) -> int:
+    """
+    Multiply two polynomials over GF(2) modulo the CRC polynomial.
+    """
+    result = 0
+    while b:
+        if b & 1:
+            result ^= a
+        b >>= 1
+        a = ((a << 1) ^ CRC_POLYNOMIAL) & 0xFFFFFFFF if a & 0x80000000 else a << 1
+    return result
+
+
+@lru_cache(maxsize=256)
+def _crc_shift(length: int) -> int:
+    """
+    Returns x^(8 * length) modulo the CRC polynomial, the effect of appending length zero bytes to a message.
+    """
+    result, power = 1, 1 << 8
+    while length:
+        if length & 1:
+            result = _crc_multiply(result, power)
+        power = _crc_multiply(power, power)
+        length >>= 1
+    return result
+
+
+def parse_page_header(data: bytes, offset: int = 0) -> dict or None:
+    """
+    Parse the header of the Ogg page found at the given offset.
+
+    Parameters:
+        data (bytes): The buffer containing the page, it needs to include the segment table.
+        offset (int): The position of the page within the buffer.
+
+    Returns:
+        dict or None: The decoded header or None if there is no (complete) page header at the offset.
+    """
+    if offset + 27 > len(data) or data[offset:offset + 4] != b"OggS" or data[offset + 4] != 0:
+        return None
+
+    header_type, granule, serial, sequence, checksum, segments = struct.unpack_from("<BqIIIB", data, offset + 5)
+    header_size = 27 + segments
+    if offset + header_size > len(data):
+        return None
+
+    lacing = data[offset + 27:offset + header_size]
+    return {
+        'header_type': header_type,
+        'granule': granule,
+        'serial': serial,
+        'sequence': sequence,
+        'checksum': checksum,
+        'header_size': header_size,
+        'body_size': sum(lacing),
+        'length': header_size + sum(lacing),
+    }
+
+
+def read_page(fp) -> tuple or None:
+    """
+    Read the next page from a file, skipping garbage until the next capture pattern.
+
+    Returns:
+        tuple or None: The page header and the complete page bytes, or None at the end of the file.
+    """
+    while True:
+        start = fp.tell()
+        head = fp.read(282)
+        if len(head) < 27:
+            return None
+
+        position = head.find(b"OggS")
+        if position < 0:
+            fp.seek(start + len(head) - 3)
+            continue
+
+        if position > 0:
+            fp.seek(start + position)
+            continue
+
+        page = parse_page_header(head)
+        if page is None:
+            if len(head) < 282:
+                return None
+
+            fp.seek(start + 1)
+            continue
+
+        fp.seek(start)
+        data = fp.read(page['length'])
+        if len(data) < page['length']:
+            return None
+
+        return page, data
+
+
+def set_page_serial(data: bytes, serial: int) -> bytes:
+    """
+    Returns a copy of the page with a different serial number and an updated checksum.
+
+    The Ogg CRC has no initial value or final XOR, so it is linear: the checksum is updated with the checksum of the
+    changed serial bytes moved to their position in the page, instead of reading the whole page again.
+    """
+    page = bytearray(data)
+    old_serial, checksum = struct.unpack_from("<I", page, 14)[0], struct.unpack_from("<I", page, 22)[0]
+    change = page_checksum(struct.pack("<I", old_serial ^ serial))
+    struct.pack_into("<I", page, 14, serial)
+    struct.pack_into("<I", page, 22, checksum ^ _crc_multiply(change, _crc_shift(len(page) - 18)))
+    return bytes(page)
+
+
+def make_page(body: bytes, serial: int, sequence: int, granule: int, header_type: int = 0) -> bytes:
+    """
+    Build an Ogg page holding a single packet, or no packet for an empty body.
+
+    Parameters:
+        body (bytes): The packet, at most 65025 bytes.
+        serial (int): The serial number of the logical stream.
+        sequence (int): The page sequence number.
+        granule (int): The granule position.
+        header_type (int, optional): The PAGE_CONTINUED, PAGE_BOS and PAGE_EOS flags.
+
+    Returns:
+        bytes: The page including its checksum.
+    """
+    lacing = bytes([255] * (len(body) // 255) + [len(body) % 255]) if body else b""
+    page = bytearray(struct.pack("<4sBBqIIIB", b"OggS", 0, header_type, granule, serial, sequence, 0, len(lacing)))
+    page += lacing + body
+    struct.pack_into("<I", page, 22, page_checksum(page))
+    return bytes(page)
+
+
+def identify(packet: bytes) -> dict or None:
+    """
+    Decode the identification header (the first packet) of a Vorbis or Opus stream.
+
+    Returns:
+        dict or None: The codec, channels, sample rate, granule rate, pre-skip and nominal bitrate (kbps), or None
+            if the packet is not a Vorbis or Opus identification header.
+    """
+    if packet[:7] == b"\x01vorbis" and len(packet) >= 30:
+        channels, sample_rate, _, nominal = struct.unpack_from("<BIii", packet, 11)
+        return {
+            'codec': 'vorbis',
+            'channels': channels,
+            'sample_rate': sample_rate,
+            'granule_rate': sample_rate,
+            'pre_skip': 0,
+            'bitrate': max(nominal, 0) // 1000,
+        }
+
+    if packet[:8] == b"OpusHead" and len(packet) >= 19:
+        channels, pre_skip, sample_rate = struct.unpack_from("<BHI", packet, 9)
+        return {
+            'codec': 'opus',
+            'channels': channels,
+            'sample_rate': sample_rate or OPUS_SAMPLE_RATE,
+            'granule_rate': OPUS_SAMPLE_RATE,
+            'pre_skip': pre_skip,
+            'bitrate': 0,
+        }
+
+    return None
+
+
+class Ogg:
+    """
+    Reads the format information of an Ogg Vorbis or Ogg Opus file.
+
+    The codec, channels and sample rate come from the identification header on the first page. The duration comes
+    from the granule position of the last page, so only the first and the last few KB of the file are read.
+    """
+
+    def __init__(self, file_path: str, read_size: int = 65536):
+        self.file_path = file_path
+        self.read_size = read_size
+        self.data = self.parse()
+
+    def create_record(self):
+        return {
+            'codec': '',
+            'duration': 0.0,
+            'bitrate': 0,
+            'sample_rate': 0,
+            'granule_rate': 0,
+            'pre_skip': 0,
+            'channels': 0,
+            'serial': 0,
+            'audio_start': 0,
+            'audio_end': 0,
+        }
+
+    def parse(self):
+        record = self.create_record()
+        file_size = os.path.getsize(self.file_path)
+
+        with open(self.file_path, 'rb') as fp:
+            first = read_page(fp)
+            if first is None:
+                return record
+
+            page, data = first
+            info = identify(data[page['header_size']:])
+            if info is None:
+                return record
+
+            record.update(info)
+            record['serial'] = page['serial']
+            record['audio_start'] = fp.tell() - page['length']
+            record['audio_end'] = file_size
+
+            fp.seek(max(0, file_size - self.read_size))
+            tail = fp.read(self.read_size)
+
+        granule = self.last_granule(tail, record['serial'])
+        if granule > 0:
+            record['duration'] = max(granule - record['pre_skip'], 0) / record['granule_rate']
+
+        if record['duration'] > 0:
+            record['bitrate'] = int(round(file_size * 8 / record['duration'] / 1000))
+
+        return record
+
+    @staticmethod
+    def last_granule(data: bytes, serial: int) -> int:
+        """
+        Returns the granule position of the last page of the given logical stream in the buffer, -1 if none.
+        """
+        position = data.rfind(b"OggS")
+        while position >= 0:
+            page = parse_page_header(data, position)
+            if page and page['serial'] == serial and page['granule'] >= 0:
+                return page['granule']
+
+            position = data.rfind(b"OggS", 0, position)
+
+        return -1
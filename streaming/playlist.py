@@ -1,4 +1,6 @@
 import os.path
+import threading
+from .cache import FileCache
 from .parsers.m3u import M3U
 from .song import Song
 from glob import glob
@@ -17,6 +19,7 @@ class Playlist:
         """
         self.files_array = []
         self.songs_array = []
+        self.name = None
 
         self.current_index = 0
         self.last_current_index = self.current_index
@@ -26,11 +29,17 @@ class Playlist:
         self.loop = False
         self.forced_next_song = None
         self.remove_forced_song = False
+        self.queued_songs = []
+        self.lock = threading.RLock()
+        self.songs_added = threading.Condition(self.lock)
+        self.is_loading = False
+        self.is_probing = False
         self.start_playing_at = 0
         self.did_start_playing = False
 
         self.callbacks = {
-            "forced_song_ended": []
+            "forced_song_ended": [],
+            "library_loaded": []
         }
 
         self.stop_playing()
@@ -73,6 +82,21 @@ class Playlist:
 
         return inner
 
+    def library_loaded(self):
+        """
+        Registers a callback function to be executed when a background load (see load_directory_in_background) has
+        finished, including probing the songs.
+
+        Return Type:
+            function: The callback function added to the "library_loaded" event.
+        """
+
+        def inner(f):
+            self.callbacks["library_loaded"].append(f)
+            return f
+
+        return inner
+
     def advertise_forced_song_ended(self, song: Song) -> None:
         """
         This method advertises that a forced song has ended by calling all the registered callbacks for the
@@ -122,7 +146,7 @@ class Playlist:
         """
         return self.is_currently_stopped
 
-    def from_directory(self, directory) -> None:
+    def from_directory(self, directory, extensions: tuple = (".mp3",)) -> None:
         """
         Loads songs from a directory.
 
@@ -131,6 +155,8 @@ class Playlist:
 
         Parameters:
             directory (str): The path of the directory containing the songs to load.
+            extensions (tuple, optional): The file extensions to load, for Ogg libraries use song.OGG_EXTENSIONS.
+                A stream can only send a single format, see the stream_format argument of Stream.
 
         Return Type:
             None
@@ -140,14 +166,105 @@ class Playlist:
         music_player.from_directory('/path/to/directory')
         ```
         """
-        self.files_array = glob(directory + "/*.[mM][Pp]3")
+        self.name = self.name or os.path.abspath(directory)
+        self.files_array = [file for file in glob(directory + "/*")
+                            if os.path.splitext(file)[1].lower() in extensions]
         self.files_array.sort()
 
         for file in self.files_array:
             if os.path.basename(file) != "next.mp3":
                 self.songs_array.append(Song(file))
 
+    def load_directory_in_background(self, directory, extensions: tuple = (".mp3",), cache: FileCache = None,
+                                     batch_size: int = 250) -> threading.Thread:
+        """
+        Loads songs from a directory on a background thread.
+
+        Songs are added to the playlist in batches while the directory is being loaded, so a stream can start
+        playing the first song right away. is_loading is True until all songs are added. They are then probed
+        (see probe_songs) while is_probing is True and the "library_loaded" callbacks are called.
+
+        Parameters:
+            directory (str): The path of the directory containing the songs to load.
+            extensions (tuple, optional): The file extensions to load.
+            cache (FileCache, optional): The cache used while probing the songs.
+            batch_size (int, optional): The number of songs added to the playlist at once.
+
+        Return Type:
+            threading.Thread: The thread loading the directory.
+
+        Example Usage:
+        ```
+        music_player.load_directory_in_background('/path/to/directory')
+        stream.start()
+        ```
+        """
+        self.name = self.name or os.path.abspath(directory)
+        self.is_loading = True
+        self.is_probing = True
+        thread = threading.Thread(target=self._load_directory, args=(directory, extensions, cache, batch_size),
+                                  daemon=True)
+        thread.start()
+        return thread
+
+    def _load_directory(self, directory, extensions: tuple, cache: FileCache, batch_size: int) -> None:
+        try:
+            try:
+                files = sorted(directory + "/" + entry.name for entry in os.scandir(directory)
+                               if os.path.splitext(entry.name)[1].lower() in extensions and entry.name != "next.mp3")
+
+                for start in range(0, len(files), batch_size):
+                    songs = [Song(file) for file in files[start:start + batch_size]]
+
+                    with self.lock:
+                        self.files_array.extend(files[start:start + batch_size])
+                        self.songs_array.extend(songs)
+                        self.songs_added.notify_all()
+            finally:
+                # All songs are added, next_song() and the lookahead no longer wait while the songs are probed.
+                with self.lock:
+                    self.is_loading = False
+                    self.songs_added.notify_all()
+
+            self.probe_songs(cache)
+        finally:
+            with self.lock:
+                self.is_probing = False
+                self.songs_added.notify_all()
+
+        for callback in self.callbacks["library_loaded"]:
+            callback(self)
+
+    def wait_for_songs(self, count: int = 1, timeout: float = None) -> bool:
+        """
+        Wait until the playlist holds at least `count` songs or is done loading.
+
+        Parameters:
+            count (int, optional): The number of songs to wait for.
+            timeout (float, optional): The maximum number of seconds to wait, None waits until loading finished.
+
+        Returns:
+            bool: True if the playlist holds at least `count` songs, False otherwise.
+        """
+        with self.songs_added:
+            self.songs_added.wait_for(lambda: len(self.songs_array) >= count or not self.is_loading, timeout)
+            return len(self.songs_array) >= count
+
+    def wait_until_loaded(self, timeout: float = None) -> bool:
+        """
+        Wait until a background load has finished, including probing the songs.
+
+        Parameters:
+            timeout (float, optional): The maximum number of seconds to wait.
+
+        Returns:
+            bool: True if the playlist is done loading, False if the timeout expired.
+        """
+        with self.songs_added:
+            return self.songs_added.wait_for(lambda: not self.is_loading and not self.is_probing, timeout)
+
     def from_m3u_file(self, m3u_path: str) -> None:
+        self.name = self.name or os.path.abspath(m3u_path)
         m3u: M3U = M3U(m3u_path)
 
         if len(m3u.data):
@@ -155,6 +272,108 @@ class Playlist:
                 song: Song = Song(file=record['file'], song_name=record['name'], song_artist=record['artist'])
                 self.songs_array.append(song)
 
+    def to_snapshot(self, path: str) -> None:
+        """
+        Save the songs, order, position and loop state of the playlist to a compact binary snapshot.
+
+        Queued requests are not part of the snapshot, use a Checkpoint to persist those.
+
+        Parameters:
+            path (str): The path of the snapshot file.
+
+        Returns:
+            None
+        """
+        from .snapshot import write_snapshot
+        write_snapshot(self, path)
+
+    def from_snapshot(self, path: str) -> None:
+        """
+        Load the playlist from a snapshot created by to_snapshot(), replacing the current songs.
+
+        The snapshot is memory mapped and songs are only created when they are accessed, so even very large
+        playlists open in milliseconds. Playing starts at the stored position.
+
+        Parameters:
+            path (str): The path of the snapshot file.
+
+        Returns:
+            None
+
+        Raises:
+            ValueError: If the file is not a playlist snapshot.
+        """
+        from .snapshot import PlaylistSnapshot, SnapshotSongs
+
+        snapshot = PlaylistSnapshot(path)
+
+        with self.lock:
+            self.files_array = []
+            self.songs_array = SnapshotSongs(snapshot)
+            self.queued_songs = []
+            self.loop_playlist = snapshot.loop
+            self.forced_next_song = snapshot.forced_next_song
+            self.remove_forced_song = snapshot.remove_forced_song
+            self.current_index = snapshot.current_index
+            self.last_current_index = snapshot.last_current_index
+            self.start_playing_at = snapshot.current_index
+
+    def probe_songs(self, cache: FileCache = None, workers: int = 8) -> None:
+        """
+        Probe duration, bitrate, sample rate and channels of all songs in the playlist.
+
+        Probing only reads the first few KB of each file and runs on a thread pool. Songs that are already probed
+        are skipped. When a cache is given, results for unchanged files are taken from the cache and new results
+        are stored in it.
+
+        Parameters:
+            cache (FileCache, optional): The cache to read and store probe results.
+            workers (int, optional): The number of files to probe in parallel.
+
+        Returns:
+            None
+        """
+
+        def probe(song: Song) -> None:
+            info = cache.get(song.get_filename()) if cache else None
+            if info is not None:
+                song.set_audio_info(info)
+                return
+
+            try:
+                info = song.probe()
+            except OSError:
+                return
+
+            if cache:
+                cache.set(song.get_filename(), info)
+
+        # Imported here, concurrent.futures takes longer to import than the rest of the package.
+        from concurrent.futures import ThreadPoolExecutor
+
+        songs = [song for song in self.songs_array if not song.is_probed()]
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(probe, songs))
+
+        if cache:
+            cache.save()
+
+    def get_mismatched_songs(self, bitrate: int, sample_rate: int, channels: int) -> list[Song]:
+        """
+        Returns the probed songs whose format does not match the given audio info.
+
+        Parameters:
+            bitrate (int): The expected bitrate in kbps, 0 to ignore the bitrate.
+            sample_rate (int): The expected sample rate in Hz.
+            channels (int): The expected number of channels.
+
+        Returns:
+            list[Song]: The songs that do not match.
+        """
+        return [song for song in self.songs_array
+                if song.is_probed() and not song.matches_audio_info(bitrate, sample_rate, channels)]
+
     def get_all_songs(self) -> list[Song]:
         """
         This method returns a list of all songs in the songs_array.
@@ -176,16 +395,115 @@ class Playlist:
         """
         return self.songs_array[self.current_index]
 
-    def get_next_song(self) -> Song:
-        _last_current_index = self.last_current_index
-        _current_index = self.current_index
+    def get_next_song(self, playable=None) -> Song or None:
+        """
+        Returns the song that will play after the current song, without changing the playlist.
 
-        self.next_song()
-        song = self.get_current_song()
+        Parameters:
+            playable (callable, optional): Songs for which it returns False are skipped, see get_upcoming_songs().
+
+        Returns:
+            Song or None: The next song or None if no song will play after the current one.
+        """
+        songs = self.get_upcoming_songs(1, playable=playable)
+        return songs[0] if songs else None
+
+    def get_upcoming_songs(self, count: int = 5, pending: list = (), playable=None) -> list[Song]:
+        """
+        Returns the songs that will play after the current song, in order, without changing the playlist.
+
+        The steps of next_song() are replayed on a copy of the playlist state: the loop setting, the forced song,
+        queued requests and the removal of played requests are taken into account. No callbacks are called. The
+        lookahead stops where the playlist would stop, and at the last loaded song while the playlist is loading.
+
+        Parameters:
+            count (int, optional): The maximum number of songs to return.
+            pending (list, optional): (song, remove_after) tuples that will be added with add_song_and_play_next()
+                before the next song starts, for example requests that are not handed to the playlist yet.
+            playable (callable, optional): Called with a song, songs for which it returns False are skipped and not
+                counted, for example Stream.is_playable(). The lookahead stops after a whole pass without a song.
 
-        self.last_current_index = _last_current_index
-        self.current_index = _current_index
-        return song
+        Returns:
+            list[Song]: The upcoming songs.
+        """
+        with self.lock:
+            # The songs are never copied, copying a SnapshotSongs list would decode every row. Only the forced song can
+            # be removed from songs_array, later forced songs are always added songs, so one removed index and a list of
+            # added songs describe the playlist.
+            songs = self.songs_array
+            loaded = len(songs)
+            removed = None
+            added = []
+            current = self.current_index
+            last = self.last_current_index
+            forced = self.forced_next_song
+            remove_forced = self.remove_forced_song
+            queue = list(self.queued_songs)
+            is_loading = self.is_loading
+
+            def length() -> int:
+                return loaded - (removed is not None) + len(added)
+
+            def position(index: int) -> int:
+                return index + 1 if removed is not None and index >= removed else index
+
+            def get(index: int) -> Song:
+                index = position(index)
+                return songs[index] if index < loaded else added[index - loaded]
+
+            for song, remove_after in pending:
+                if forced is not None:
+                    queue.append((song, remove_after))
+                else:
+                    added.append(song)
+                    forced = length() - 1
+                    remove_forced = remove_after
+
+            upcoming = []
+            skipped = 0
+            while len(upcoming) < count and length():
+                # restore_current_index()
+                if forced and forced == current:
+                    if remove_forced:
+                        index = position(current)
+                        if index < loaded:
+                            removed = index
+                        else:
+                            del added[index - loaded]
+
+                    forced = None
+                    current = last
+
+                    if queue:
+                        queued_song, remove_forced = queue.pop(0)
+                        added.append(queued_song)
+                        forced = length() - 1
+
+                if is_loading and current + 1 >= length():
+                    break
+
+                last = current
+                if current + 1 > length() - 1:
+                    if not self.loop_playlist:
+                        break
+
+                    current = 0
+                else:
+                    current += 1
+
+                if forced and current != forced:
+                    current = forced
+
+                song = get(current)
+                if playable is None or playable(song):
+                    upcoming.append(song)
+                    skipped = 0
+                else:
+                    skipped += 1
+                    if skipped > length():
+                        break
+
+            return upcoming
 
     def start_playing_at_position(self, position: int) -> None:
         """
@@ -225,6 +543,76 @@ class Playlist:
         self.current_index = self.start_playing_at
         self.last_current_index = 0
 
+    def get_state(self) -> dict:
+        """
+        Returns the playback position of the playlist.
+
+        The state contains the name of the playlist, the current and previous index, the loop setting, the forced song
+        and the queued requests. It can be stored (for example by a Checkpoint) and later be applied with set_state().
+
+        Returns:
+            dict: A JSON serializable description of the playback position.
+        """
+        with self.lock:
+            forced_song = None
+            if self.forced_next_song is not None and self.forced_next_song < len(self.songs_array):
+                forced_song = self.songs_array[self.forced_next_song].to_dict()
+
+            return {
+                'name': self.name,
+                'current_index': self.current_index,
+                'last_current_index': self.last_current_index,
+                'loop': self.loop_playlist,
+                'forced_next_song': self.forced_next_song,
+                'remove_forced_song': self.remove_forced_song,
+                'forced_song': forced_song,
+                'queued_songs': [{'song': song.to_dict(), 'remove_after': remove_after}
+                                 for song, remove_after in self.queued_songs],
+            }
+
+    def set_state(self, state: dict) -> None:
+        """
+        Restore a playback position created by get_state().
+
+        A forced song that is no longer part of the playlist (for example because the playlist was reloaded from
+        disk) is added again. Indexes outside the playlist are clamped.
+
+        Parameters:
+            state (dict): The playback position to restore.
+
+        Returns:
+            None
+        """
+        if len(self.songs_array) == 0 and not state.get('forced_song'):
+            return
+
+        self.queued_songs = [(Song.from_dict(queued['song']), queued['remove_after'])
+                             for queued in state.get('queued_songs', [])]
+
+        current_index = state.get('current_index', 0)
+        last_current_index = state.get('last_current_index', 0)
+        forced_index = state.get('forced_next_song')
+        forced_song = state.get('forced_song')
+
+        self.loop_playlist = state.get('loop', self.loop_playlist)
+        self.forced_next_song = None
+
+        if forced_song:
+            if forced_index is None or forced_index >= len(self.songs_array) or \
+                    self.songs_array[forced_index].get_filename() != forced_song['file']:
+                if current_index == forced_index:
+                    current_index = len(self.songs_array)
+
+                self.songs_array.append(Song.from_dict(forced_song))
+                forced_index = len(self.songs_array) - 1
+
+            self.forced_next_song = forced_index
+            self.remove_forced_song = state.get('remove_forced_song', False)
+
+        songs_length = len(self.songs_array) - 1
+        self.current_index = min(max(current_index, 0), songs_length)
+        self.last_current_index = min(max(last_current_index, 0), songs_length)
+
     def stop_playing(self) -> None:
         """
         Stop playing.
@@ -246,7 +634,8 @@ class Playlist:
 
         If a forced song was played, this method returns the current index of the songs array
         to the position it was before the forced song was played. If the remove_forced_song flag
-        is True, the forced song will be removed from the songs array.
+        is True, the forced song will be removed from the songs array. The next queued request, if
+        any, becomes the new forced song.
 
         Returns:
             None
@@ -264,6 +653,12 @@ class Playlist:
             self.forced_next_song = None
             self.current_index = self.last_current_index
 
+            if self.queued_songs:
+                queued_song, remove_after = self.queued_songs.pop(0)
+                self.songs_array.append(queued_song)
+                self.forced_next_song = len(self.songs_array) - 1
+                self.remove_forced_song = remove_after
+
             self.advertise_forced_song_ended(song)
 
     def previous_song(self) -> None:
@@ -277,26 +672,27 @@ class Playlist:
             player = Player()
             player.previous_song()
         """
-        self.restore_current_index()
+        with self.lock:
+            self.restore_current_index()
 
-        songs_length = len(self.songs_array) - 1
-        self.last_current_index = self.current_index
+            songs_length = len(self.songs_array) - 1
+            self.last_current_index = self.current_index
 
-        if self.current_index - 1 < 0:
-            if self.loop_playlist:
-                self.current_index = songs_length
-            else:
-                if self.current_index == 0 and self.is_currently_playing:
-                    self.stop_playing()
+            if self.current_index - 1 < 0:
+                if self.loop_playlist:
+                    self.current_index = songs_length
+                else:
+                    if self.current_index == 0 and self.is_currently_playing:
+                        self.stop_playing()
 
-                self.current_index = 0
-        else:
-            self.current_index -= 1
+                    self.current_index = 0
+            else:
+                self.current_index -= 1
 
-        if self.forced_next_song and self.current_index != self.forced_next_song:
-            self.current_index = self.forced_next_song
+            if self.forced_next_song and self.current_index != self.forced_next_song:
+                self.current_index = self.forced_next_song
 
-        self.play_current_song()
+            self.play_current_song()
 
     def next_song(self) -> None:
         """
@@ -310,27 +706,32 @@ class Playlist:
             next_song()
 
         """
-        self.restore_current_index()
+        with self.lock:
+            self.restore_current_index()
 
-        songs_length = len(self.songs_array) - 1
-        self.last_current_index = self.current_index
+            if self.is_loading and self.current_index + 1 >= len(self.songs_array):
+                # Reached the songs that are loaded so far, wait for the next batch instead of stopping.
+                self.songs_added.wait_for(lambda: self.current_index + 1 < len(self.songs_array) or not self.is_loading)
 
-        if self.current_index + 1 > songs_length:
-            if self.loop_playlist:
-                self.current_index = 0
-            else:
-                if self.current_index == songs_length and self.is_currently_playing:
-                    self.stop_playing()
+            songs_length = len(self.songs_array) - 1
+            self.last_current_index = self.current_index
 
-                self.current_index = songs_length
-        else:
-            self.current_index += 1
+            if self.current_index + 1 > songs_length:
+                if self.loop_playlist:
+                    self.current_index = 0
+                else:
+                    if self.current_index == songs_length and self.is_currently_playing:
+                        self.stop_playing()
+
+                    self.current_index = songs_length
+            else:
+                self.current_index += 1
 
-        if self.forced_next_song and self.current_index != self.forced_next_song:
-            self.last_current_index = self.last_current_index
-            self.current_index = self.forced_next_song
+            if self.forced_next_song and self.current_index != self.forced_next_song:
+                self.last_current_index = self.last_current_index
+                self.current_index = self.forced_next_song
 
-        self.play_current_song()
+            self.play_current_song()
 
     def play_current_song(self) -> None:
         """
@@ -347,6 +748,9 @@ class Playlist:
         """
         Add the given song file to the songs_array and play it next.
 
+        If another forced song is already waiting or playing, the song is queued and plays right after it.
+        This method is safe to call from other threads.
+
         Parameters:
             self (Playlist: The instance of the current object.
             song (Song): The song to add
@@ -356,9 +760,59 @@ class Playlist:
             None
 
         """
-        self.songs_array.append(song)
-        self.forced_next_song = len(self.songs_array) - 1
-        self.remove_forced_song = remove_after
+        with self.lock:
+            if self.forced_next_song is not None:
+                self.queued_songs.append((song, remove_after))
+                return
+
+            self.songs_array.append(song)
+            self.forced_next_song = len(self.songs_array) - 1
+            self.remove_forced_song = remove_after
+
+    def get_requested_songs(self) -> list[Song]:
+        """
+        Returns the forced song followed by the queued requests, in the order they will play.
+
+        Returns:
+            list[Song]: The requested songs.
+        """
+        with self.lock:
+            songs = [song for song, remove_after in self.queued_songs]
+            if self.forced_next_song is not None and self.forced_next_song < len(self.songs_array):
+                songs.insert(0, self.songs_array[self.forced_next_song])
+
+            return songs
+
+    def take_requests(self) -> list[tuple[Song, bool]]:
+        """
+        Remove the forced song and the queued requests that did not play yet from the playlist.
+
+        Used to hand the requests over to another playlist, see Stream.schedule_playlist(). A forced song that
+        already played has to be handled by restore_current_index() first. A forced song that is removed after
+        playing is taken out of the songs as well.
+
+        Returns:
+            list[tuple[Song, bool]]: The requested songs in the order they would play, with their remove_after flag.
+        """
+        with self.lock:
+            requests = list(self.queued_songs)
+            forced_index = self.forced_next_song
+
+            if forced_index is not None and forced_index < len(self.songs_array):
+                requests.insert(0, (self.songs_array[forced_index], self.remove_forced_song))
+
+                if self.remove_forced_song:
+                    del self.songs_array[forced_index]
+                    if self.last_current_index > forced_index:
+                        self.last_current_index -= 1
+                    if self.current_index > forced_index:
+                        self.current_index -= 1
+
+                self.forced_next_song = None
+                self.remove_forced_song = False
+
+            self.queued_songs = []
+            return requests
 
     def pause_current_song(self) -> None:
         """
@@ -0,0 +1,101 @@
+import sys
+import threading
+from collections import Counter
+
+# The shortest interval between two samples. Shorter intervals keep the profiler thread busy and take the GIL away
+# from the thread that is profiled.
+MIN_INTERVAL = 0.001
+
+
+class SamplingProfiler:
+    """
+    A sampling profiler for a single thread, meant to be switched on and off on a live station.
+
+    A background thread looks at the current stack of the profiled thread every interval seconds and counts how often
+    each stack is seen. The profiled thread is never interrupted or instrumented, the cost is one stack walk per
+    sample on the profiler thread.
+
+    Attributes:
+        thread_id (int): The thread to sample, the thread that created the profiler by default.
+        interval (float): The time between two samples in seconds.
+        max_depth (int): The number of frames kept per sample, counted from the innermost frame.
+        samples (Counter): The number of samples per stack. Stacks are tuples of "file:function:line" strings,
+            outermost frame first.
+    """
+
+    def __init__(self, thread_id: int = None, interval: float = 0.005, max_depth: int = 64):
+        self.thread_id = thread_id or threading.get_ident()
+        self.interval = interval
+        self.max_depth = max_depth
+        self.samples = Counter()
+        self.sample_count = 0
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def is_running(self) -> bool:
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self) -> None:
+        """
+        Start sampling in a background thread.
+        """
+        if self.is_running():
+            return
+
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self.run, name="sampling-profiler", daemon=True)
+        self.thread.start()
+
+    def stop(self) -> None:
+        """
+        Stop sampling, the samples are kept.
+        """
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join()
+            self.thread = None
+
+    def run(self) -> None:
+        while not self.stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+
+            stack = []
+            while frame is not None and len(stack) < self.max_depth:
+                code = frame.f_code
+                stack.append(f"{code.co_filename}:{code.co_name}:{frame.f_lineno}")
+                frame = frame.f_back
+
+            # Drop the reference to the frames of the other thread right away.
+            del frame
+            stack.reverse()
+            self.samples[tuple(stack)] += 1
+            self.sample_count += 1
+
+    def get_top(self, count: int = 20) -> list[dict]:
+        """
+        Returns the functions that were on top of the stack most often.
+
+        Parameters:
+            count (int, optional): The number of functions to return.
+
+        Returns:
+            list[dict]: The function, the number of samples and the share of all samples, most samples first.
+        """
+        functions = Counter()
+        for stack, samples in self.samples.items():
+            if stack:
+                functions[stack[-1]] += samples
+
+        total = self.sample_count or 1
+        return [{"function": function, "samples": samples, "share": round(samples / total, 4)}
+                for function, samples in functions.most_common(count)]
+
+    def export_collapsed(self, path: str) -> None:
+        """
+        Write the samples in the collapsed stack format used by flamegraph.pl and speedscope.
+        """
+        with open(path, "w", encoding="utf-8") as fp:
+            for stack, samples in self.samples.items():
+                fp.write(";".join(stack) + f" {samples}\n")
@@ -0,0 +1,303 @@
+import os
+import random
+import struct
+import threading
+import time
+import tracemalloc
+
+from . import history, tracing
+from .history import PlayHistory
+from .outputs import AUDIO_INFO_BITRATE, AUDIO_INFO_CHANNELS, AUDIO_INFO_SAMPLERATE, NullOutput
+from .pacing import TokenBucketPacer
+from .parsers.ogg import PAGE_BOS, PAGE_EOS, make_page
+from .song import Song
+from .stream import Stream
+from .tracing import Tracer
+
+
+class VirtualClock:
+    """
+    A clock for the pacer that does not wait: sleeping moves the clock forward instead.
+
+    Attributes:
+        time (float): The current time in seconds.
+    """
+
+    def __init__(self, start: float = 0.0):
+        self.time = start
+
+    def now(self) -> float:
+        return self.time
+
+    def sleep(self, seconds: float, cancel: threading.Event = None) -> bool:
+        """
+        Move the clock forward by the given number of seconds.
+
+        Returns:
+            bool: True if the cancel event was already set, in which case the clock does not move.
+        """
+        if cancel is not None and cancel.is_set():
+            return True
+
+        self.time += max(seconds, 0.0)
+        return False
+
+
+class SilentAudio:
+    """
+    A read only file of zero bytes, standing in for the audio of a song during a simulation.
+    """
+
+    def __init__(self, size: int, buffer: bytes):
+        self.size = size
+        self.position = 0
+        self.buffer = buffer
+
+    def read(self, size: int = -1) -> bytes:
+        remaining = self.size - self.position
+        size = remaining if size < 0 else min(size, remaining)
+        self.position += size
+        return self.buffer if size == len(self.buffer) else bytes(size)
+
+    def seek(self, position: int, whence: int = os.SEEK_SET) -> int:
+        if whence == os.SEEK_CUR:
+            position += self.position
+        elif whence == os.SEEK_END:
+            position += self.size
+
+        self.position = min(max(position, 0), self.size)
+        return self.position
+
+    def tell(self) -> int:
+        return self.position
+
+    def close(self) -> None:
+        pass
+
+
+class SilentOggAudio(SilentAudio):
+    """
+    A read only Ogg Vorbis file standing in for the audio of a song in an Ogg simulation: an identification header
+    page followed by one page of zero bytes per second.
+
+    Pages are built when they are read. They carry no checksum, the output of a simulation is discarded.
+    """
+
+    def __init__(self, duration: float, bitrate: int, sample_rate: int, channels: int, serial: int = 1):
+        identification = b"\x01vorbis" + struct.pack("<IBIiii", 0, channels, sample_rate, 0, bitrate * 1000, 0)
+        self.header = make_page(identification + b"\xb8\x01", serial, 0, 0, PAGE_BOS)
+        self.serial = serial
+        self.sample_rate = sample_rate
+        self.pages = max(int(round(duration)), 1)
+        self.body = bytes(min(bitrate * 125, 65025))
+        self.lacing = bytes([255] * (len(self.body) // 255) + [len(self.body) % 255])
+        self.page_length = 27 + len(self.lacing) + len(self.body)
+        super().__init__(len(self.header) + self.pages * self.page_length, b"")
+
+    def _page(self, index: int) -> bytes:
+        header_type = PAGE_EOS if index == self.pages - 1 else 0
+        return struct.pack("<4sBBqIIIB", b"OggS", 0, header_type, (index + 1) * self.sample_rate, self.serial,
+                           index + 1, 0, len(self.lacing)) + self.lacing + self.body
+
+    def read(self, size: int = -1) -> bytes:
+        end = self.size if size < 0 else min(self.position + size, self.size)
+        buffers = []
+
+        while self.position < end:
+            if self.position < len(self.header):
+                page, start = self.header, self.position
+            else:
+                index, start = divmod(self.position - len(self.header), self.page_length)
+                page = self._page(index)
+
+            buffer = page[start:start + end - self.position]
+            buffers.append(buffer)
+            self.position += len(buffer)
+
+        return b"".join(buffers)
+
+
+class SimulatedStream(Stream):
+    """
+    A stream that runs on a virtual clock against a NullOutput, so hours of programming finish in seconds.
+
+    Everything except the output, the clock and the audio data is the production code: the playlists, the jingle and
+    advertisement selection, the request intake and all callbacks. The audio of every song is replaced by silence of
+    the same length (zero bytes, or Ogg pages for an Ogg stream), songs that can't be probed are given
+    default_duration seconds. The clock only moves while audio is sent, so a run ends with an error when an item sends
+    no audio or no song can be streamed instead of looping forever.
+
+    Takes the same arguments as Stream, except for output.
+
+    Attributes:
+        clock (VirtualClock): The clock of the simulation, in seconds since the start of the run.
+        default_duration (float): The duration used for songs without a known duration.
+        memory_interval (float): The number of simulated seconds between two memory samples.
+    """
+
+    def __init__(self, *args, clock: VirtualClock = None, default_duration: float = 210.0,
+                 memory_interval: float = 3600.0, chunk_size: int = 1 << 20, **kwargs):
+        kwargs["output"] = NullOutput(on_send=self._on_send)
+        super().__init__(*args, **kwargs)
+
+        self.clock = clock or VirtualClock()
+        self.default_duration = default_duration
+        self.memory_interval = memory_interval
+        self.chunk_size = chunk_size
+        self.silence = bytes(chunk_size)
+        self.set_pacer(TokenBucketPacer(lead=0.0, burst=0.0, clock=self.clock))
+        self.set_history(PlayHistory(capacity=100000, clock=self.clock.now))
+        self.set_tracer(Tracer(service_name="simulation", max_spans=1000000))
+
+        self.end_time = 0.0
+        self.end_reached = False
+        self.next_memory_sample = 0.0
+        self.memory_samples = []
+        self.error = None
+
+    def _open_audio(self, song: Song) -> SilentAudio:
+        if not song.is_probed() and os.path.exists(song.get_filename()):
+            song.probe()
+
+        if song.get_duration() <= 0:
+            song.set_audio_info({
+                'duration': self.default_duration,
+                'bitrate': int(self.shout.audio_info[AUDIO_INFO_BITRATE]),
+                'sample_rate': int(self.shout.audio_info[AUDIO_INFO_SAMPLERATE]),
+                'channels': int(self.shout.audio_info[AUDIO_INFO_CHANNELS]),
+            })
+
+        if self.stream_format == "ogg":
+            return SilentOggAudio(song.get_duration(), song.get_bitrate(), song.get_sample_rate() or 44100,
+                                  song.get_channels() or 2)
+
+        size = int(song.get_duration() * song.get_bitrate() * 125)
+        return SilentAudio(size, self.silence)
+
+    def stream_audio(self, song: Song, offset: int = 0, kind: str = "song") -> None:
+        bytes_sent = self.shout.bytes_sent
+        super().stream_audio(song, offset, kind)
+
+        if self.shout.bytes_sent == bytes_sent and not self.force_stop:
+            self.error = f"The {kind} {song.get_filename()} sent no audio, the virtual clock can't move on."
+            self.stop()
+
+    def _wait_for_playable_songs(self) -> bool:
+        # Waiting does not move the virtual clock, end the run instead.
+        self.error = "No song of the playlist can be streamed."
+        self.stop()
+        return False
+
+    def _on_send(self, buffer: bytes) -> None:
+        now = self.clock.now()
+
+        if now >= self.next_memory_sample:
+            self.memory_samples.append((round(now, 3), tracemalloc.get_traced_memory()[0]))
+            self.next_memory_sample += self.memory_interval
+
+        if now >= self.end_time and self.has_started:
+            # Called while the send lock is held, stop() waits for the threads that may need it. Only ask the stream
+            # loop to end here, run() stops the stream once start() returned.
+            self.end_reached = True
+            self.force_stop = True
+
+    def run(self, duration: float = 86400.0, seed: int = None, top_allocations: int = 10) -> dict:
+        """
+        Run the stream until the given number of simulated seconds have been sent or the playlist ends.
+
+        Parameters:
+            duration (float, optional): The number of seconds to simulate, one day by default.
+            seed (int, optional): Seeds the random number generator used for the jingle and advertisement selection.
+            top_allocations (int, optional): The number of allocation sites with the most growth to report.
+
+        Returns:
+            dict: The report, see report().
+
+        Raises:
+            ValueError: If the playlist has no songs in the format of the stream.
+            RuntimeError: If an item sent no audio, for example a jingle in another format, or no song of the
+                playlist can be streamed.
+        """
+        if not self.current_playlist or not any(song.get_format() == self.stream_format
+                                                for song in self.current_playlist.get_all_songs()):
+            raise ValueError(f"The playlist has no {self.stream_format} songs.")
+
+        if seed is not None:
+            random.seed(seed)
+
+        self.error = None
+
+        tracing_memory = tracemalloc.is_tracing()
+        if not tracing_memory:
+            tracemalloc.start()
+
+        self.end_time = self.clock.now() + duration
+        self.next_memory_sample = self.clock.now()
+        self.memory_samples = []
+        start_snapshot = tracemalloc.take_snapshot()
+        started = time.perf_counter()
+
+        self.end_reached = False
+        self.start()
+        if self.end_reached:
+            self.stop()
+
+        wall_time = time.perf_counter() - started
+        end_snapshot = tracemalloc.take_snapshot()
+        self.memory_samples.append((round(self.clock.now(), 3), tracemalloc.get_traced_memory()[0]))
+        peak = tracemalloc.get_traced_memory()[1]
+
+        if not tracing_memory:
+            tracemalloc.stop()
+
+        if self.error:
+            raise RuntimeError(self.error)
+
+        # The spans and the history of the run itself grow by design, leave them out of the allocation sites.
+        filters = [tracemalloc.Filter(False, tracing.__file__), tracemalloc.Filter(False, history.__file__)]
+        growth = end_snapshot.filter_traces(filters).compare_to(start_snapshot.filter_traces(filters), "lineno")
+        growth = growth[:top_allocations]
+        return self.report(wall_time, peak, [str(stat) for stat in growth])
+
+    def report(self, wall_time: float, peak_memory: int, growth: list) -> dict:
+        """
+        Summarize the last run.
+
+        Returns:
+            dict: The simulated and the real time, the number of items per kind, the programme log (oldest first),
+                the real time spent per traced phase (callbacks, metadata updates, ...) in milliseconds and the
+                memory use over time.
+        """
+        programme = list(reversed(self.history.get_recent(count=len(self.history), kinds=None)))
+        kinds = {}
+        for event in programme:
+            kinds[event['kind']] = kinds.get(event['kind'], 0) + 1
+
+        timings = {}
+        for span in self.tracer.get_spans():
+            elapsed = (span.end - span.start) / 1e6
+            timing = timings.setdefault(span.name, {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+            timing['count'] += 1
+            timing['total_ms'] += elapsed
+            timing['max_ms'] = max(timing['max_ms'], elapsed)
+
+        for timing in timings.values():
+            timing['mean_ms'] = timing['total_ms'] / timing['count']
+
+        samples = self.memory_samples
+        return {
+            'simulated_seconds': self.clock.now(),
+            'wall_seconds': wall_time,
+            'speedup': self.clock.now() / wall_time if wall_time else 0.0,
+            'items': kinds,
+            'programme': programme,
+            'timings': timings,
+            'memory': {
+                'samples': samples,
+                'start': samples[0][1] if samples else 0,
+                'end': samples[-1][1] if samples else 0,
+                'growth': samples[-1][1] - samples[0][1] if samples else 0,
+                'peak': peak_memory,
+                'top_growth': growth,
+            },
+        }
@@ -0,0 +1,221 @@
+import mmap
+import os
+import struct
+from array import array
+from collections.abc import MutableSequence
+
+from .song import Song
+
+MAGIC = b"SBPL"
+VERSION = 1
+
+FLAG_LOOP = 0x1
+FLAG_REMOVE_FORCED_SONG = 0x2
+
+# magic, version, flags, song count, string count, current index, last current index, forced next song (-1 for none)
+HEADER = struct.Struct("<4sHHIIIIi")
+
+# One column of 4 byte values per field, in this order. String fields hold an index into the string table.
+COLUMNS = ("directory", "basename", "name", "artist", "requested_by", "duration", "bitrate", "sample_rate",
+           "channels")
+STRING_COLUMNS = ("directory", "basename", "name", "artist", "requested_by")
+
+
+def write_snapshot(playlist, path: str) -> None:
+    """
+    Write the songs, order, position and loop state of a playlist to a binary snapshot.
+
+    The file starts with a fixed header followed by one packed column per song field and a string table holding
+    every distinct string once. Directories are stored separately from file names so a library in a few
+    directories costs little more than its file names. The file is replaced atomically, a snapshot that is memory
+    mapped by a PlaylistSnapshot keeps its old contents.
+
+    Parameters:
+        playlist (Playlist): The playlist to write.
+        path (str): The path of the snapshot file.
+
+    Returns:
+        None
+    """
+    strings = {}
+
+    def intern(value: str) -> int:
+        index = strings.get(value)
+        if index is None:
+            index = strings[value] = len(strings)
+        return index
+
+    with playlist.lock:
+        songs = playlist.get_all_songs()
+        count = len(songs)
+        columns = {name: array("f" if name == "duration" else "I") for name in COLUMNS}
+
+        for song in songs:
+            file = song.get_filename()
+            split = file.rfind("/") + 1
+            columns["directory"].append(intern(file[:split]))
+            columns["basename"].append(intern(file[split:]))
+            columns["name"].append(intern(song.get_song_name()))
+            columns["artist"].append(intern(song.get_artist()))
+            columns["requested_by"].append(intern(song.get_requested_by()))
+            columns["duration"].append(song.get_duration())
+            columns["bitrate"].append(song.get_bitrate())
+            columns["sample_rate"].append(song.get_sample_rate())
+            columns["channels"].append(song.get_channels())
+
+        flags = (FLAG_LOOP if playlist.loop_playlist else 0) | \
+                (FLAG_REMOVE_FORCED_SONG if playlist.remove_forced_song else 0)
+        forced = playlist.forced_next_song if playlist.forced_next_song is not None else -1
+        header = HEADER.pack(MAGIC, VERSION, flags, count, len(strings), playlist.current_index,
+                             playlist.last_current_index, forced)
+
+    blob = bytearray()
+    offsets = array("I", [0])
+    for value in strings:
+        blob += value.encode("utf-8")
+        offsets.append(len(blob))
+
+    temp_path = path + ".tmp"
+    with open(temp_path, "wb") as fp:
+        fp.write(header)
+        for name in COLUMNS:
+            fp.write(columns[name].tobytes())
+        fp.write(offsets.tobytes())
+        fp.write(blob)
+        fp.flush()
+        os.fsync(fp.fileno())
+
+    os.replace(temp_path, path)
+
+
+class PlaylistSnapshot:
+    """
+    A memory mapped, read only view of a snapshot written by write_snapshot().
+
+    Opening a snapshot only reads the header, songs are decoded on access.
+
+    Attributes:
+        count (int): The number of songs.
+        current_index (int): The stored current index.
+        last_current_index (int): The stored previous index.
+        forced_next_song (int or None): The stored index of the forced song.
+        loop (bool): The stored loop setting.
+        remove_forced_song (bool): Whether the forced song is removed after playing.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as fp:
+            self.map = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, flags, count, string_count, current, last, forced = HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC or version != VERSION:
+            self.map.close()
+            raise ValueError(f"Invalid playlist snapshot {path}")
+
+        self.count = count
+        self.current_index = current
+        self.last_current_index = last
+        self.forced_next_song = forced if forced >= 0 else None
+        self.loop = bool(flags & FLAG_LOOP)
+        self.remove_forced_song = bool(flags & FLAG_REMOVE_FORCED_SONG)
+
+        view = memoryview(self.map)
+        position = HEADER.size
+        self.columns = {}
+        for name in COLUMNS:
+            self.columns[name] = view[position:position + count * 4].cast("f" if name == "duration" else "I")
+            position += count * 4
+
+        self.string_offsets = view[position:position + (string_count + 1) * 4].cast("I")
+        self.strings_start = position + (string_count + 1) * 4
+        self.strings = {}
+
+    def get_string(self, index: int) -> str:
+        value = self.strings.get(index)
+        if value is None:
+            start = self.strings_start + self.string_offsets[index]
+            end = self.strings_start + self.string_offsets[index + 1]
+            value = self.strings[index] = self.map[start:end].decode("utf-8")
+        return value
+
+    def get_song(self, row: int) -> Song:
+        """
+        Decode the song stored at the given row.
+        """
+        strings = {name: self.get_string(self.columns[name][row]) for name in STRING_COLUMNS}
+        song = Song(
+            file=strings["directory"] + strings["basename"],
+            song_name=strings["name"],
+            song_artist=strings["artist"],
+            song_requested_by=strings["requested_by"],
+        )
+
+        if self.columns["sample_rate"][row]:
+            song.set_audio_info({
+                'duration': self.columns["duration"][row],
+                'bitrate': self.columns["bitrate"][row],
+                'sample_rate': self.columns["sample_rate"][row],
+                'channels': self.columns["channels"][row],
+            })
+
+        return song
+
+
+class SnapshotSongs(MutableSequence):
+    """
+    A list of songs backed by a PlaylistSnapshot.
+
+    Songs are created the first time they are accessed and then kept, so the same Song object is returned on
+    every access. The list only becomes a regular list of rows and songs once it is modified.
+    """
+
+    def __init__(self, snapshot: PlaylistSnapshot):
+        self.snapshot = snapshot
+        self.songs = {}
+        self.items = None
+
+    def _song(self, row: int) -> Song:
+        song = self.songs.get(row)
+        if song is None:
+            song = self.songs[row] = self.snapshot.get_song(row)
+        return song
+
+    def _materialize(self) -> list:
+        if self.items is None:
+            self.items = list(range(self.snapshot.count))
+            for row, song in self.songs.items():
+                self.items[row] = song
+        return self.items
+
+    def __len__(self) -> int:
+        return self.snapshot.count if self.items is None else len(self.items)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+
+        if self.items is None:
+            if index < 0:
+                index += self.snapshot.count
+            if not 0 <= index < self.snapshot.count:
+                raise IndexError("list index out of range")
+            return self._song(index)
+
+        item = self.items[index]
+        if isinstance(item, int):
+            item = self.items[index] = self._song(item)
+        return item
+
+    def __setitem__(self, index, value) -> None:
+        self._materialize()[index] = value
+
+    def __delitem__(self, index) -> None:
+        del self._materialize()[index]
+
+    def insert(self, index: int, value: Song) -> None:
+        self._materialize().insert(index, value)
+
+    def index(self, value, start: int = 0, stop: int = None) -> int:
+        # Only songs that were accessed can be in the list, no need to decode the others while searching.
+        return self._materialize().index(value, start, len(self.items) if stop is None else stop)
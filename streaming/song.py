@@ -1,4 +1,8 @@
 import os
+from .parsers.mp3 import MP3
+from .parsers.ogg import Ogg
+
+OGG_EXTENSIONS = (".ogg", ".oga", ".opus")
 
 
 class Song:
@@ -11,6 +15,10 @@ class Song:
         is_stopped (bool): Whether the song is currently stopped.
         file (str): The path to the song file.
         basename (str): The filename of the song file.
+        duration (float): The length of the song in seconds, 0 until the song has been probed.
+        bitrate (int): The (average) bitrate in kbps, 0 until the song has been probed.
+        sample_rate (int): The sample rate in Hz, 0 until the song has been probed.
+        channels (int): The number of audio channels, 0 until the song has been probed.
     """
 
     def __init__(self, file: str, song_name: str = "", song_artist: str = "", song_requested_by: str = ""):
@@ -22,12 +30,48 @@ class Song:
         self.basename = os.path.basename(self.file)
         self.song_name = song_name
         self.artist = song_artist
+        self.duration = 0.0
+        self.bitrate = 0
+        self.sample_rate = 0
+        self.channels = 0
 
         if len(song_name) == 0:
             name: str = self.basename.split("/")[-1].split(".")
             name = (".".join(name[:len(name) - 1]).replace("_", " ").replace("-", " - "))
             self.set_song_name(name)
 
+    def to_dict(self) -> dict:
+        """
+        Returns the fields needed to recreate the song with from_dict().
+
+        Returns:
+            dict: The file, song name, artist and requester of the song.
+        """
+        return {
+            'file': self.file,
+            'name': self.song_name,
+            'artist': self.artist,
+            'requested_by': self.requested_by,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'Song':
+        """
+        Create a song from a dictionary created by to_dict().
+
+        Parameters:
+            data (dict): The song fields.
+
+        Returns:
+            Song: The new song.
+        """
+        return cls(
+            file=data['file'],
+            song_name=data.get('name', ""),
+            song_artist=data.get('artist', ""),
+            song_requested_by=data.get('requested_by', ""),
+        )
+
     def is_request(self):
         """
 
@@ -129,3 +173,108 @@ class Song:
             str: The artist of the current instance.
         """
         return self.artist
+
+    def get_format(self) -> str:
+        """
+        Get the container format of the song file, based on its extension.
+
+        Returns:
+            str: "ogg" for Ogg Vorbis and Ogg Opus files, "mp3" otherwise.
+        """
+        if os.path.splitext(self.file)[1].lower() in OGG_EXTENSIONS:
+            return "ogg"
+
+        return "mp3"
+
+    def probe(self) -> dict:
+        """
+        Read the format information from the headers of the song file.
+
+        Only the first (and for Ogg the last) few KB of the file are read, see parsers.mp3.MP3 and parsers.ogg.Ogg.
+
+        Returns:
+            dict: The format information that was applied to the song.
+        """
+        info = Ogg(self.file).data if self.get_format() == "ogg" else MP3(self.file).data
+        self.set_audio_info(info)
+        return info
+
+    def set_audio_info(self, info: dict) -> None:
+        """
+        Apply previously probed format information to the song.
+
+        Parameters:
+            info (dict): A record as returned by probe().
+
+        Returns:
+            None
+        """
+        self.duration = info.get('duration', 0.0)
+        self.bitrate = info.get('bitrate', 0)
+        self.sample_rate = info.get('sample_rate', 0)
+        self.channels = info.get('channels', 0)
+
+    def is_probed(self) -> bool:
+        """
+        Check if the format information of the song is known.
+
+        Returns:
+            bool: True if the song has been probed successfully, False otherwise.
+        """
+        return self.sample_rate > 0
+
+    def get_duration(self) -> float:
+        """
+        Get the length of the song in seconds.
+
+        Returns:
+            float: The duration or 0.0 if unknown.
+        """
+        return self.duration
+
+    def get_bitrate(self) -> int:
+        """
+        Get the (average) bitrate of the song in kbps.
+
+        Returns:
+            int: The bitrate or 0 if unknown.
+        """
+        return self.bitrate
+
+    def get_sample_rate(self) -> int:
+        """
+        Get the sample rate of the song in Hz.
+
+        Returns:
+            int: The sample rate or 0 if unknown.
+        """
+        return self.sample_rate
+
+    def get_channels(self) -> int:
+        """
+        Get the number of audio channels of the song.
+
+        Returns:
+            int: The number of channels or 0 if unknown.
+        """
+        return self.channels
+
+    def matches_audio_info(self, bitrate: int, sample_rate: int, channels: int) -> bool:
+        """
+        Check if the song matches the format announced to the streaming server.
+
+        Parameters:
+            bitrate (int): The announced bitrate in kbps, 0 to ignore the bitrate.
+            sample_rate (int): The announced sample rate in Hz.
+            channels (int): The announced number of channels.
+
+        Returns:
+            bool: True if the song matches, False otherwise. Songs that are not probed never match.
+        """
+        if not self.is_probed():
+            return False
+
+        if bitrate and self.bitrate != bitrate:
+            return False
+
+        return self.sample_rate == sample_rate and self.channels == channels
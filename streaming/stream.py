@@ -1,9 +1,34 @@
+from __future__ import annotations
+
+import os
 import threading
+import time
+from collections import deque
+from contextlib import ExitStack, nullcontext
 
-import shout
 import random
+from .metadata import MetadataUpdater
+from .outputs import AUDIO_INFO_BITRATE, AUDIO_INFO_CHANNELS, AUDIO_INFO_SAMPLERATE
+from .parsers.mp3 import MAX_FRAME_LENGTH, find_frame, last_frame_end
+from .parsers.ogg import PAGE_BOS, PAGE_EOS, identify, make_page, read_page, set_page_serial
 from .song import Song
-from typing import Callable
+from typing import TYPE_CHECKING, Callable
+
+if TYPE_CHECKING:
+    # Only needed for annotations, the optional features are imported by the code that uses them.
+    from .audiocache import AudioCache
+    from .checkpoint import Checkpoint
+    from .history import PlayHistory
+    from .integrity import IntegrityIndex
+    from .intake import RequestIntake
+    from .pacing import TokenBucketPacer
+    from .profiler import SamplingProfiler
+    from .tracing import Tracer
+    from .trim import TrimIndex
+    from .watchdog import UnderrunWatchdog
+
+# The most items get_upcoming() looks ahead, the break numbers drawn for them are kept until they are used.
+MAX_UPCOMING = 50
 
 
 class Stream:
@@ -19,24 +44,40 @@ class Stream:
             stream_host,
             stream_port,
             stream_password,
+            output=None,
+            stream_format="mp3",
+            metadata_output=None,
     ):
-        self.shout = shout.Shout()
-        self.shout.audio_info = {
-            shout.SHOUT_AI_BITRATE: "128",
-            shout.SHOUT_AI_SAMPLERATE: "44100",
-            shout.SHOUT_AI_CHANNELS: "2",
-        }
-        self.shout.format = "mp3"  # using mp3 but it can also be ogg vorbis
-        self.shout.genre = genre
-        self.shout.host = stream_host
-        self.shout.port = int(stream_port)
-        self.shout.password = stream_password
-        self.shout.mount = mount_point
-
-        self.shout.name = name
-        self.shout.url = station_url
+        if output is None:
+            import shout
+            output = shout.Shout()
+
+            # Metadata updates are HTTP requests to the admin interface, they get their own connection so a slow
+            # update never holds up the audio.
+            if metadata_output is None:
+                metadata_output = shout.Shout()
+
+        self.shout = output
+        self.metadata_output = metadata_output or output
+        self.stream_format = stream_format
         self.music_directory = music_directory
-        self.shout.description = description
+
+        for connection in (self.shout, self.metadata_output):
+            connection.audio_info = {
+                AUDIO_INFO_BITRATE: "128",
+                AUDIO_INFO_SAMPLERATE: "44100",
+                AUDIO_INFO_CHANNELS: "2",
+            }
+            connection.format = stream_format  # mp3 or ogg (Vorbis and Opus)
+            connection.genre = genre
+            connection.host = stream_host
+            connection.port = int(stream_port)
+            connection.password = stream_password
+            connection.mount = mount_point
+
+            connection.name = name
+            connection.url = station_url
+            connection.description = description
 
         self.current_playlist = None
         self.current_jingles = None
@@ -45,10 +86,34 @@ class Stream:
         self.jingle_or_advertisement_chance = 40
         self.jingle_chance = 20
         self.advertisement_chance = 10
-        self.force_next = False
-        self.force_stop = False
+        self.skip_event = threading.Event()
+        self.stop_event = threading.Event()
+        self.interrupt_event = threading.Event()
+        self.chunk_size = 8192
+        self.last_ogg_serials = set()
         self.announce_songs = False
         self.has_started = False
+        self.checkpoint = None
+        self.resume_from_checkpoint = False
+        self.current_kind = None
+        self.send_lock = threading.Lock()
+        self.metadata = MetadataUpdater(self.metadata_output)
+        self.pacer = None
+        self.request_intake = None
+        self.history = None
+        self.tracer = None
+        self.profiler = None
+        self.thread_id = None
+        self.pending_playlist = None
+        self.swap_lock = threading.Lock()
+        self.swap_timeout = 10.0
+        self.unplayable_delay = 5.0
+        self.watchdog = None
+        self.trim_index = None
+        self.integrity_index = None
+        self.audio_cache = None
+        self.break_rolls = deque()
+        self.break_lock = threading.Lock()
 
         self.callbacks = {
             "nextsong": [],
@@ -60,6 +125,40 @@ class Stream:
             "stream_ended": None
         }
 
+    @property
+    def force_next(self) -> bool:
+        """
+        True while a skip of the current item is pending.
+        """
+        return self.skip_event.is_set()
+
+    @force_next.setter
+    def force_next(self, value: bool) -> None:
+        if value:
+            self.skip_event.set()
+            self.interrupt_event.set()
+        else:
+            self.skip_event.clear()
+            if not self.stop_event.is_set():
+                self.interrupt_event.clear()
+
+    @property
+    def force_stop(self) -> bool:
+        """
+        True while a stop of the stream is pending.
+        """
+        return self.stop_event.is_set()
+
+    @force_stop.setter
+    def force_stop(self, value: bool) -> None:
+        if value:
+            self.stop_event.set()
+            self.interrupt_event.set()
+        else:
+            self.stop_event.clear()
+            if not self.skip_event.is_set():
+                self.interrupt_event.clear()
+
     def __enter__(self):
         return self
 
@@ -246,7 +345,7 @@ class Stream:
 
         callback = self.callbacks["prepare_next_announcement"]
         if callable(callback):
-            song = self.current_playlist.get_next_song()
+            song = self.current_playlist.get_next_song(self.is_playable)
             if song:
                 thread = threading.Thread(target=callback, args=(song,))
                 thread.start()
@@ -311,10 +410,133 @@ class Stream:
 
         return None
 
+    def _roll_break(self) -> int:
+        return random.randrange(1, 100 - self.jingle_or_advertisement_chance, 1)
+
+    def _take_break_roll(self) -> int:
+        """
+        Returns the random number that decides the break after the current song.
+
+        Numbers drawn ahead of time by get_upcoming() are used first, so the lookahead matches what plays.
+        """
+        with self.break_lock:
+            if self.break_rolls:
+                return self.break_rolls.popleft()
+
+        return self._roll_break()
+
+    def _get_break_kind(self, rng: int) -> str or None:
+        """
+        Returns the kind of item (jingle or advertisement) played after a song for the given random number, None
+        for no break.
+        """
+        if rng < self.jingle_or_advertisement_chance:
+            return None
+
+        delta = (100 - self.jingle_or_advertisement_chance)
+
+        if self.current_jingles and self.jingle_chance <= delta and len(self.current_jingles.get_all_songs()) > 0:
+            return "jingle"
+
+        if (self.current_advertisements and self.advertisement_chance <= delta
+                and len(self.current_advertisements.get_all_songs()) > 0):
+            return "advertisement"
+
+        return None
+
+    def get_upcoming(self, count: int = 5) -> list[tuple]:
+        """
+        Returns the items that will play after the current item, without changing the stream or its playlists.
+
+        Songs come from Playlist.get_upcoming_songs(), including the requests the request intake did not hand to
+        the playlist yet. The random numbers deciding the jingles and advertisements between the songs are drawn
+        ahead of time and kept, so the stream plays exactly the breaks that are returned. Songs, jingles and
+        advertisements that can't be streamed (see is_playable()) are left out like the stream skips them.
+        Announcements (created by callbacks) and scheduled playlist swaps are not included.
+
+        Parameters:
+            count (int, optional): The maximum number of items to return, at most MAX_UPCOMING.
+
+        Returns:
+            list[tuple]: (kind, song) tuples, the kind is song, jingle or advertisement.
+        """
+        playlist = self.current_playlist
+        if not playlist or not playlist.get_all_songs() or count < 1:
+            return []
+
+        count = min(count, MAX_UPCOMING)
+
+        pending = []
+        if self.request_intake:
+            with self.request_intake.lock:
+                pending = [(song, self.request_intake.remove_after) for song in self.request_intake.pending]
+
+        songs = playlist.get_upcoming_songs(count, pending, self.is_playable)
+
+        rotations = {}
+        for kind, rotation in (("jingle", self.current_jingles), ("advertisement", self.current_advertisements)):
+            with rotation.lock if rotation else nullcontext():
+                if rotation and rotation.get_all_songs():
+                    rotations[kind] = [rotation.get_current_song()] + rotation.get_upcoming_songs(count)
+
+                    # The rotation moves on after the item is played.
+                    if self.current_kind == kind:
+                        rotations[kind].pop(0)
+
+        with self.break_lock:
+            while len(self.break_rolls) < count + 1:
+                self.break_rolls.append(self._roll_break())
+            rolls = list(self.break_rolls)
+
+        items = []
+        used = {"jingle": 0, "advertisement": 0}
+
+        if self.current_kind in (None, "announcement") and self.is_playable(playlist.get_current_song()):
+            # The current song did not start yet.
+            items.append(("song", playlist.get_current_song()))
+
+        at_boundary = self.current_kind not in ("jingle", "advertisement")
+        while len(items) < count:
+            if at_boundary:
+                kind = self._get_break_kind(rolls.pop(0)) if rolls else None
+                if kind and used[kind] < len(rotations.get(kind, ())):
+                    # An item that can't be streamed is skipped, but the rotation still moves on.
+                    song = rotations[kind][used[kind]]
+                    used[kind] += 1
+                    if self.is_playable(song):
+                        items.append((kind, song))
+
+            if not songs:
+                break
+
+            items.append(("song", songs.pop(0)))
+            at_boundary = True
+
+        return items[:count]
+
+    def get_audio_info(self) -> dict:
+        """
+        Returns the audio format announced to the streaming server.
+
+        The keys match the arguments of Playlist.get_mismatched_songs() so files that do not match the stream can be
+        flagged with playlist.get_mismatched_songs(**stream.get_audio_info()).
+
+        Returns:
+            dict: The bitrate (kbps), sample_rate (Hz) and channels.
+        """
+        return {
+            "bitrate": int(self.shout.audio_info[AUDIO_INFO_BITRATE]),
+            "sample_rate": int(self.shout.audio_info[AUDIO_INFO_SAMPLERATE]),
+            "channels": int(self.shout.audio_info[AUDIO_INFO_CHANNELS]),
+        }
+
     def set_playlist(self, playlist) -> None:
         """
         Set the current playlist.
 
+        While the stream is running the playlist takes over at the next track boundary without closing the
+        connection, see schedule_playlist().
+
         Parameters:
             playlist (Playlist): The playlist to be set.
 
@@ -322,10 +544,140 @@ class Stream:
             None
 
         """
+        if self.has_started:
+            self.schedule_playlist(playlist)
+            return
+
         self.stop(False)
         self.force_stop = False
         self.current_playlist = playlist
 
+    def schedule_playlist(self, playlist, at: float = None, interrupt: bool = False) -> None:
+        """
+        Switch to another playlist while the stream keeps running.
+
+        The playlist is prepared in the background: it waits for the first song if the playlist is still loading,
+        probes that song and reads its first chunks so it starts without delay. The playlist then takes over at the
+        first track boundary after the given time. The connection to the server stays open. Scheduling another
+        playlist replaces a swap that did not happen yet.
+
+        Parameters:
+            playlist (Playlist): The playlist to switch to.
+            at (float, optional): The wall clock time (time.time()) to switch at, None switches at the next track
+                boundary.
+            interrupt (bool, optional): End the item that is playing at the given time instead of waiting for it to
+                finish.
+
+        Returns:
+            None
+        """
+        pending = {
+            "playlist": playlist,
+            "at": at,
+            "ready": threading.Event(),
+            "timer": None,
+        }
+
+        with self.swap_lock:
+            if self.pending_playlist and self.pending_playlist["timer"]:
+                self.pending_playlist["timer"].cancel()
+            self.pending_playlist = pending
+
+        threading.Thread(target=self._preload_playlist, args=(pending,), daemon=True).start()
+
+        if at is not None and interrupt:
+            pending["timer"] = threading.Timer(max(at - time.time(), 0.0), self._interrupt_for_swap, (pending,))
+            pending["timer"].daemon = True
+            pending["timer"].start()
+
+    def _preload_playlist(self, pending: dict) -> None:
+        playlist = pending["playlist"]
+
+        try:
+            if playlist.wait_for_songs(playlist.start_playing_at + 1):
+                song = playlist.get_all_songs()[playlist.start_playing_at]
+                if song.get_format() == self.stream_format:
+                    if not song.is_probed():
+                        song.probe()
+
+                    # Warm the cache with the start of the first song.
+                    audio = self._open_audio(song, prefetch=True)
+                    try:
+                        audio.read(self.chunk_size * 4)
+                    finally:
+                        audio.close()
+        except OSError:
+            pass
+
+        pending["ready"].set()
+
+    def _interrupt_for_swap(self, pending: dict) -> None:
+        with self.swap_lock:
+            if self.pending_playlist is not pending:
+                return
+
+        pending["ready"].wait()
+        self.force_next = True
+
+    def _swap_playlist(self, ended: bool = False) -> bool:
+        """
+        Switch to the scheduled playlist if it is prepared and its time has come.
+
+        Requests that did not play yet move to the new playlist and play after its first song. If the current
+        playlist ended the scheduled playlist takes over as soon as it is prepared, when that takes longer than
+        swap_timeout seconds the current playlist starts over and the swap happens at a later track boundary.
+
+        Parameters:
+            ended (bool, optional): True if the current playlist ended, the scheduled playlist then takes over right
+                away.
+
+        Returns:
+            bool: True if the playlist was switched.
+        """
+        with self.swap_lock:
+            pending = self.pending_playlist
+            if pending is None:
+                return False
+
+            if not ended:
+                if pending["at"] is not None and time.time() < pending["at"]:
+                    return False
+                if not pending["ready"].is_set():
+                    return False
+
+            self.pending_playlist = None
+
+        if not pending["ready"].wait(self.swap_timeout):
+            with self.swap_lock:
+                if self.pending_playlist is None:
+                    self.pending_playlist = pending
+
+            self.current_playlist.start_playing()
+            return False
+
+        if pending["timer"]:
+            pending["timer"].cancel()
+
+        playlist = pending["playlist"]
+        if not playlist.get_all_songs():
+            return False
+
+        with self._span("swap_playlist"):
+            with self.current_playlist.lock:
+                if not ended:
+                    # The forced song that just played is done, the next request becomes the forced song.
+                    self.current_playlist.restore_current_index()
+                requests = self.current_playlist.take_requests()
+
+            self.current_playlist.stop_playing()
+            playlist.start_playing()
+            for song, remove_after in requests:
+                playlist.add_song_and_play_next(song, remove_after)
+
+            self.current_playlist = playlist
+
+        return True
+
     def set_advertisements(self, advertisements) -> None:
         """
         Sets the list of advertisements for the current instance.
@@ -337,8 +689,14 @@ class Stream:
             None
 
         """
+        if self.audio_cache and self.current_advertisements and self.current_advertisements is not advertisements:
+            self.audio_cache.unpin(self.current_advertisements)
+
         self.current_advertisements = advertisements
 
+        if self.audio_cache and advertisements:
+            self.audio_cache.pin(advertisements)
+
     def set_jingles(self, jingles) -> None:
         """
         Set the jingles for the current object.
@@ -350,8 +708,334 @@ class Stream:
             None
 
         """
+        if self.audio_cache and self.current_jingles and self.current_jingles is not jingles:
+            self.audio_cache.unpin(self.current_jingles)
+
         self.current_jingles = jingles
 
+        if self.audio_cache and jingles:
+            self.audio_cache.pin(jingles)
+
+    def set_checkpoint(self, checkpoint: Checkpoint, resume: bool = True) -> None:
+        """
+        Set the checkpoint used to persist the playback position.
+
+        Parameters:
+            checkpoint (Checkpoint): The checkpoint to write to.
+            resume (bool, optional): If True the next start() continues from the stored checkpoint, including the
+                byte offset within the song that was playing.
+
+        Returns:
+            None
+
+        """
+        self.checkpoint = checkpoint
+        self.resume_from_checkpoint = resume
+
+    def _checkpoint_boundary(self, kind: str) -> None:
+        """
+        Hand the playback position to the checkpoint at the start of a new item.
+
+        Parameters:
+            kind (str): The kind of item that is about to be streamed (song, announcement, jingle or advertisement).
+
+        Returns:
+            None
+        """
+        self.current_kind = kind
+        if not self.checkpoint:
+            return
+
+        self.checkpoint.update({
+            "kind": kind,
+            "file": self.current_song.get_filename() if self.current_song else None,
+            "playlist": self.current_playlist.get_state(),
+            "jingles": self.current_jingles.get_state() if self.current_jingles else None,
+            "advertisements": self.current_advertisements.get_state() if self.current_advertisements else None,
+        })
+
+    def _restore_checkpoint(self) -> int:
+        """
+        Restore the playback position stored in the checkpoint.
+
+        Songs resume at the stored byte offset. If a jingle or an advertisement was playing the playlist
+        continues with the next song, an interrupted announcement is skipped.
+
+        Returns:
+            int: The byte offset to start the current song at.
+        """
+        if not self.checkpoint or not self.resume_from_checkpoint:
+            return 0
+
+        state = self.checkpoint.load()
+        if not state or not state.get("playlist"):
+            return 0
+
+        if self.current_jingles and self._state_matches(self.current_jingles, state.get("jingles")):
+            self.current_jingles.set_state(state["jingles"])
+
+        if self.current_advertisements and self._state_matches(self.current_advertisements,
+                                                               state.get("advertisements")):
+            self.current_advertisements.set_state(state["advertisements"])
+
+        # The checkpoint belongs to another playlist, for example one that was scheduled before the restart.
+        if not self._state_matches(self.current_playlist, state["playlist"]):
+            return 0
+
+        # The stored indexes refer to the sorted library, only the songs up to them have to be loaded. The rest
+        # of the library keeps loading in the background.
+        # A forced song that is playing is added again by set_state().
+        playlist_state = state["playlist"]
+        indexes = [playlist_state.get("last_current_index", 0)]
+        if playlist_state.get("current_index") != playlist_state.get("forced_next_song"):
+            indexes.append(playlist_state.get("current_index", 0))
+
+        self.current_playlist.wait_for_songs(max(indexes) + 1)
+
+        self.current_playlist.set_state(state["playlist"])
+
+        if state.get("kind") in ("jingle", "advertisement"):
+            # The rotation state was stored before the item played, move on like the stream loop does afterwards.
+            rotation = self.current_jingles if state["kind"] == "jingle" else self.current_advertisements
+            if rotation and self._state_matches(rotation, state.get(state["kind"] + "s")):
+                rotation.next_song()
+
+            self.current_playlist.next_song()
+            return 0
+
+        if state.get("kind") == "song" and state.get("file") == self.current_playlist.get_current_song().get_filename():
+            return state.get("offset", 0)
+
+        return 0
+
+    @staticmethod
+    def _state_matches(playlist, state: dict or None) -> bool:
+        """
+        Check if a stored playlist state belongs to the given playlist.
+
+        States without a name (stored by older versions) and playlists without a name always match.
+
+        Parameters:
+            playlist (Playlist): The playlist to apply the state to.
+            state (dict or None): The state created by Playlist.get_state().
+
+        Returns:
+            bool: True if the state can be applied to the playlist.
+        """
+        if not state:
+            return False
+
+        return state.get("name") is None or playlist.name is None or state["name"] == playlist.name
+
+    def set_request_intake(self, intake: RequestIntake) -> None:
+        """
+        Set the intake that accepts song requests and skips from other threads.
+
+        Pending requests are added to the current playlist at every song boundary.
+
+        Parameters:
+            intake (RequestIntake): The request intake.
+
+        Returns:
+            None
+
+        """
+        intake.stream = self
+        self.request_intake = intake
+
+    def set_history(self, history: PlayHistory) -> None:
+        """
+        Set the history that records every item that airs.
+
+        Parameters:
+            history (PlayHistory): The play history.
+
+        Returns:
+            None
+
+        """
+        self.history = history
+
+    def _flush_requests(self) -> None:
+        """
+        Hand the pending requests of the request intake to the current playlist.
+        """
+        if self.request_intake:
+            self.request_intake.flush(self.current_playlist)
+
+    def set_pacer(self, pacer: TokenBucketPacer or None) -> None:
+        """
+        Set the pacer used to send audio in real time.
+
+        Parameters:
+            pacer (TokenBucketPacer or None): The pacer to use, None falls back to the pacing of libshout (sync()).
+
+        Returns:
+            None
+
+        """
+        self.pacer = pacer
+
+    def set_tracer(self, tracer: Tracer or None) -> None:
+        """
+        Set the tracer that records a span for each phase of every item, None turns tracing off.
+
+        Parameters:
+            tracer (Tracer or None): The tracer to use.
+
+        Returns:
+            None
+
+        """
+        self.tracer = tracer
+        self.metadata.tracer = tracer
+
+    def set_trim_index(self, trim_index: TrimIndex or None) -> None:
+        """
+        Set the index used to skip the leading and trailing silence of MP3 songs, None plays the complete files.
+
+        Parameters:
+            trim_index (TrimIndex or None): The index, built with TrimIndex.build().
+
+        Returns:
+            None
+
+        """
+        self.trim_index = trim_index
+
+    def set_audio_cache(self, audio_cache: AudioCache or None) -> None:
+        """
+        Set the in-memory cache audio is played from. The jingles and advertisements are pinned in the cache.
+
+        Parameters:
+            audio_cache (AudioCache or None): The cache, None reads every file from disk.
+
+        Returns:
+            None
+
+        """
+        self.audio_cache = audio_cache
+
+        if audio_cache:
+            for playlist in (self.current_jingles, self.current_advertisements):
+                if playlist:
+                    audio_cache.pin(playlist)
+
+    def set_integrity_index(self, integrity_index: IntegrityIndex or None) -> None:
+        """
+        Set the result of a library scan. Quarantined songs are skipped and only the valid ranges of damaged songs
+        are sent.
+
+        Parameters:
+            integrity_index (IntegrityIndex or None): The index, built with IntegrityIndex.scan().
+
+        Returns:
+            None
+
+        """
+        self.integrity_index = integrity_index
+
+    def set_watchdog(self, watchdog: UnderrunWatchdog or None) -> None:
+        """
+        Set the watchdog that sends filler when the stream loop stalls, None turns it off.
+
+        Parameters:
+            watchdog (UnderrunWatchdog or None): The watchdog to use.
+
+        Returns:
+            None
+
+        """
+        if self.watchdog:
+            self.watchdog.stop()
+
+        self.watchdog = watchdog
+        if watchdog:
+            watchdog.stream = self
+            if self.has_started:
+                watchdog.start()
+
+    def _span(self, name: str, **attributes):
+        if self.tracer is None:
+            return nullcontext()
+
+        return self.tracer.span(name, **attributes)
+
+    def start_profiler(self, interval: float = 0.005) -> SamplingProfiler:
+        """
+        Start sampling the stack of the audio thread, can be used while the stream is running.
+
+        Parameters:
+            interval (float, optional): The time between two samples in seconds.
+
+        Returns:
+            SamplingProfiler: The running profiler.
+
+        Raises:
+            RuntimeError: If the stream is not running.
+            ValueError: If the interval is shorter than profiler.MIN_INTERVAL.
+        """
+        from .profiler import MIN_INTERVAL, SamplingProfiler
+
+        if not MIN_INTERVAL <= interval < float("inf"):
+            raise ValueError(f"The interval has to be at least {MIN_INTERVAL} seconds.")
+
+        if self.thread_id is None:
+            raise RuntimeError("The stream is not running.")
+
+        if self.profiler is None or not self.profiler.is_running():
+            self.profiler = SamplingProfiler(self.thread_id, interval)
+            self.profiler.start()
+
+        return self.profiler
+
+    def stop_profiler(self) -> SamplingProfiler or None:
+        """
+        Stop the profiler started with start_profiler().
+
+        Returns:
+            SamplingProfiler or None: The stopped profiler with its samples, None if no profiler was started.
+        """
+        if self.profiler:
+            self.profiler.stop()
+
+        return self.profiler
+
+    def _get_bitrate(self, song: Song) -> int:
+        """
+        Returns the bitrate used to pace the given song.
+
+        The song is probed if that did not happen yet. If the bitrate can't be determined the bitrate announced to
+        the server is used.
+
+        Parameters:
+            song (Song): The song to get the bitrate for.
+
+        Returns:
+            int: The bitrate in kbps.
+        """
+        if not song.is_probed():
+            try:
+                song.probe()
+            except OSError:
+                pass
+
+        return song.get_bitrate() or self.get_audio_info()["bitrate"]
+
+    def hide_metadata(self, kinds: tuple = ("jingle", "advertisement"), title: str or None = None) -> None:
+        """
+        Hide the titles of jingles and advertisements (or other kinds of items) from the stream metadata.
+
+        Parameters:
+            kinds (tuple, optional): The kinds of items to hide (song, announcement, jingle or advertisement).
+            title (str or None, optional): The title to show instead, None keeps showing the previous title.
+
+        Returns:
+            None
+
+        """
+        self.metadata.hide(kinds, title)
+
     def get_current_song(self) -> Song:
         """
         Returns the current song.
@@ -365,6 +1049,9 @@ class Stream:
         """
         Sets the `force_next` flag to True.
 
+        The item that is playing ends right away, a pacer that is waiting to send the next chunk is woken up so the
+        next item starts within one pacing interval.
+
         Parameters:
             self: Reference to the current instance of the class.
 
@@ -396,59 +1083,115 @@ class Stream:
 
         """
 
-        try:
-            self.shout.close()
-        except Exception:
-            pass
+        with self.send_lock:
+            try:
+                self.shout.close()
+            except Exception:
+                pass
+
+            self.shout.open()
+        self.force_next = False
+        self.thread_id = threading.get_ident()
+        if self.pacer:
+            self.pacer.reset()
 
-        self.shout.open()
         self._should_announce_next_song()
         self._prepare_next_announcement()
 
         if self.current_playlist:
 
             self.current_playlist.start_playing()
+
+            # The playlist may still be loading in the background, start as soon as the first song is there.
+            if not self.current_playlist.wait_for_songs(self.current_playlist.start_playing_at + 1):
+                return
+
+            offset = self._restore_checkpoint()
             self._stream_start()
             self.has_started = True
 
+            if self.watchdog:
+                self.watchdog.start()
+
+            if self.checkpoint:
+                self.checkpoint.start()
+
             while self.current_playlist.is_playing():
+                song = self.current_playlist.get_current_song()
+                if not self._skip_unplayable_songs():
+                    if not self.force_stop and self._swap_playlist(ended=True):
+                        continue
+                    break
+
+                if self.current_playlist.get_current_song() is not song:
+                    offset = 0
+
                 self.current_song = self.current_playlist.get_current_song()
 
-                if self.announce_songs:
-                    announcement: Song or None = self.request_next_song_announcement()
+                if self.announce_songs and not offset:
+                    with self._span("request_next_song_announcement"):
+                        announcement: Song or None = self.request_next_song_announcement()
                     if announcement:
-                        self.stream_audio(announcement)
+                        self._checkpoint_boundary("announcement")
+                        self.stream_audio(announcement, kind="announcement")
                         self.announcement_finished_playing(announcement)
 
-                self.advertise_new_song()
+                        if self.force_stop:
+                            break
+
+                with self._span("advertise_new_song"):
+                    self.advertise_new_song()
                 self._should_announce_next_song()
-                self._prepare_next_announcement()
-                self.stream_audio(self.current_playlist.get_current_song())
+                with self._span("flush_requests"):
+                    self._flush_requests()
+                with self._span("prepare_next_announcement"):
+                    self._prepare_next_announcement()
+                self._checkpoint_boundary("song")
+                self.stream_audio(self.current_playlist.get_current_song(), offset)
+                offset = 0
 
                 if self.force_stop:
-                    self.force_stop = False
-                    return
+                    break
+
+                break_kind = self._get_break_kind(self._take_break_roll())
+
+                if break_kind == "jingle":
+                    self.current_song = self.current_jingles.get_current_song()
+                    self._checkpoint_boundary("jingle")
+                    self.stream_audio(self.current_jingles.get_current_song(), kind="jingle")
+                    self.current_jingles.next_song()
 
-                rng = random.randrange(1, 100 - self.jingle_or_advertisement_chance, 1)
+                    if self.force_stop:
+                        break
 
-                if rng >= self.jingle_or_advertisement_chance:
-                    delta = (100 - self.jingle_or_advertisement_chance)
+                if break_kind == "advertisement":
+                    self.current_song = self.current_advertisements.get_current_song()
+                    self._checkpoint_boundary("advertisement")
+                    self.stream_audio(self.current_advertisements.get_current_song(), kind="advertisement")
+                    self.current_advertisements.next_song()
 
-                    matched = False
-                    if self.current_jingles and self.jingle_chance <= delta and len(
-                            self.current_jingles.get_all_songs()) > 0:
-                        self.current_song = self.current_jingles.get_current_song()
-                        self.stream_audio(self.current_jingles.get_current_song())
-                        self.current_jingles.next_song()
-                        matched = True
+                    if self.force_stop:
+                        break
 
-                    if (self.current_advertisements and self.advertisement_chance <= delta and matched is False
-                            and len(self.current_advertisements.get_all_songs()) > 0):
-                        self.current_song = self.current_advertisements.get_current_song()
-                        self.stream_audio(self.current_advertisements.get_current_song())
-                        self.current_advertisements.next_song()
+                with self._span("next_song"):
+                    if self._swap_playlist():
+                        self._flush_requests()
+                        continue
 
-                self.current_playlist.next_song()
+                    self._flush_requests()
+                    self.current_playlist.next_song()
+
+                if not self.current_playlist.is_playing() and not self.force_stop:
+                    self._swap_playlist(ended=True)
+
+            self.force_stop = False
+            self.thread_id = None
+
+            if self.checkpoint:
+                self.checkpoint.stop()
+
+            if self.watchdog:
+                self.watchdog.stop()
 
     def stop(self, announce: bool = True) -> None:
         """
@@ -473,34 +1216,348 @@ class Stream:
 
         self.force_stop = True
         self.has_started = False
+        self.metadata.stop()
+
+        if self.history is not None:
+            self.history.flush(timeout=5.0)
+
+        if self.checkpoint:
+            self.checkpoint.stop()
+
+        if self.watchdog:
+            self.watchdog.stop()
+
+    def is_playable(self, song: Song) -> bool:
+        """
+        Check if a song can be streamed: it is in the format of the stream and not quarantined by the integrity index.
+
+        Parameters:
+            song (Song): The song to check.
+
+        Returns:
+            bool: True if the song can be streamed.
+        """
+        if song.get_format() != self.stream_format:
+            return False
+
+        return not (self.integrity_index and self.integrity_index.is_quarantined(song.get_filename()))
+
+    def _skip_unplayable_songs(self) -> bool:
+        """
+        Move the current playlist on to the first song that can be streamed, see is_playable().
+
+        Songs are skipped before the announcement, the callbacks and the metadata update of the song. When a whole
+        pass over the playlist finds nothing to stream, _wait_for_playable_songs() is called before the next pass
+        and a scheduled playlist may take over.
+
+        Returns:
+            bool: False if the playlist ended or the stream was stopped.
+        """
+        playlist = self.current_playlist
+        skipped = 0
+
+        while not self.is_playable(playlist.get_current_song()):
+            if skipped >= len(playlist.get_all_songs()):
+                if not self._wait_for_playable_songs():
+                    return False
 
-    def stream_audio(self, song: Song) -> None:
+                skipped = 0
+                if self._swap_playlist():
+                    playlist = self.current_playlist
+                    continue
+
+            playlist.next_song()
+            skipped += 1
+
+            if not playlist.is_playing() or self.force_stop:
+                return False
+
+        return True
+
+    def _wait_for_playable_songs(self) -> bool:
+        """
+        Called when no song of the current playlist can be streamed. Waits unplayable_delay seconds, so a looping
+        playlist does not keep the CPU busy, and gives files that were replaced in the meantime another chance.
+
+        Returns:
+            bool: False if the stream was stopped while waiting.
+        """
+        return not self.stop_event.wait(self.unplayable_delay)
+
+    def stream_audio(self, song: Song, offset: int = 0, kind: str = "song") -> None:
         """
         Streams audio from a given Song object to the shoutcast server.
 
+        MP3 files are sent in chunks of chunk_size bytes. Ogg files are split on page boundaries and paced using
+        the granule positions of the pages. Songs that can't be streamed (see is_playable()) are skipped.
+
         Parameters:
             song` (Song): The Song object representing the audio to be streamed.
+            offset (int, optional): The byte offset to start streaming at. Streaming starts at the first frame
+                header (or Ogg page) at or after the offset.
+            kind (str, optional): The kind of item (song, announcement, jingle or advertisement), used for the
+                metadata update.
 
         Returns:
             None
 
         """
-        bsize: int = 8192
-        temp = open(song.get_filename(), "rb")
-        self.shout.set_metadata({"song": song.get_song_name()})
+        if not self.is_playable(song):
+            return
+
+        with self._span(kind, file=song.get_filename(), title=song.get_song_name(), offset=offset) as item:
+            try:
+                with self._span("open"):
+                    temp = self._open_audio(song)
+            except OSError as error:
+                # A missing or unreadable file is skipped, it must not take the stream off the air.
+                import logging
+                logging.getLogger(__name__).warning("Skipping %s %s: %s", kind, song.get_filename(), error)
+                return
+
+            try:
+                with self._span("metadata_update"):
+                    self.metadata.update(song, kind)
+
+                event = self.history.record(song, kind) if self.history is not None else None
+
+                open_streams = {}
+                if song.get_format() == "ogg":
+                    chunks = self._ogg_chunks(temp, offset, open_streams)
+                else:
+                    chunks = self._mp3_chunks(temp, song, offset)
+
+                sent = 0
+                with ExitStack() as first_chunk:
+                    # Covers reading, pacing, sending and syncing the first chunk, closed after the first send.
+                    first_chunk.enter_context(self._span("first_chunk"))
+
+                    for buffer, duration in chunks:
+                        if self.interrupt_event.is_set():
+                            break
+
+                        if not self.pacer:
+                            with self.send_lock:
+                                self.shout.sync()
+                        elif duration and not self.pacer.pace(duration, self.interrupt_event):
+                            break
+
+                        with self.send_lock:
+                            self.shout.send(buffer)
+
+                        if self.watchdog:
+                            self.watchdog.feed(duration)
+
+                        if not self.pacer:
+                            with self.send_lock:
+                                self.shout.sync()
+
+                        if self.checkpoint:
+                            self.checkpoint.set_offset(temp.tell())
+
+                        sent += len(buffer)
+                        first_chunk.close()
+
+                if open_streams:
+                    self._end_ogg_streams(open_streams)
+            finally:
+                temp.close()
+
+            if item is not None:
+                item.set("bytes", sent)
+                item.set("skipped", self.force_next)
+
+        if event is not None:
+            self.history.finish(event, skipped=self.force_next)
+
+        self.force_next = False
+
+    def _open_audio(self, song: Song, prefetch: bool = False):
+        """
+        Open the audio of a song for reading, from the audio cache if the song is cached.
+
+        Parameters:
+            song (Song): The song to open.
+            prefetch (bool): True if the song is only read ahead of time, this is not counted as a play by the cache.
+
+        Returns:
+            A binary file object positioned at the start of the file.
+        """
+        if self.audio_cache:
+            audio = self.audio_cache.open(song.get_filename(), count=not prefetch)
+            if audio is not None:
+                return audio
+
+        return open(song.get_filename(), "rb")
+
+    def _mp3_chunks(self, temp, song: Song, offset: int):
+        """
+        Read an MP3 file in chunks of about chunk_size bytes.
+
+        Only the byte ranges from _get_byte_ranges() are read, a chunk never spans two ranges. Chunks end on a frame
+        boundary, so the watchdog can inject filler between two chunks. The rest of the last frame is read again
+        with the next chunk, which also keeps the file position stored in the checkpoint on a frame boundary.
+
+        Yields:
+            tuple: The chunk and its duration in seconds (0.0 without a pacer and a watchdog).
+        """
+        bsize: int = self.chunk_size
+        bitrate = self._get_bitrate(song) if self.pacer or self.watchdog else 0
+
+        for start, end in self._get_byte_ranges(song):
+            if end is not None and offset >= end:
+                continue
+
+            if offset > start:
+                temp.seek(offset)
+                position = find_frame(temp.read(bsize))
+                temp.seek(offset + max(position, 0))
+                offset = 0
+            else:
+                temp.seek(start)
+
+            while True:
+                buffer = temp.read(bsize if end is None else min(bsize, end - temp.tell()))
+
+                if len(buffer) == 0:
+                    break
+
+                boundary = last_frame_end(buffer)
+                while boundary == 0 and len(buffer) < 2 * MAX_FRAME_LENGTH:
+                    # The chunk size is smaller than a frame.
+                    more = temp.read(bsize if end is None else min(bsize, end - temp.tell()))
+                    if not more:
+                        break
+                    buffer += more
+                    boundary = last_frame_end(buffer)
+
+                if boundary == 0:
+                    # No complete frame: a tag, garbage or a truncated frame at the end of the range.
+                    boundary = len(buffer)
+                elif boundary < len(buffer):
+                    temp.seek(boundary - len(buffer), os.SEEK_CUR)
+                    buffer = buffer[:boundary]
+
+                yield buffer, (len(buffer) * 8 / (bitrate * 1000) if bitrate else 0.0)
+
+    def _get_byte_ranges(self, song: Song) -> list:
+        """
+        Returns the (start, end) byte ranges of an MP3 song to send: the valid ranges from the integrity index
+        limited to the audible part from the trim index. An end of None reads to the end of the file.
+        """
+        ranges = (self.integrity_index.get_ranges(song.get_filename()) if self.integrity_index else None) or \
+            [(0, None)]
+
+        trim = self.trim_index.get(song.get_filename()) if self.trim_index else None
+        if trim:
+            ranges = [(max(start, trim[0]), trim[1] if end is None else min(end, trim[1])) for start, end in ranges
+                      if start < trim[1] and (end is None or end > trim[0])]
+
+        return ranges
+
+    def _ogg_chunks(self, temp, offset: int, open_streams: dict):
+        """
+        Read an Ogg file page by page and group the pages into chunks of about chunk_size bytes.
+
+        The duration of a chunk comes from the granule positions of the pages of the first logical stream with a
+        known codec, or of the next one once it ended in a chained file. When resuming at an offset the header pages
+        are sent first so listeners can decode the stream, the timing starts again at the first page after the
+        offset. Each file becomes a new link of a chained Ogg stream: a logical stream with the serial number of a
+        stream of the previous link gets another serial number, all other pages are sent unchanged.
+
+        Parameters:
+            open_streams (dict): Kept up to date with the (sequence number, granule position) of the last page sent
+                of every logical stream that did not end yet, by serial number, see _end_ogg_streams().
+
+        Yields:
+            tuple: The chunk and its duration in seconds.
+        """
+        pages = []
+        size = 0
+        duration = 0.0
+        serials = {}
+        streams = {}
+        timing = None
+        granule_rate = 0
+        last_granule = None
+        previous_serials = self.last_ogg_serials
 
         while True:
-            if self.force_next or self.force_stop:
+            result = read_page(temp)
+            if result is None:
                 break
 
-            self.shout.sync()
-            buffer = temp.read(bsize)
+            page, data = result
+            serial = page['serial']
+
+            if serial not in serials:
+                output = serial
+                while output in previous_serials or output in serials.values():
+                    output = (output + 1) & 0xFFFFFFFF
+                serials[serial] = output
+                self.last_ogg_serials = set(serials.values())
+
+            if timing is None and page['header_type'] & PAGE_BOS:
+                info = identify(data[page['header_size']:])
+                if info:
+                    timing = serial
+                    granule_rate = info['granule_rate']
+                    last_granule = None
+
+            if serials[serial] != serial:
+                data = set_page_serial(data, serials[serial])
+
+            if offset and page['granule'] > 0:
+                # The header pages are sent, continue at the page at or after the offset.
+                resume_at = offset
+                offset = 0
+                if resume_at > temp.tell() - page['length']:
+                    temp.seek(resume_at)
+                    last_granule = None
+                    continue
+
+            if serial == timing and page['granule'] >= 0:
+                if last_granule is not None:
+                    duration += max(page['granule'] - last_granule, 0) / granule_rate
+
+                last_granule = page['granule']
+
+            if page['header_type'] & PAGE_EOS:
+                streams.pop(serials[serial], None)
+                if serial == timing:
+                    timing = None
+            else:
+                granule = page['granule'] if page['granule'] >= 0 else streams.get(serials[serial], (0, 0))[1]
+                streams[serials[serial]] = (page['sequence'], granule)
+
+            pages.append(data)
+            size += len(data)
 
-            if len(buffer) == 0:
-                break
+            if size >= self.chunk_size:
+                sent_streams = dict(streams)
+                yield b"".join(pages), duration
 
-            self.shout.send(buffer)
-            self.shout.sync()
+                # The caller asks for the next chunk after sending this one.
+                open_streams.clear()
+                open_streams.update(sent_streams)
+                pages = []
+                size = 0
+                duration = 0.0
 
-        temp.close()
-        self.force_next = False
+        if pages:
+            yield b"".join(pages), duration
+
+            open_streams.clear()
+            open_streams.update(streams)
+
+    def _end_ogg_streams(self, open_streams: dict) -> None:
+        """
+        Send an empty end of stream page for every logical stream of an Ogg file that was cut off, for example by a
+        skip, so the next file starts a valid new link.
+        """
+        pages = [make_page(b"", serial, sequence + 1, granule, PAGE_EOS)
+                 for serial, (sequence, granule) in open_streams.items()]
+        open_streams.clear()
+
+        with self.send_lock:
+            self.shout.send(b"".join(pages))
@@ -0,0 +1,198 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+
+
+class Span:
+    """
+    A timed phase of the stream, used as a context manager.
+
+    Attributes:
+        name (str): The name of the phase.
+        attributes (dict): Extra information about the phase, e.g. the kind and the file of the item.
+        start (int): The start time in nanoseconds (time.perf_counter_ns).
+        end (int): The end time in nanoseconds, 0 while the span is open.
+        span_id (str): The id of the span.
+        parent_id (str): The id of the enclosing span on the same thread, empty for a root span.
+        trace_id (str): The id shared by a root span and all spans nested in it.
+        thread_id (int): The thread the span ran on.
+    """
+
+    __slots__ = ("tracer", "name", "attributes", "start", "end", "span_id", "parent_id", "trace_id", "thread_id")
+
+    def __init__(self, tracer, name: str, attributes: dict):
+        self.tracer = tracer
+        self.name = name
+        self.attributes = attributes
+        self.start = 0
+        self.end = 0
+        self.span_id = ""
+        self.parent_id = ""
+        self.trace_id = ""
+        self.thread_id = 0
+
+    def set(self, key: str, value) -> None:
+        """
+        Add an attribute while the span is open.
+        """
+        self.attributes[key] = value
+
+    def __enter__(self):
+        self.tracer._open(self)
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is not None:
+            self.attributes["error"] = exc_type.__name__
+        self.tracer._close(self)
+        return False
+
+
+class Tracer:
+    """
+    Records spans for each phase of every item the stream plays.
+
+    Spans nest per thread: a span opened while another span is open on the same thread becomes its child, a span
+    opened with no span open starts a new trace. Only the last max_spans spans are kept so a tracer can stay on for a
+    live station. The spans can be written as a Chrome trace (chrome://tracing, Perfetto) or as OTLP-style JSON.
+
+    Attributes:
+        service_name (str): The service name used in the OTLP export.
+        max_spans (int): The number of finished spans kept in memory.
+        spans (deque): The finished spans, oldest first.
+    """
+
+    def __init__(self, service_name: str = "streaming", max_spans: int = 10000):
+        self.service_name = service_name
+        self.max_spans = max_spans
+        self.spans = deque(maxlen=max_spans)
+        self.local = threading.local()
+        self.lock = threading.Lock()
+
+        # Maps perf_counter_ns to wall clock time for the OTLP export.
+        self.epoch_offset = time.time_ns() - time.perf_counter_ns()
+
+    def span(self, name: str, **attributes) -> Span:
+        """
+        Returns a span to be used in a with statement.
+
+        Parameters:
+            name (str): The name of the phase.
+            **attributes: Extra information about the phase.
+
+        Returns:
+            Span: The span, it is timed from entering to leaving the with block.
+        """
+        return Span(self, name, attributes)
+
+    def _open(self, span: Span) -> None:
+        stack = getattr(self.local, "stack", None)
+        if stack is None:
+            stack = self.local.stack = []
+
+        span.span_id = os.urandom(8).hex()
+        span.thread_id = threading.get_ident()
+        if stack:
+            span.parent_id = stack[-1].span_id
+            span.trace_id = stack[-1].trace_id
+        else:
+            span.trace_id = os.urandom(16).hex()
+
+        stack.append(span)
+        span.start = time.perf_counter_ns()
+
+    def _close(self, span: Span) -> None:
+        span.end = time.perf_counter_ns()
+
+        stack = self.local.stack
+        if stack and stack[-1] is span:
+            stack.pop()
+        elif span in stack:
+            stack.remove(span)
+
+        with self.lock:
+            self.spans.append(span)
+
+    def get_spans(self) -> list:
+        """
+        Returns a copy of the finished spans, oldest first.
+        """
+        with self.lock:
+            return list(self.spans)
+
+    def clear(self) -> None:
+        with self.lock:
+            self.spans.clear()
+
+    def to_chrome_trace(self) -> dict:
+        """
+        Returns the spans in the Chrome trace event format, as complete ("X") events in microseconds.
+        """
+        pid = os.getpid()
+        events = [{
+            "name": span.name,
+            "cat": "stream",
+            "ph": "X",
+            "ts": span.start / 1000,
+            "dur": (span.end - span.start) / 1000,
+            "pid": pid,
+            "tid": span.thread_id,
+            "args": span.attributes,
+        } for span in self.get_spans()]
+
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def to_otlp(self) -> dict:
+        """
+        Returns the spans in the OTLP/JSON trace format.
+        """
+        spans = [{
+            "traceId": span.trace_id,
+            "spanId": span.span_id,
+            "parentSpanId": span.parent_id,
+            "name": span.name,
+            "kind": 1,
+            "startTimeUnixNano": str(span.start + self.epoch_offset),
+            "endTimeUnixNano": str(span.end + self.epoch_offset),
+            "attributes": [_otlp_attribute(key, value) for key, value in span.attributes.items()],
+        } for span in self.get_spans()]
+
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": [_otlp_attribute("service.name", self.service_name)]},
+                "scopeSpans": [{"scope": {"name": "streaming"}, "spans": spans}],
+            }]
+        }
+
+    def export(self, path: str, trace_format: str = "chrome") -> None:
+        """
+        Write the spans to a JSON file.
+
+        Parameters:
+            path (str): The file to write.
+            trace_format (str, optional): "chrome" for the Chrome trace event format or "otlp" for OTLP/JSON.
+
+        Returns:
+            None
+        """
+        if trace_format == "chrome":
+            data = self.to_chrome_trace()
+        elif trace_format == "otlp":
+            data = self.to_otlp()
+        else:
+            raise ValueError(f"Unknown trace format {trace_format}")
+
+        with open(path, "w", encoding="utf-8") as fp:
+            json.dump(data, fp)
+
+
+def _otlp_attribute(key: str, value) -> dict:
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
@@ -0,0 +1,257 @@
+import os
+from itertools import repeat
+
+from .cache import FileCache
+from .parsers.mp3 import MPEG_VERSION_1, find_frame, id3v2_size, parse_frame_header, side_info_size
+from .song import Song
+
+
+def frame_offsets(data: bytes) -> tuple:
+    """
+    Find the offsets of all consecutive frames in an MP3 file.
+
+    Parameters:
+        data (bytes): The complete file.
+
+    Returns:
+        tuple: The first frame header (dict or None) and the list of frame offsets. The list ends at the first
+            position that is not a valid frame (a trailing tag or garbage).
+    """
+    position = find_frame(data, id3v2_size(data))
+    if position < 0:
+        return None, []
+
+    first = parse_frame_header(data, position)
+    offsets = []
+    while True:
+        frame = parse_frame_header(data, position)
+        if frame is None or position + frame['length'] > len(data) or frame['sample_rate'] != first['sample_rate']:
+            break
+
+        offsets.append(position)
+        position += frame['length']
+
+    return first, offsets
+
+
+def _gain_fields(frame: dict) -> list:
+    """
+    Returns the bit positions of part2_3_length and global_gain for every granule and channel within the side info.
+    """
+    channels = frame['channels']
+    if frame['version'] == MPEG_VERSION_1:
+        granules, start, granule_bits = 2, 9 + (5 if channels == 1 else 3) + 4 * channels, 59
+    else:
+        granules, start, granule_bits = 1, 8 + (1 if channels == 1 else 2), 63
+
+    return [start + index * granule_bits for index in range(granules * channels)]
+
+
+def frame_levels(data: bytes, offsets: list, frame: dict) -> list:
+    """
+    Estimate the loudness of every frame from its side info, without decoding.
+
+    The level of a frame is the largest global gain of its granules that carry audio data (part2_3_length > 0),
+    0 for a frame without audio data. The global gain is a logarithmic scale factor, 4 steps double the amplitude.
+    The layout of the first frame (MPEG version and channels) is used for all frames.
+
+    Uses NumPy when it is installed.
+
+    Parameters:
+        data (bytes): The complete file.
+        offsets (list): The frame offsets, see frame_offsets().
+        frame (dict): The header of the first frame.
+
+    Returns:
+        list: The level of every frame.
+    """
+    side_start = 4 + (2 if frame['protected'] else 0)
+    size = side_info_size(frame)
+    fields = _gain_fields(frame)
+
+    try:
+        import numpy
+    except ImportError:
+        numpy = None
+
+    if numpy is None:
+        levels = []
+        for offset in offsets:
+            bits = int.from_bytes(data[offset + side_start:offset + side_start + size], "big")
+            level = 0
+            for position in fields:
+                length = (bits >> (size * 8 - position - 12)) & 0xFFF
+                gain = (bits >> (size * 8 - position - 29)) & 0xFF
+                if length and gain > level:
+                    level = gain
+            levels.append(level)
+        return levels
+
+    buffer = numpy.frombuffer(data, dtype=numpy.uint8)
+    starts = numpy.asarray(offsets, dtype=numpy.int64) + side_start
+    side = buffer[starts[:, None] + numpy.arange(size)].astype(numpy.uint32)
+
+    def field(position: int, width: int):
+        index = position // 8
+        value = side[:, index] << 16 | side[:, index + 1] << 8 | side[:, index + 2]
+        return (value >> (24 - position % 8 - width)) & ((1 << width) - 1)
+
+    levels = numpy.zeros(len(offsets), dtype=numpy.uint32)
+    for position in fields:
+        gain = numpy.where(field(position, 12) > 0, field(position + 21, 8), 0)
+        levels = numpy.maximum(levels, gain)
+
+    return levels.tolist()
+
+
+def analyze_file(file_path: str, silence_gain: int = 1, min_silence: float = 0.5, pad: float = 0.1) -> dict or None:
+    """
+    Find the silent head and tail of an MP3 file.
+
+    Frames with a level (see frame_levels()) below silence_gain count as silent. By default only digital silence, frames
+    without audio data, is trimmed: quiet intros and fade outs often have a low global gain as well, a higher
+    silence_gain (for example 100) also trims near silence. Silence shorter than min_silence is kept. `pad` seconds of
+    silence are kept before and after the audio, and at least two frames before it so the bit reservoir of the first
+    audible frame is sent as well.
+
+    Parameters:
+        file_path (str): The MP3 file.
+        silence_gain (int, optional): The global gain below which a frame is silent, 1 only trims frames without
+            audio data.
+        min_silence (float, optional): The shortest silence in seconds that is trimmed.
+        pad (float, optional): The number of seconds of silence to keep around the audio.
+
+    Returns:
+        dict or None: The byte offsets to start and end at and the seconds trimmed from the head and the tail, or
+            None if the file has no MP3 frames.
+    """
+    with open(file_path, "rb") as fp:
+        data = fp.read()
+
+    frame, offsets = frame_offsets(data)
+    if not offsets:
+        return None
+
+    levels = frame_levels(data, offsets, frame)
+    frame_duration = frame['samples'] / frame['sample_rate']
+    pad_frames = int(pad / frame_duration)
+
+    audible = [index for index, level in enumerate(levels) if level >= silence_gain]
+    first = audible[0] if audible else len(offsets)
+    last = audible[-1] if audible else -1
+
+    head = max(first - max(pad_frames, 2), 0)
+    if head * frame_duration < min_silence:
+        head = 0
+
+    tail = min(last + 1 + pad_frames, len(offsets))
+    if (len(offsets) - tail) * frame_duration < min_silence:
+        tail = len(offsets)
+
+    if head >= tail:
+        head, tail = 0, len(offsets)
+
+    end = offsets[tail - 1] + parse_frame_header(data, offsets[tail - 1])['length']
+    return {
+        'start': offsets[head],
+        'end': end,
+        'head': round(head * frame_duration, 3),
+        'tail': round((len(offsets) - tail) * frame_duration, 3),
+    }
+
+
+class TrimIndex:
+    """
+    The byte ranges of the songs without their leading and trailing silence.
+
+    The index is built offline with build(): the files are analyzed on a process pool and the results are stored in
+    a FileCache, so only new and changed files are analyzed again. While streaming a lookup is a dictionary access.
+
+    Attributes:
+        cache (FileCache): The cache holding the analysis results.
+        silence_gain (int): The global gain below which a frame is silent, see analyze_file().
+        min_silence (float): The shortest silence in seconds that is trimmed.
+        pad (float): The number of seconds of silence kept around the audio.
+        ranges (dict): The (start, end) byte offsets by absolute file path.
+    """
+
+    def __init__(self, cache: FileCache = None, silence_gain: int = 1, min_silence: float = 0.5,
+                 pad: float = 0.1):
+        self.cache = cache or FileCache()
+        self.silence_gain = silence_gain
+        self.min_silence = min_silence
+        self.pad = pad
+        self.ranges = {}
+
+    def get_settings(self) -> list:
+        return [self.silence_gain, self.min_silence, self.pad]
+
+    def build(self, songs: list[Song], workers: int = None) -> None:
+        """
+        Analyze the MP3 songs that are not in the cache yet and load the ranges of all songs.
+
+        Parameters:
+            songs (list[Song]): The songs to index, for example playlist.get_all_songs().
+            workers (int, optional): The number of processes, the number of CPUs by default.
+
+        Returns:
+            None
+        """
+        files = [song.get_filename() for song in songs if song.get_format() == "mp3"]
+        missing = []
+
+        for file in files:
+            value = self.cache.get(file)
+            if value is not None and value.get('settings') == self.get_settings():
+                self._add(file, value)
+            else:
+                missing.append(file)
+
+        if missing:
+            # Imported here, concurrent.futures takes longer to import than the rest of the package.
+            from concurrent.futures import ProcessPoolExecutor
+
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                results = executor.map(_analyze, missing, repeat(self.silence_gain), repeat(self.min_silence),
+                                       repeat(self.pad), chunksize=8)
+
+                for file, result in zip(missing, results):
+                    if result is None:
+                        continue
+
+                    result['settings'] = self.get_settings()
+                    self.cache.set(file, result)
+                    self._add(file, result)
+
+        self.cache.save()
+
+    def _add(self, file: str, value: dict) -> None:
+        if value.get('start') is not None:
+            self.ranges[os.path.abspath(file)] = (value['start'], value['end'])
+
+    def get(self, file: str) -> tuple or None:
+        """
+        Returns the (start, end) byte offsets of the audio of a file, None if the file is not indexed.
+        """
+        return self.ranges.get(os.path.abspath(file))
+
+    def get_trimmed_seconds(self) -> float:
+        """
+        Returns the total number of seconds of silence trimmed from the indexed files.
+        """
+        total = 0.0
+        for file in self.ranges:
+            value = self.cache.get(file)
+            if value:
+                total += value.get('head', 0.0) + value.get('tail', 0.0)
+        return total
+
+
+def _analyze(file_path: str, silence_gain: int, min_silence: float, pad: float) -> dict:
+    try:
+        result = analyze_file(file_path, silence_gain, min_silence, pad)
+    except OSError:
+        return None
+
+    # Files without frames are stored too, so they are not analyzed again.
+    return result or {'start': None, 'end': None, 'head': 0.0, 'tail': 0.0}
@@ -0,0 +1,224 @@
+import logging
+import os
+import sys
+import sysconfig
+import threading
+import time
+from collections import deque
+
+from .parsers.mp3 import find_frame, parse_frame_header, silent_frame
+
+logger = logging.getLogger(__name__)
+
+STDLIB_PATH = sysconfig.get_paths()["stdlib"]
+
+
+class UnderrunWatchdog:
+    """
+    Keeps audio flowing to the server when the stream loop stalls.
+
+    The watchdog keeps a send clock: the moment the audio sent so far runs out when played in real time from the first
+    chunk on. When the send clock falls more than `threshold` seconds behind real time, for example because a file read
+    or a callback blocks the loop, the watchdog sends silence (or a filler loop) matching the audio_info of the stream
+    until real audio is sent again. The injected audio is credited to the pacer so the stream does not race to catch up
+    afterwards.
+
+    Every underrun is counted and logged with its cause: the function the stream thread was stuck in when the
+    underrun started. Filler is only injected into MP3 streams, underruns of Ogg streams are counted and logged.
+
+    Attributes:
+        threshold (float): The number of seconds the send clock may fall behind before filler is injected. A
+            paced stream sends a chunk up to one chunk duration late, so it has to be longer than that.
+        interval (float): The number of seconds between two checks.
+        filler_path (str or None): An MP3 file looped as filler instead of silence, it has to match the audio_info
+            of the stream.
+        underruns (int): The number of underruns.
+        injected (float): The number of seconds of filler that were sent.
+        events (deque): The last underruns, each with the time, cause, kind of item, duration and injected seconds.
+    """
+
+    def __init__(self, threshold: float = 1.0, interval: float = 0.1, filler_path: str = None, max_events: int = 100):
+        self.threshold = threshold
+        self.interval = interval
+        self.filler_path = filler_path
+        self.stream = None
+
+        self.underruns = 0
+        self.injected = 0.0
+        self.events = deque(maxlen=max_events)
+
+        self.lock = threading.Lock()
+        self.audio_end = None
+        self.current = None
+        self.frames = []
+        self.frame_index = 0
+
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def load_filler(self) -> None:
+        """
+        Prepare the frames that are injected, the filler file if it matches the stream and silence otherwise.
+        """
+        audio_info = self.stream.get_audio_info()
+        bitrate = audio_info["bitrate"]
+        sample_rate = audio_info["sample_rate"]
+        channels = audio_info["channels"]
+
+        self.frames = []
+        self.frame_index = 0
+
+        if self.filler_path and os.path.exists(self.filler_path):
+            with open(self.filler_path, "rb") as fp:
+                data = fp.read()
+
+            position = find_frame(data)
+            while position >= 0:
+                frame = parse_frame_header(data, position)
+                if frame is None or position + frame['length'] > len(data):
+                    break
+
+                if (frame['bitrate'], frame['sample_rate'], frame['channels']) != (bitrate, sample_rate, channels):
+                    logger.warning("Filler %s does not match the stream (%s kbps, %s Hz, %s channels), using silence",
+                                   self.filler_path, bitrate, sample_rate, channels)
+                    self.frames = []
+                    break
+
+                self.frames.append((data[position:position + frame['length']], frame['samples'] / sample_rate))
+                position += frame['length']
+
+        if not self.frames:
+            frame = silent_frame(bitrate, sample_rate, channels)
+            self.frames = [(frame, parse_frame_header(frame)['samples'] / sample_rate)]
+
+    def feed(self, duration: float) -> None:
+        """
+        Called by the stream after sending `duration` seconds of audio.
+        """
+        with self.lock:
+            now = time.monotonic()
+            self.audio_end = (now if self.audio_end is None else self.audio_end) + duration
+
+            if self.current:
+                self._end_underrun(now)
+
+    def start(self) -> None:
+        """
+        Start watching in a background thread, called by Stream.start().
+        """
+        if self.thread and self.thread.is_alive():
+            return
+
+        if self.stream.stream_format == "mp3":
+            self.load_filler()
+
+        self.audio_end = None
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self.run, name="underrun-watchdog", daemon=True)
+        self.thread.start()
+
+    def stop(self) -> None:
+        """
+        Stop watching, called when the stream stops.
+        """
+        self.stop_event.set()
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join()
+        self.thread = None
+
+        with self.lock:
+            if self.current:
+                self._end_underrun(time.monotonic())
+            self.audio_end = None
+
+    def run(self) -> None:
+        while not self.stop_event.wait(self.interval):
+            with self.lock:
+                if self.audio_end is None:
+                    continue
+
+                now = time.monotonic()
+                if not self.current:
+                    if now - self.audio_end <= self.threshold:
+                        continue
+
+                    self._start_underrun(now)
+
+                if self.stream.stream_format == "mp3":
+                    self._inject(now)
+
+    def _start_underrun(self, now: float) -> None:
+        self.underruns += 1
+        song = self.stream.get_current_song()
+        self.current = {
+            "time": time.time(),
+            "started": now,
+            "cause": self._get_cause(),
+            "kind": self.stream.current_kind,
+            "file": song.get_filename() if song else None,
+            "injected": 0.0,
+        }
+
+        logger.warning("Underrun: send clock %.2f s behind during %s %s, stream thread in %s",
+                       now - self.audio_end, self.current["kind"], self.current["file"], self.current["cause"])
+
+    def _end_underrun(self, now: float) -> None:
+        event = self.current
+        self.current = None
+        event["duration"] = round(now - event.pop("started"), 3)
+        event["injected"] = round(event["injected"], 3)
+        self.events.append(event)
+
+        logger.warning("Underrun ended after %.2f s, %.2f s of filler sent", event["duration"], event["injected"])
+
+    def _inject(self, now: float) -> None:
+        # Send enough to last until the next check.
+        start = max(self.audio_end, now)
+        buffers = []
+        duration = 0.0
+        while start + duration < now + self.interval:
+            frame, frame_duration = self.frames[self.frame_index]
+            self.frame_index = (self.frame_index + 1) % len(self.frames)
+            buffers.append(frame)
+            duration += frame_duration
+
+        if not buffers:
+            return
+
+        with self.stream.send_lock:
+            self.stream.shout.send(b"".join(buffers))
+
+        self.audio_end = start + duration
+        self.current["injected"] += duration
+        self.injected += duration
+
+        if self.stream.pacer:
+            self.stream.pacer.advance(duration)
+
+    def _get_cause(self) -> str:
+        """
+        Returns the innermost function outside the standard library the stream thread is running.
+        """
+        frame = sys._current_frames().get(self.stream.thread_id)
+        first = None
+        while frame is not None:
+            code = frame.f_code
+            location = f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+            first = first or location
+            if not code.co_filename.startswith(STDLIB_PATH) or "site-packages" in code.co_filename:
+                return location
+            frame = frame.f_back
+
+        return first or "unknown"
+
+    def get_stats(self) -> dict:
+        """
+        Returns the number of underruns, the seconds of filler sent and the last underruns.
+        """
+        with self.lock:
+            return {
+                "underruns": self.underruns,
+                "injected": round(self.injected, 3),
+                "events": list(self.events),
+                "in_underrun": self.current is not None,
+            }
@@ -0,0 +1,51 @@
+import os
+
+import pytest
+
+from streaming import Playlist, Song, Stream
+from streaming.outputs import NullOutput
+from streaming.parsers.mp3 import silent_frame
+
+# 128 kbps, 44.1 kHz stereo: 417 bytes and 26 ms per frame.
+FRAME = silent_frame(128, 44100, 2)
+
+
+@pytest.fixture
+def make_mp3(tmp_path):
+    """
+    Returns a function writing an MP3 file of silent frames into the temporary directory.
+    """
+    def make(name: str, frames: int = 100, data: bytes = None) -> str:
+        path = os.path.join(tmp_path, name)
+        with open(path, "wb") as fp:
+            fp.write(FRAME * frames if data is None else data)
+        return path
+
+    return make
+
+
+@pytest.fixture
+def make_playlist(make_mp3):
+    """
+    Returns a function creating a looping playlist of silent MP3 files.
+    """
+    def make(prefix: str, count: int, frames: int = 100, loop: bool = True) -> Playlist:
+        playlist = Playlist()
+        for index in range(count):
+            playlist.songs_array.append(Song(make_mp3(f"{prefix}{index}.mp3", frames)))
+        playlist.set_loop(loop)
+        return playlist
+
+    return make
+
+
+@pytest.fixture
+def make_stream():
+    """
+    Returns a function creating a stream that sends to a NullOutput.
+    """
+    def make(**kwargs) -> Stream:
+        kwargs.setdefault("output", NullOutput())
+        return Stream("/test", "", "", "", "Test", "", "localhost", 8000, "", **kwargs)
+
+    return make
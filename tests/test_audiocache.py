@@ -0,0 +1,94 @@
+import os
+
+from streaming.audiocache import AudioCache
+
+
+def write(tmp_path, name: str, size: int) -> str:
+    path = str(tmp_path / name)
+    with open(path, "wb") as fp:
+        fp.write(bytes(size))
+    return path
+
+
+def test_files_are_admitted_after_plays_and_evicted_least_recently_used(tmp_path):
+    cache = AudioCache(budget=250, admit_after=2)
+    a, b, c = (write(tmp_path, name, 100) for name in ("a.mp3", "b.mp3", "c.mp3"))
+
+    assert cache.open(a) is None
+    assert cache.open(a) is None
+    assert cache.wait_until_loaded(5)
+    assert cache.open(a).read() == bytes(100)
+    cache.open(b)
+    cache.open(b)
+    assert cache.wait_until_loaded(5)
+    assert cache.open(a) is not None
+
+    cache.open(c)
+    cache.open(c)
+    assert cache.wait_until_loaded(5)
+
+    assert set(cache.entries) == {os.path.abspath(a), os.path.abspath(c)}
+    assert cache.evictions == 1
+    assert cache.size == 200
+
+
+def test_pinned_files_are_cached_beyond_the_budget(tmp_path, make_playlist, caplog):
+    jingles = make_playlist("jingle", 3, frames=1)
+    cache = AudioCache(budget=1000)
+    other = write(tmp_path, "other.mp3", 500)
+    cache.open(other)
+    cache.open(other)
+    assert cache.wait_until_loaded(5)
+
+    cache.pin(jingles)
+
+    assert len(cache.entries) == 3
+    assert os.path.abspath(other) not in cache.entries
+    assert cache.size == 3 * 417
+
+    big = make_playlist("big", 1, frames=3)
+    cache.pin(big)
+    assert cache.size == 6 * 417 > cache.budget
+    assert "Pinned files exceed" in caplog.text
+
+
+def test_changed_files_are_read_again(tmp_path):
+    cache = AudioCache(admit_after=1, check_interval=0.0)
+    path = write(tmp_path, "a.mp3", 100)
+    cache.open(path)
+    assert cache.wait_until_loaded(5)
+    assert cache.open(path) is not None
+
+    write(tmp_path, "a.mp3", 200)
+
+    assert cache.open(path) is None
+    assert cache.invalidations == 1
+    assert cache.wait_until_loaded(5)
+    assert cache.open(path).read() == bytes(200)
+
+
+def test_reads_ahead_of_time_are_not_plays(tmp_path):
+    cache = AudioCache(admit_after=1)
+    path = write(tmp_path, "a.mp3", 100)
+
+    assert cache.open(path, count=False) is None
+    assert cache.wait_until_loaded(5)
+    assert cache.entries == {}
+    assert cache.get_stats()["misses"] == 0
+
+    cache.open(path)
+    assert cache.wait_until_loaded(5)
+    assert cache.open(path, count=False).read() == bytes(100)
+    assert cache.get_stats()["hits"] == 0
+
+
+def test_replaced_jingles_are_unpinned(make_playlist, make_stream):
+    stream = make_stream()
+    stream.set_audio_cache(AudioCache())
+    old = make_playlist("old", 2, frames=1)
+    new = make_playlist("new", 2, frames=1)
+
+    stream.set_jingles(old)
+    stream.set_jingles(new)
+
+    assert stream.audio_cache.pinned == {os.path.abspath(song.get_filename()) for song in new.get_all_songs()}
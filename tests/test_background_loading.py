@@ -0,0 +1,107 @@
+import os
+import subprocess
+import sys
+import threading
+
+from streaming import Playlist
+from streaming.checkpoint import Checkpoint
+
+
+class BlockingCache:
+    """
+    A probe cache that blocks until released, keeping the playlist in its probing state.
+    """
+
+    def __init__(self):
+        self.release = threading.Event()
+
+    def get(self, file):
+        self.release.wait(5)
+        return None
+
+    def set(self, file, value):
+        pass
+
+    def save(self):
+        pass
+
+
+def test_songs_are_available_while_loading(make_mp3, tmp_path):
+    for index in range(10):
+        make_mp3(f"song{index:02}.mp3", frames=10)
+
+    cache = BlockingCache()
+    playlist = Playlist()
+    thread = playlist.load_directory_in_background(str(tmp_path), cache=cache, batch_size=3)
+
+    assert playlist.wait_for_songs(10, timeout=5)
+    assert playlist.get_all_songs()[0].get_filename().endswith("song00.mp3")
+    assert not playlist.wait_until_loaded(timeout=0.05)
+    assert playlist.is_probing
+
+    cache.release.set()
+    assert playlist.wait_until_loaded(timeout=5)
+    thread.join(5)
+    assert not playlist.is_loading and not playlist.is_probing
+
+
+def test_next_song_does_not_wait_for_probing(make_mp3, tmp_path):
+    for index in range(3):
+        make_mp3(f"song{index}.mp3", frames=10)
+
+    cache = BlockingCache()
+    playlist = Playlist()
+    thread = playlist.load_directory_in_background(str(tmp_path), cache=cache)
+    playlist.set_loop(True)
+    playlist.start_playing()
+    assert playlist.wait_for_songs(3, timeout=5)
+
+    # Blocked at the last song until probing finished before.
+    for index in range(4):
+        playlist.next_song()
+
+    assert playlist.is_probing
+    assert playlist.current_index == 1
+    assert len(playlist.get_upcoming_songs(5)) == 5
+
+    cache.release.set()
+    thread.join(5)
+
+
+def test_restore_does_not_wait_for_the_library(make_mp3, make_stream, tmp_path):
+    music = tmp_path / "music"
+    music.mkdir()
+    for index in range(10):
+        make_mp3(f"music/song{index:02}.mp3", frames=10)
+
+    checkpoint = Checkpoint(str(tmp_path / "checkpoint.json"))
+    checkpoint.update({
+        'kind': 'song',
+        'file': str(music / "song03.mp3"),
+        'playlist': {'current_index': 3, 'last_current_index': 2},
+    })
+    checkpoint.set_offset(1000)
+    checkpoint.save()
+
+    cache = BlockingCache()
+    playlist = Playlist()
+    thread = playlist.load_directory_in_background(str(music), cache=cache, batch_size=2)
+    stream = make_stream()
+    stream.set_playlist(playlist)
+    stream.set_checkpoint(checkpoint)
+    playlist.start_playing()
+
+    assert stream._restore_checkpoint() == 1000
+    assert playlist.is_probing
+    assert playlist.get_current_song().get_filename().endswith("song03.mp3")
+
+    cache.release.set()
+    thread.join(5)
+
+
+def test_optional_features_are_not_imported():
+    code = "import sys, streaming; print(sorted(name for name in ('logging', 'datetime', 'sysconfig', " \
+           "'concurrent.futures', 'streaming.watchdog', 'streaming.tracing') if name in sys.modules))"
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    output = subprocess.run([sys.executable, "-c", code], cwd=root, capture_output=True, text=True, check=True).stdout
+    assert output.strip() == "[]"
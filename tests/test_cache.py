@@ -0,0 +1,41 @@
+import os
+
+from streaming.cache import FileCache
+
+
+def test_get_returns_value_while_file_is_unchanged(tmp_path):
+    path = tmp_path / "song.mp3"
+    path.write_bytes(b"audio")
+
+    cache = FileCache()
+    cache.set(str(path), {'duration': 1.0})
+    assert cache.get(str(path)) == {'duration': 1.0}
+
+    path.write_bytes(b"other audio")
+    assert cache.get(str(path)) is None
+
+
+def test_save_and_load(tmp_path):
+    path = tmp_path / "song.mp3"
+    path.write_bytes(b"audio")
+    cache_path = str(tmp_path / "cache.json")
+
+    cache = FileCache(cache_path)
+    cache.set(str(path), {'duration': 2.5})
+    cache.save()
+    assert not cache.is_dirty
+    assert not os.path.exists(cache_path + ".tmp")
+
+    assert FileCache(cache_path).get(str(path)) == {'duration': 2.5}
+
+
+def test_save_skips_clean_cache(tmp_path):
+    cache_path = tmp_path / "cache.json"
+    FileCache(str(cache_path)).save()
+    assert not cache_path.exists()
+
+
+def test_corrupt_cache_is_ignored(tmp_path):
+    cache_path = tmp_path / "cache.json"
+    cache_path.write_text("{not json")
+    assert FileCache(str(cache_path)).entries == {}
@@ -0,0 +1,137 @@
+import json
+import os
+
+from streaming.checkpoint import Checkpoint
+
+
+def test_save_and_load(tmp_path):
+    checkpoint = Checkpoint(str(tmp_path / "checkpoint.json"))
+    assert checkpoint.load() is None
+
+    checkpoint.update({'kind': 'song', 'file': 'a.mp3'})
+    checkpoint.set_offset(4096)
+    checkpoint.save()
+
+    assert checkpoint.load() == {'kind': 'song', 'file': 'a.mp3', 'offset': 4096}
+    assert not os.path.exists(checkpoint.path + ".tmp")
+
+
+def test_update_resets_offset():
+    checkpoint = Checkpoint("unused.json")
+    checkpoint.update({'kind': 'song'})
+    checkpoint.set_offset(100)
+    checkpoint.update({'kind': 'jingle'})
+    assert checkpoint.snapshot() == {'kind': 'jingle', 'offset': 0}
+
+
+def test_corrupt_checkpoint_is_ignored(tmp_path):
+    path = tmp_path / "checkpoint.json"
+    path.write_text("[1, 2")
+    assert Checkpoint(str(path)).load() is None
+
+    path.write_text(json.dumps([1, 2]))
+    assert Checkpoint(str(path)).load() is None
+
+
+def test_stop_logs_write_errors(tmp_path, caplog):
+    checkpoint = Checkpoint(str(tmp_path / "missing" / "checkpoint.json"), interval=60)
+    checkpoint.start()
+    checkpoint.update({'kind': 'song'})
+
+    checkpoint.stop()
+
+    assert checkpoint.thread is None
+    assert "Can't write the checkpoint" in caplog.text
+
+
+def test_resume_after_jingle_continues_rotation(tmp_path, make_playlist, make_stream):
+    songs = make_playlist("song", 3)
+    jingles = make_playlist("jingle", 3)
+    checkpoint = Checkpoint(str(tmp_path / "checkpoint.json"))
+
+    jingles.start_playing()
+    jingles.next_song()
+    songs.start_playing()
+    checkpoint.update({
+        'kind': 'jingle',
+        'file': jingles.get_current_song().get_filename(),
+        'playlist': songs.get_state(),
+        'jingles': jingles.get_state(),
+        'advertisements': None,
+    })
+    checkpoint.save()
+
+    restored_songs = make_playlist("song", 3)
+    restored_jingles = make_playlist("jingle", 3)
+    stream = make_stream()
+    stream.set_playlist(restored_songs)
+    stream.set_jingles(restored_jingles)
+    stream.set_checkpoint(checkpoint)
+    restored_songs.start_playing()
+    restored_jingles.start_playing()
+
+    assert stream._restore_checkpoint() == 0
+    assert restored_songs.current_index == 1
+    assert restored_jingles.current_index == 2
+
+
+def test_resume_song_at_offset(tmp_path, make_playlist, make_stream):
+    songs = make_playlist("song", 3)
+    songs.start_playing()
+    songs.next_song()
+
+    checkpoint = Checkpoint(str(tmp_path / "checkpoint.json"))
+    checkpoint.update({
+        'kind': 'song',
+        'file': songs.get_current_song().get_filename(),
+        'playlist': songs.get_state(),
+    })
+    checkpoint.set_offset(8192)
+    checkpoint.save()
+
+    restored = make_playlist("song", 3)
+    stream = make_stream()
+    stream.set_playlist(restored)
+    stream.set_checkpoint(checkpoint)
+    restored.start_playing()
+
+    assert stream._restore_checkpoint() == 8192
+    assert restored.current_index == 1
+
+
+def test_checkpoint_stops_when_playlist_ends(tmp_path, make_playlist, make_stream):
+    checkpoint = Checkpoint(str(tmp_path / "checkpoint.json"), interval=60)
+    stream = make_stream()
+    stream.set_playlist(make_playlist("song", 2, loop=False))
+    stream.set_checkpoint(checkpoint, resume=False)
+
+    stream.start()
+
+    assert checkpoint.thread is None
+    assert checkpoint.load()['kind'] == 'song'
+
+
+def test_checkpoint_of_another_playlist_is_ignored(tmp_path, make_playlist, make_stream):
+    songs = make_playlist("song", 3)
+    songs.name = "morning"
+    songs.start_playing()
+    songs.next_song()
+
+    checkpoint = Checkpoint(str(tmp_path / "checkpoint.json"))
+    checkpoint.update({
+        'kind': 'song',
+        'file': songs.get_current_song().get_filename(),
+        'playlist': songs.get_state(),
+    })
+    checkpoint.set_offset(8192)
+    checkpoint.save()
+
+    restored = make_playlist("song", 3)
+    restored.name = "evening"
+    stream = make_stream()
+    stream.set_playlist(restored)
+    stream.set_checkpoint(checkpoint)
+    restored.start_playing()
+
+    assert stream._restore_checkpoint() == 0
+    assert restored.current_index == 0
@@ -0,0 +1,113 @@
+import json
+import os
+import urllib.error
+import urllib.request
+
+import pytest
+
+from streaming.control import ControlServer
+from streaming.intake import RequestIntake
+
+
+@pytest.fixture
+def control(make_stream, make_playlist):
+    stream = make_stream()
+    stream.set_playlist(make_playlist("song", 3))
+    stream.set_request_intake(RequestIntake(rate_limit=1))
+    server = ControlServer(stream, port=0)
+    server.start()
+    yield server
+    server.stop()
+
+
+def call(control: ControlServer, method: str, path: str, body: dict = None,
+         content_type: str = "application/json") -> tuple:
+    data = json.dumps(body).encode("utf-8") if body is not None else None
+    request = urllib.request.Request(f"http://127.0.0.1:{control.port}{path}", data=data, method=method,
+                                     headers={"Content-Type": content_type})
+    try:
+        with urllib.request.urlopen(request, timeout=5) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as error:
+        return error.code, json.loads(error.read())
+
+
+def test_status(control):
+    code, body = call(control, "GET", "/status")
+    assert code == 200
+    assert body == {"playing": False, "kind": None, "current": None}
+
+
+def test_unknown_route(control):
+    assert call(control, "GET", "/missing")[0] == 404
+
+
+def test_skip_sets_the_skip_event(control):
+    assert call(control, "POST", "/skip") == (200, {"ok": True})
+    assert control.stream.skip_event.is_set()
+    assert control.stream.interrupt_event.is_set()
+
+
+def test_enqueue(control):
+    first, second = (song.get_filename() for song in control.stream.current_playlist.get_all_songs()[1:])
+    assert call(control, "POST", "/enqueue", {"file": first, "requested_by": "alice"}) == (200, {"ok": True})
+
+    code, body = call(control, "GET", "/queue")
+    assert code == 200
+    assert [song["file"] for song in body] == [first]
+
+    code, body = call(control, "POST", "/enqueue", {"file": second, "requested_by": "alice"})
+    assert code == 409
+    assert "Too many requests" in body["error"]
+
+    assert call(control, "POST", "/enqueue", {"name": "no file"})[0] == 400
+
+
+def test_trace_requires_a_tracer(control):
+    assert call(control, "GET", "/trace")[0] == 400
+
+
+def test_upcoming(control):
+    code, body = call(control, "GET", "/upcoming?count=2")
+    assert code == 200
+    assert [item["kind"] for item in body] == ["song", "song"]
+
+    code, body = call(control, "GET", "/upcoming?count=1000")
+    assert code == 200
+    assert len(body) == 50
+    assert len(control.stream.break_rolls) == 51
+
+    for count in ("0", "-1", "2.5", "many"):
+        assert call(control, "GET", f"/upcoming?count={count}")[0] == 400
+
+    assert call(control, "GET", "/upcoming", {"count": 2.5})[0] == 400
+
+
+def test_enqueue_only_accepts_songs_of_the_library(control, make_mp3, tmp_path):
+    (tmp_path / "secret.txt").write_text("secret")
+    outside = make_mp3("outside.mp3")
+    missing = control.stream.current_playlist.get_all_songs()[2].get_filename()
+    os.remove(missing)
+
+    for file in (str(tmp_path / "secret.txt"), outside, missing, str(tmp_path / "nothing.mp3")):
+        assert call(control, "POST", "/enqueue", {"file": file})[0] == 400
+
+    os.mkdir(tmp_path / "music")
+    make_mp3("music/inside.mp3")
+    control.stream.music_directory = str(tmp_path / "music")
+    assert call(control, "POST", "/enqueue", {"file": "../outside.mp3"})[0] == 400
+    assert call(control, "POST", "/enqueue", {"file": "inside.mp3"}) == (200, {"ok": True})
+    assert control.stream.request_intake.get_queue()[0].get_filename() == str(tmp_path / "music" / "inside.mp3")
+
+
+def test_post_requires_json(control):
+    assert call(control, "POST", "/stop", content_type="text/plain")[0] == 415
+    assert not control.stream.force_stop
+
+
+def test_profiler_interval_is_validated(control):
+    for interval in (0, -1, 0.00001, "often", None):
+        assert call(control, "POST", "/profiler/start", {"interval": interval})[0] == 400
+
+    # A valid interval is only rejected because the stream is not running.
+    assert call(control, "POST", "/profiler/start", {"interval": 0.01})[0] == 409
@@ -0,0 +1,90 @@
+import json
+
+from streaming import Song
+from streaming.history import PlayHistory
+
+
+class Clock:
+    def __init__(self):
+        self.time = 1000.0
+
+    def __call__(self) -> float:
+        return self.time
+
+
+def test_record_and_finish():
+    clock = Clock()
+    history = PlayHistory(capacity=10, clock=clock)
+    event = history.record(Song("a.mp3", song_name="A", song_artist="Artist"))
+    clock.time += 30
+
+    history.finish(event, skipped=True)
+
+    recent = history.get_recent()
+    assert len(recent) == 1
+    assert recent[0]["played"] == 30.0
+    assert recent[0]["skipped"]
+    assert history.last_played_at("a.mp3") == 1000.0
+    assert history.artist_last_played_at("Artist") == 1000.0
+    assert history.played_within("a.mp3", 60)
+    assert not history.played_within("a.mp3", 10)
+
+
+def test_capacity_of_one():
+    clock = Clock()
+    history = PlayHistory(capacity=1, clock=clock)
+
+    event = history.record(Song("a.mp3"))
+    clock.time += 5
+    history.finish(event)
+
+    assert history.played == [5.0]
+    assert len(history.get_recent()) == 1
+
+
+def test_ring_bounds():
+    clock = Clock()
+    history = PlayHistory(capacity=3, clock=clock)
+    events = [history.record(Song(f"{index}.mp3", song_artist=f"Artist {index}")) for index in range(5)]
+
+    assert len(history) == 3
+    assert [event["file"] for event in history.get_recent()] == ["4.mp3", "3.mp3", "2.mp3"]
+    assert history.last_played_at("1.mp3") is None
+    assert history.artist_last_played_at("Artist 1") is None
+    assert history.last_played_at("2.mp3") is not None
+
+    # The oldest event in the ring can still be finished, evicted events are ignored.
+    clock.time += 10
+    history.finish(events[2])
+    history.finish(events[1])
+    assert history.get_recent()[-1]["played"] == 10.0
+    assert sorted(history.played) == [0.0, 0.0, 10.0]
+
+
+def test_kinds_filter():
+    history = PlayHistory(clock=Clock())
+    history.record(Song("a.mp3"), "song")
+    history.record(Song("j.mp3"), "jingle")
+
+    assert [event["file"] for event in history.get_recent()] == ["a.mp3"]
+    assert [event["kind"] for event in history.get_recent(kinds=None)] == ["jingle", "song"]
+
+
+def test_export_is_written_in_the_background(tmp_path):
+    path = tmp_path / "history.jsonl"
+    history = PlayHistory(export_path=str(path), clock=Clock())
+
+    for index in range(3):
+        history.finish(history.record(Song(f"{index}.mp3")))
+
+    assert history.flush(timeout=5)
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [line["file"] for line in lines] == ["0.mp3", "1.mp3", "2.mp3"]
+
+
+def test_export_errors_are_logged(tmp_path, caplog):
+    history = PlayHistory(export_path=str(tmp_path / "missing" / "history.jsonl"), clock=Clock())
+    history.finish(history.record(Song("a.mp3")))
+
+    assert history.flush(timeout=5)
+    assert "Can't append 1 events" in caplog.text
@@ -0,0 +1,111 @@
+import pytest
+
+from streaming import Song
+from streaming.history import PlayHistory
+from streaming.intake import RequestIntake, RequestRejected
+
+
+@pytest.fixture(autouse=True)
+def song_files(tmp_path, monkeypatch):
+    """
+    Requests are only accepted for files that exist, run every test in a directory with a few of them.
+    """
+    monkeypatch.chdir(tmp_path)
+    for name in ("a.mp3", "b.mp3", "c.mp3", "announcement.mp3"):
+        (tmp_path / name).write_bytes(b"audio")
+
+
+def test_requests_are_flushed_in_order(make_playlist):
+    playlist = make_playlist("song", 3)
+    intake = RequestIntake()
+    intake.request(Song("a.mp3", song_requested_by="alice"))
+    intake.request(Song("b.mp3", song_requested_by="bob"))
+
+    assert [song.get_filename() for song in intake.get_queue()] == ["a.mp3", "b.mp3"]
+    assert intake.flush(playlist) == 2
+    assert intake.flush(playlist) == 0
+    assert [song.get_filename() for song in playlist.get_requested_songs()] == ["a.mp3", "b.mp3"]
+
+
+def test_rate_limit():
+    intake = RequestIntake(rate_limit=2, rate_window=600)
+    intake.request(Song("a.mp3", song_requested_by="alice"))
+    intake.request(Song("b.mp3", song_requested_by="alice"))
+
+    with pytest.raises(RequestRejected, match="Too many requests"):
+        intake.request(Song("c.mp3", song_requested_by="alice"))
+
+    intake.request(Song("c.mp3", song_requested_by="bob"))
+
+
+def test_duplicates_and_full_queue_are_rejected():
+    intake = RequestIntake(rate_limit=10, max_queue=2)
+    intake.request(Song("a.mp3"))
+
+    with pytest.raises(RequestRejected, match="already requested"):
+        intake.request(Song("a.mp3"))
+
+    intake.request(Song("b.mp3"))
+    with pytest.raises(RequestRejected, match="queue is full"):
+        intake.request(Song("c.mp3"))
+
+
+def test_duplicate_of_a_request_in_the_playlist(make_stream, make_playlist):
+    stream = make_stream()
+    playlist = make_playlist("song", 2)
+    playlist.add_song_and_play_next(Song("a.mp3"))
+    stream.set_playlist(playlist)
+    intake = RequestIntake()
+    stream.set_request_intake(intake)
+
+    with pytest.raises(RequestRejected):
+        intake.request(Song("a.mp3"))
+
+
+def test_recently_played_songs_are_rejected(make_stream):
+    now = [1000.0]
+    stream = make_stream()
+    stream.set_history(PlayHistory(clock=lambda: now[0]))
+    intake = RequestIntake(min_replay_interval=3600, min_artist_interval=600)
+    stream.set_request_intake(intake)
+
+    stream.history.record(Song("a.mp3", song_name="A", song_artist="Artist"), "song")
+    now[0] += 1200
+
+    with pytest.raises(RequestRejected, match="A was played 20 minutes ago"):
+        intake.request(Song("a.mp3", song_name="A"))
+
+    intake.request(Song("b.mp3", song_name="B", song_artist="Artist"))
+
+
+def test_skip_is_rate_limited(make_stream):
+    stream = make_stream()
+    intake = RequestIntake(rate_limit=1)
+    stream.set_request_intake(intake)
+
+    intake.skip("alice")
+    assert stream.force_next
+
+    with pytest.raises(RequestRejected):
+        intake.skip("alice")
+
+
+def test_missing_files_are_rejected():
+    intake = RequestIntake()
+
+    with pytest.raises(RequestRejected, match="can't be found"):
+        intake.request(Song("missing.mp3", song_name="Missing"))
+
+    assert intake.get_queue() == []
+
+
+def test_announcements_are_queued_with_their_song():
+    intake = RequestIntake(rate_limit=10)
+    intake.request(Song("a.mp3"), Song("announcement.mp3"))
+    intake.request(Song("b.mp3"), Song("announcement.mp3"))
+
+    with pytest.raises(RequestRejected, match="already requested"):
+        intake.request(Song("a.mp3"), Song("announcement.mp3"))
+
+    assert [song.get_filename() for song in intake.get_queue()] == \
+        ["announcement.mp3", "a.mp3", "announcement.mp3", "b.mp3"]
@@ -0,0 +1,141 @@
+import concurrent.futures
+import os
+
+import pytest
+
+from streaming import Song
+from streaming.cache import FileCache
+from streaming.integrity import STATUS_DAMAGED, STATUS_OK, STATUS_QUARANTINED, IntegrityIndex, scan_file
+from streaming.parsers.mp3 import silent_frame
+
+FRAME = silent_frame(128, 44100, 2)
+MONO_FRAME = silent_frame(128, 44100, 1)
+
+
+def write(tmp_path, name: str, data: bytes) -> str:
+    path = str(tmp_path / name)
+    with open(path, "wb") as fp:
+        fp.write(data)
+    return path
+
+
+def test_valid_file(tmp_path):
+    result = scan_file(write(tmp_path, "song.mp3", FRAME * 10))
+
+    assert result['status'] == STATUS_OK
+    assert result['ranges'] == [[0, 10 * len(FRAME)]]
+    assert result['frames'] == 10
+    assert (result['sample_rate'], result['channels']) == (44100, 2)
+    assert result['errors'] == []
+
+
+def test_garbage_is_left_out_after_a_resync(tmp_path):
+    end = 20 * len(FRAME)
+    result = scan_file(write(tmp_path, "song.mp3", FRAME * 20 + bytes(100) + FRAME * 20))
+
+    assert result['status'] == STATUS_DAMAGED
+    assert result['ranges'] == [[0, end], [end + 100, 2 * end + 100]]
+    assert result['errors'] == [f"Lost sync at {end}, resynced at {end + 100}"]
+
+
+def test_frames_of_another_format_are_skipped(tmp_path):
+    end = 20 * len(FRAME)
+    path = write(tmp_path, "song.mp3", FRAME * 20 + MONO_FRAME * 2 + FRAME * 20)
+
+    result = scan_file(path)
+
+    assert result['ranges'] == [[0, end], [end + 2 * len(MONO_FRAME), 2 * end + 2 * len(MONO_FRAME)]]
+    assert result['status'] == STATUS_DAMAGED
+
+
+def test_truncated_final_frame(tmp_path):
+    end = 20 * len(FRAME)
+    result = scan_file(write(tmp_path, "song.mp3", FRAME * 20 + FRAME[:200]))
+
+    assert result['status'] == STATUS_DAMAGED
+    assert result['ranges'] == [[0, end]]
+    assert result['frames'] == 20
+    assert result['errors'] == [f"Truncated frame at {end}"]
+
+
+@pytest.mark.parametrize("tag", [b"TAG" + bytes(125), b"APETAGEX" + bytes(24), b"LYRICSBEGIN" + bytes(20)])
+def test_trailing_tags_are_not_errors(tmp_path, tag):
+    result = scan_file(write(tmp_path, "song.mp3", FRAME * 20 + tag))
+
+    assert result['status'] == STATUS_OK
+    assert result['ranges'] == [[0, 20 * len(FRAME)]]
+    assert result['errors'] == []
+
+
+def test_garbage_before_a_trailing_tag(tmp_path):
+    end = 20 * len(FRAME)
+    result = scan_file(write(tmp_path, "song.mp3", FRAME * 20 + bytes(50) + b"TAG" + bytes(125)))
+
+    assert result['status'] == STATUS_DAMAGED
+    assert result['ranges'] == [[0, end]]
+    assert result['errors'] == [f"Lost sync at {end}, 50 bytes skipped"]
+
+
+def test_format_mismatch_is_quarantined(tmp_path):
+    stereo = write(tmp_path, "stereo.mp3", FRAME * 10)
+    mono = write(tmp_path, "mono.mp3", MONO_FRAME * 10)
+
+    assert scan_file(stereo, sample_rate=44100, channels=2)['status'] == STATUS_OK
+    assert scan_file(mono, sample_rate=44100)['status'] == STATUS_OK
+
+    result = scan_file(stereo, sample_rate=48000, channels=2)
+    assert result['status'] == STATUS_QUARANTINED
+    assert result['reason'] == "44100 Hz, 2 channels does not match the stream (48000 Hz, 2 channels)."
+    assert scan_file(mono, sample_rate=44100, channels=2)['status'] == STATUS_QUARANTINED
+
+
+def test_files_without_frames_are_quarantined(tmp_path):
+    result = scan_file(write(tmp_path, "song.mp3", bytes(5000)))
+
+    assert result['status'] == STATUS_QUARANTINED
+    assert result['reason'] == "No MP3 frames found."
+
+
+def test_min_valid(tmp_path):
+    # 10 of 12 frames worth of bytes are valid.
+    path = write(tmp_path, "song.mp3", FRAME * 5 + bytes(2 * len(FRAME)) + FRAME * 5)
+
+    result = scan_file(path)
+    assert result['status'] == STATUS_QUARANTINED
+    assert result['reason'] == "Only 83% of the file is valid audio."
+
+    assert scan_file(path, min_valid=0.8)['status'] == STATUS_DAMAGED
+
+
+class FailingExecutor:
+    def __init__(self, *args, **kwargs):
+        raise AssertionError("The files should not be scanned again.")
+
+
+def test_index(tmp_path, monkeypatch):
+    ok = write(tmp_path, "ok.mp3", FRAME * 10)
+    damaged = write(tmp_path, "damaged.mp3", FRAME * 20 + bytes(100) + FRAME * 20)
+    quarantined = write(tmp_path, "quarantined.mp3", MONO_FRAME * 10)
+    songs = [Song(ok), Song(damaged), Song(quarantined), Song(str(tmp_path / "song.ogg"))]
+    cache_path = str(tmp_path / "integrity.json")
+
+    index = IntegrityIndex(FileCache(cache_path), sample_rate=44100, channels=2)
+    assert index.scan(songs, workers=1) == {STATUS_OK: 1, STATUS_DAMAGED: 1, STATUS_QUARANTINED: 1}
+
+    assert index.is_quarantined(quarantined)
+    assert not index.is_quarantined(damaged)
+    assert index.get_ranges(ok) is None
+    assert index.get_ranges(damaged) == [(0, 20 * len(FRAME)), (20 * len(FRAME) + 100, 40 * len(FRAME) + 100)]
+    report = index.get_report()
+    assert list(report["quarantined"]) == [os.path.abspath(quarantined)]
+    assert list(report["damaged"]) == [os.path.abspath(damaged)]
+
+    # Results are reused as long as the files and the settings are the same.
+    monkeypatch.setattr(concurrent.futures, "ProcessPoolExecutor", FailingExecutor)
+    index = IntegrityIndex(FileCache(cache_path), sample_rate=44100, channels=2)
+    assert index.scan(songs) == {STATUS_OK: 1, STATUS_DAMAGED: 1, STATUS_QUARANTINED: 1}
+    assert index.is_quarantined(quarantined)
+
+    index.channels = 1
+    with pytest.raises(AssertionError):
+        index.scan(songs)
@@ -0,0 +1,98 @@
+import threading
+import time
+
+from streaming import Song
+from streaming.metadata import MetadataUpdater
+
+
+class RecordingConnection:
+    def __init__(self, failures: int = 0, block: threading.Event = None):
+        self.failures = failures
+        self.block = block
+        self.started = threading.Event()
+        self.sent = []
+
+    def set_metadata(self, metadata: dict) -> None:
+        self.started.set()
+        if self.block:
+            self.block.wait()
+
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("server busy")
+
+        self.sent.append(metadata)
+
+
+def wait_for(condition, timeout: float = 2.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.005)
+    return condition()
+
+
+def test_updates_are_coalesced():
+    connection = RecordingConnection()
+    updater = MetadataUpdater(connection, coalesce_delay=0.05)
+
+    for name in ("one", "two", "three"):
+        updater.update(Song("song.mp3", song_name=name))
+
+    assert wait_for(lambda: connection.sent)
+    updater.stop()
+    assert connection.sent == [{"song": "three"}]
+
+
+def test_hidden_kinds():
+    connection = RecordingConnection()
+    updater = MetadataUpdater(connection, coalesce_delay=0.01)
+    updater.hide(("jingle",), title="Radio")
+
+    updater.update(Song("jingle.mp3", song_name="Jingle"), kind="jingle")
+
+    assert wait_for(lambda: connection.sent)
+    updater.stop()
+    assert connection.sent == [{"song": "Radio"}]
+
+
+def test_failed_updates_are_retried():
+    connection = RecordingConnection(failures=2)
+    updater = MetadataUpdater(connection, coalesce_delay=0.01, retry_delay=0.01)
+
+    updater.update(Song("song.mp3", song_name="Song"))
+
+    assert wait_for(lambda: connection.sent)
+    updater.stop()
+    assert updater.failures == 2
+
+
+def test_metadata_has_its_own_connection(make_stream):
+    connection = RecordingConnection()
+    stream = make_stream(metadata_output=connection)
+    stream.metadata.coalesce_delay = 0.01
+
+    assert connection.mount == "/test"
+    assert connection.host == "localhost"
+
+    # A metadata update does not wait for the audio.
+    with stream.send_lock:
+        stream.metadata.update(Song("song.mp3", song_name="Song"))
+        assert wait_for(lambda: connection.sent)
+
+    stream.metadata.stop()
+    assert stream.shout.metadata is None
+
+
+def test_stop_waits_for_an_update_being_sent():
+    block = threading.Event()
+    connection = RecordingConnection(block=block)
+    updater = MetadataUpdater(connection, coalesce_delay=0.01, retry_delay=0.01)
+    updater.update(Song("song.mp3", song_name="Song"))
+    assert connection.started.wait(2)
+    worker = updater.thread
+
+    threading.Timer(0.1, block.set).start()
+    updater.stop()
+
+    assert not worker.is_alive()
+    assert connection.sent == [{"song": "Song"}]
@@ -0,0 +1,110 @@
+import struct
+
+import pytest
+
+from streaming.parsers.mp3 import MP3, find_frame, id3v2_size, last_frame_end, parse_frame_header, silent_frame
+
+
+def xing_frame(frames: int, audio_bytes: int, delay: int = 576, padding: int = 1000) -> bytes:
+    frame = bytearray(silent_frame(128, 44100, 2))
+    cursor = 4 + 32
+    frame[cursor:cursor + 16] = b"Xing" + struct.pack(">III", 0x3, frames, audio_bytes)
+    cursor += 16
+    lame = bytearray(b"LAME3.100" + bytes(15))
+    lame[21] = delay >> 4
+    lame[22] = (delay & 0x0F) << 4 | padding >> 8
+    lame[23] = padding & 0xFF
+    frame[cursor:cursor + 24] = lame
+    return bytes(frame)
+
+
+def id3v2_tag(size: int) -> bytes:
+    synchsafe = bytes([(size >> 21) & 0x7F, (size >> 14) & 0x7F, (size >> 7) & 0x7F, size & 0x7F])
+    return b"ID3\x04\x00\x00" + synchsafe + bytes(size)
+
+
+def test_parse_frame_header():
+    frame = parse_frame_header(silent_frame(128, 44100, 2))
+    assert frame['bitrate'] == 128
+    assert frame['sample_rate'] == 44100
+    assert frame['channels'] == 2
+    assert frame['samples'] == 1152
+    assert frame['length'] == 417
+
+    assert parse_frame_header(b"\x00\x00\x00\x00") is None
+    assert parse_frame_header(b"\xff\xfb") is None
+
+
+def test_silent_frame_rejects_invalid_formats():
+    with pytest.raises(ValueError):
+        silent_frame(128, 44000, 2)
+
+    with pytest.raises(ValueError):
+        silent_frame(320, 22050, 2)
+
+
+def test_find_frame_requires_two_frames():
+    frame = silent_frame()
+    data = b"\xff\xfb\x90" + bytes(10) + frame * 2
+    assert find_frame(data) == 13
+
+
+def test_last_frame_end():
+    frame = silent_frame(128, 44100, 2)
+    assert last_frame_end(frame * 3) == len(frame) * 3
+    assert last_frame_end(frame * 3 + frame[:100]) == len(frame) * 3
+    assert last_frame_end(b"garbage" + frame * 2 + frame[:5]) == 7 + len(frame) * 2
+    assert last_frame_end(frame[:100]) == 0
+    assert last_frame_end(bytes(100)) == 0
+
+
+def test_id3v2_size():
+    assert id3v2_size(id3v2_tag(1000)) == 1010
+    assert id3v2_size(b"no tag here") == 0
+
+
+def test_constant_bitrate_scan(tmp_path):
+    path = tmp_path / "cbr.mp3"
+    frame = silent_frame(128, 44100, 2)
+    path.write_bytes(id3v2_tag(20000) + frame * 1000)
+
+    info = MP3(str(path)).data
+    assert info['bitrate'] == 128
+    assert info['audio_start'] == 20010
+    assert not info['vbr']
+    assert info['duration'] == pytest.approx(1000 * 417 * 8 / 128000)
+
+
+def test_xing_lame_header(tmp_path):
+    path = tmp_path / "xing.mp3"
+    frame = silent_frame(128, 44100, 2)
+    path.write_bytes(xing_frame(1000, 1000 * len(frame)) + frame * 1000)
+
+    info = MP3(str(path)).data
+    assert info['frames'] == 1000
+    assert info['delay'] == 576
+    assert info['padding'] == 1000
+    assert info['audio_start'] == len(frame)
+    assert info['duration'] == pytest.approx((1000 * 1152 - 576 - 1000) / 44100)
+
+
+def test_vbri_header(tmp_path):
+    path = tmp_path / "vbri.mp3"
+    frame = bytearray(silent_frame(128, 44100, 2))
+    frame[36:58] = b"VBRI" + bytes(6) + struct.pack(">II", 417 * 500, 500) + bytes(4)
+    path.write_bytes(bytes(frame) + silent_frame() * 500)
+
+    info = MP3(str(path)).data
+    assert info['vbr']
+    assert info['frames'] == 500
+    assert info['duration'] == pytest.approx(500 * 1152 / 44100)
+    assert info['bitrate'] == 128
+
+
+def test_no_frames(tmp_path):
+    path = tmp_path / "empty.mp3"
+    path.write_bytes(bytes(5000))
+
+    info = MP3(str(path)).data
+    assert info['duration'] == 0.0
+    assert info['bitrate'] == 0
@@ -0,0 +1,134 @@
+import io
+import struct
+
+import pytest
+
+from streaming import Song
+from streaming.outputs import NullOutput
+from streaming.parsers.ogg import (PAGE_BOS, PAGE_EOS, Ogg, identify, make_page, page_checksum, parse_page_header,
+                                   read_page, set_page_serial)
+
+SAMPLE_RATE = 44100
+
+
+def vorbis_file(serial: int = 1234, seconds: int = 20, page_size: int = 2000, eos: bool = True) -> bytes:
+    """
+    A Vorbis file with one page per second of audio.
+    """
+    identification = b"\x01vorbis" + struct.pack("<IBIiii", 0, 2, SAMPLE_RATE, 0, 128000, 0) + b"\xb8\x01"
+    pages = [
+        make_page(identification, serial, 0, 0, PAGE_BOS),
+        make_page(b"\x03vorbis" + bytes(100), serial, 1, 0),
+    ]
+    for second in range(1, seconds + 1):
+        flags = PAGE_EOS if eos and second == seconds else 0
+        pages.append(make_page(bytes(page_size), serial, second + 1, second * SAMPLE_RATE, flags))
+    return b"".join(pages)
+
+
+def pages_of(data: bytes) -> list:
+    fp = io.BytesIO(data)
+    pages = []
+    while (result := read_page(fp)) is not None:
+        pages.append(result[0])
+    return pages
+
+
+def test_make_page_round_trip():
+    page = make_page(b"x" * 600, 7, 3, 1000, PAGE_BOS)
+    header = parse_page_header(page)
+
+    assert header['serial'] == 7
+    assert header['sequence'] == 3
+    assert header['granule'] == 1000
+    assert header['body_size'] == 600
+    assert header['length'] == len(page)
+
+    zeroed = bytearray(page)
+    zeroed[22:26] = bytes(4)
+    assert header['checksum'] == page_checksum(zeroed)
+
+
+@pytest.mark.parametrize("size", [0, 1, 254, 255, 4000])
+def test_set_page_serial_updates_the_checksum(size):
+    page = set_page_serial(make_page(bytes(range(256)) * (size // 256) + bytes(size % 256), 1, 5, 99), 0xDEADBEEF)
+    header = parse_page_header(page)
+
+    zeroed = bytearray(page)
+    zeroed[22:26] = bytes(4)
+    assert header['serial'] == 0xDEADBEEF
+    assert header['checksum'] == page_checksum(zeroed)
+
+
+def test_read_page_skips_garbage():
+    data = b"garbage" + make_page(b"a", 1, 0, 0) + make_page(b"b", 1, 1, 0)
+    assert [page['sequence'] for page in pages_of(data)] == [0, 1]
+
+
+def test_identify_and_probe(tmp_path):
+    path = tmp_path / "song.ogg"
+    path.write_bytes(vorbis_file(seconds=20))
+
+    info = Ogg(str(path)).data
+    assert info['codec'] == 'vorbis'
+    assert info['sample_rate'] == SAMPLE_RATE
+    assert info['duration'] == pytest.approx(20.0)
+    assert identify(b"not a header") is None
+
+
+def test_resume_at_offset_is_paced_from_the_offset(make_stream):
+    data = vorbis_file(seconds=20)
+    stream = make_stream(stream_format="ogg")
+    stream.chunk_size = 1
+
+    chunks = list(stream._ogg_chunks(io.BytesIO(data), len(data) // 2, {}))
+    granules = [pages_of(buffer)[0]['granule'] for buffer, _ in chunks]
+
+    # The header pages, then the pages from the offset on. The first page after the offset starts the timing.
+    assert granules[:2] == [0, 0]
+    assert granules[2] > 5 * SAMPLE_RATE
+    assert [duration for _, duration in chunks] == [0.0] * 3 + [1.0] * (len(chunks) - 3)
+
+
+def test_colliding_serial_is_changed(make_stream):
+    stream = make_stream(stream_format="ogg")
+
+    first = b"".join(buffer for buffer, _ in stream._ogg_chunks(io.BytesIO(vorbis_file(serial=5)), 0, {}))
+    second = b"".join(buffer for buffer, _ in stream._ogg_chunks(io.BytesIO(vorbis_file(serial=5)), 0, {}))
+    third = b"".join(buffer for buffer, _ in stream._ogg_chunks(io.BytesIO(vorbis_file(serial=9)), 0, {}))
+
+    assert {page['serial'] for page in pages_of(first)} == {5}
+    assert {page['serial'] for page in pages_of(second)} == {6}
+    assert {page['serial'] for page in pages_of(third)} == {9}
+
+
+def test_multiplexed_streams_keep_their_serials(make_stream):
+    stream = make_stream(stream_format="ogg")
+    stream.last_ogg_serials = {5}
+    first, second = pages_of(vorbis_file(serial=5, seconds=2)), vorbis_file(serial=7, seconds=2)
+    data = vorbis_file(serial=5, seconds=2)[:first[0]['length']] + second[:first[0]['length']] + \
+        vorbis_file(serial=5, seconds=2)[first[0]['length']:] + second[first[0]['length']:]
+
+    output = b"".join(buffer for buffer, _ in stream._ogg_chunks(io.BytesIO(data), 0, {}))
+
+    assert sorted({page['serial'] for page in pages_of(output)}) == [6, 7]
+
+
+def test_skip_ends_the_logical_stream(tmp_path, make_stream):
+    path = tmp_path / "song.ogg"
+    path.write_bytes(vorbis_file(serial=5, seconds=20))
+    sent = []
+    stream = make_stream(stream_format="ogg", output=NullOutput(on_send=sent.append))
+    stream.chunk_size = 4096
+
+    def skip_after_first_chunk(buffer):
+        sent.append(buffer)
+        stream.next_song()
+
+    stream.shout.on_send = skip_after_first_chunk
+    stream.stream_audio(Song(str(path)))
+
+    last = pages_of(sent[-1])[-1]
+    assert last['header_type'] & PAGE_EOS
+    assert last['sequence'] == pages_of(sent[0])[-1]['sequence'] + 1
+    assert pages_of(sent[-1])[-1]['body_size'] == 0
@@ -0,0 +1,102 @@
+import threading
+
+import pytest
+
+from streaming.pacing import TokenBucketPacer
+
+
+class FakeClock:
+    def __init__(self):
+        self.time = 0.0
+        self.sleeps = []
+
+    def now(self) -> float:
+        return self.time
+
+    def sleep(self, seconds: float, cancel: threading.Event = None) -> bool:
+        if cancel is not None and cancel.is_set():
+            return True
+
+        self.sleeps.append(seconds)
+        self.time += seconds
+        return False
+
+
+def test_burst_is_sent_without_waiting():
+    clock = FakeClock()
+    pacer = TokenBucketPacer(lead=0.5, burst=2.0, clock=clock)
+
+    for _ in range(4):
+        assert pacer.pace(0.5)
+
+    assert clock.sleeps == []
+    assert pacer.sent == 2.0
+
+
+def test_pacing_keeps_lead():
+    clock = FakeClock()
+    pacer = TokenBucketPacer(lead=0.5, burst=0.5, clock=clock)
+
+    for _ in range(20):
+        pacer.pace(0.5)
+
+    assert pacer.get_lag() == pytest.approx(-0.5)
+    assert clock.time == pytest.approx(9.5)
+
+
+def test_catch_up_is_limited():
+    clock = FakeClock()
+    pacer = TokenBucketPacer(lead=0.0, burst=0.0, catchup=2.0, max_debt=5.0, clock=clock)
+    pacer.pace(1.0)
+
+    clock.time += 3.0
+    pacer.pace(1.0)
+    pacer.pace(1.0)
+
+    # Behind real time, but chunks are not sent faster than twice real time.
+    assert clock.sleeps[-1] == pytest.approx(0.5)
+
+
+def test_long_stall_is_forgiven():
+    clock = FakeClock()
+    pacer = TokenBucketPacer(lead=0.0, burst=0.0, max_debt=5.0, clock=clock)
+    pacer.pace(1.0)
+
+    clock.time += 60.0
+    pacer.pace(1.0)
+
+    # At most max_debt seconds are left to catch up, including the chunk that was just sent.
+    assert pacer.stalls == 1
+    assert pacer.get_lag() == pytest.approx(4.0)
+
+
+def test_cancel_interrupts_wait():
+    clock = FakeClock()
+    pacer = TokenBucketPacer(lead=0.0, burst=0.0, clock=clock)
+    cancel = threading.Event()
+    pacer.pace(1.0)
+
+    cancel.set()
+    assert not pacer.pace(1.0, cancel)
+    assert pacer.sent == 1.0
+
+
+def test_advance_and_reset():
+    clock = FakeClock()
+    pacer = TokenBucketPacer(clock=clock)
+    pacer.advance(1.0)
+    assert pacer.sent == 0.0
+
+    pacer.pace(1.0)
+    pacer.advance(2.0)
+    assert pacer.sent == 3.0
+
+    pacer.reset()
+    assert pacer.get_lag() == 0.0
+
+
+def test_pace_bytes():
+    clock = FakeClock()
+    pacer = TokenBucketPacer(clock=clock)
+    pacer.pace_bytes(16000, 128)
+    assert pacer.sent == pytest.approx(1.0)
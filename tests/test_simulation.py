@@ -0,0 +1,115 @@
+import os
+
+import pytest
+
+from streaming import Playlist, Song
+from streaming.integrity import IntegrityIndex
+from streaming.parsers.ogg import read_page
+from streaming.simulation import SilentOggAudio, SimulatedStream, VirtualClock
+
+
+def make_playlist(directory, prefix: str, count: int, extension: str = ".mp3") -> Playlist:
+    playlist = Playlist()
+    for index in range(count):
+        path = os.path.join(directory, f"{prefix}{index}{extension}")
+        open(path, "wb").close()
+        playlist.songs_array.append(Song(path))
+    playlist.set_loop(True)
+    return playlist
+
+
+def make_stream(**kwargs) -> SimulatedStream:
+    return SimulatedStream("/sim", "", "", "", "sim", "", "localhost", 8000, "", default_duration=200.0, **kwargs)
+
+
+def test_virtual_clock():
+    clock = VirtualClock()
+    assert not clock.sleep(2.5)
+    assert clock.now() == 2.5
+
+
+def test_silent_ogg_audio_pages():
+    audio = SilentOggAudio(3.2, 128, 44100, 2)
+    pages = []
+    while (result := read_page(audio)) is not None:
+        pages.append(result[0])
+
+    assert [page['granule'] for page in pages] == [0, 44100, 88200, 132300]
+    assert audio.tell() == audio.size
+
+    audio.seek(10)
+    assert len(audio.read(100)) == 100
+
+
+def test_mp3_run(tmp_path):
+    stream = make_stream()
+    stream.jingle_or_advertisement_chance = 30
+    stream.set_playlist(make_playlist(tmp_path, "song", 20))
+    stream.set_jingles(make_playlist(tmp_path, "jingle", 3))
+
+    report = stream.run(duration=3600, seed=1)
+
+    assert report["simulated_seconds"] == pytest.approx(3600, abs=200)
+    assert report["items"]["song"] >= 10
+    assert "first_chunk" in report["timings"]
+
+
+def test_ogg_run(tmp_path):
+    stream = make_stream(stream_format="ogg")
+    stream.set_playlist(make_playlist(tmp_path, "song", 5, ".ogg"))
+
+    report = stream.run(duration=1800, seed=1)
+
+    assert report["simulated_seconds"] == pytest.approx(1800, abs=200)
+    assert report["items"]["song"] >= 9
+
+
+def test_unplayable_songs_are_skipped(tmp_path):
+    stream = make_stream()
+    playlist = make_playlist(tmp_path, "song", 2)
+    playlist.songs_array.insert(1, Song(os.path.join(tmp_path, "other.ogg")))
+    stream.set_playlist(playlist)
+
+    report = stream.run(duration=3600)
+
+    assert report["items"]["song"] >= 15
+    assert not any(event["file"].endswith(".ogg") for event in report["programme"])
+
+
+def test_item_without_audio_ends_the_run(tmp_path):
+    stream = make_stream()
+    stream.jingle_or_advertisement_chance = 1
+    stream.set_playlist(make_playlist(tmp_path, "song", 2))
+    stream.set_jingles(make_playlist(tmp_path, "jingle", 1, ".ogg"))
+
+    with pytest.raises(RuntimeError, match="sent no audio"):
+        stream.run(duration=3600)
+
+
+def test_unplayable_playlist_ends_the_run(tmp_path):
+    stream = make_stream()
+    playlist = make_playlist(tmp_path, "song", 3)
+    stream.set_playlist(playlist)
+    stream.set_integrity_index(IntegrityIndex())
+    for song in playlist.get_all_songs():
+        stream.integrity_index.quarantined[os.path.abspath(song.get_filename())] = "test"
+
+    with pytest.raises(RuntimeError, match="No song"):
+        stream.run(duration=3600)
+
+
+def test_stream_is_not_stopped_while_sending(tmp_path):
+    stream = make_stream()
+    stream.set_playlist(make_playlist(tmp_path, "song", 3))
+    locked = []
+    stop = stream.stop
+
+    def checked_stop(*args, **kwargs):
+        locked.append(stream.send_lock.locked())
+        stop(*args, **kwargs)
+
+    stream.stop = checked_stop
+    stream.run(duration=600)
+
+    assert locked == [False]
+    assert not stream.has_started
@@ -0,0 +1,100 @@
+import os
+
+import pytest
+
+from streaming import Playlist, Song
+from streaming.snapshot import PlaylistSnapshot
+
+
+def make_playlist(count: int) -> Playlist:
+    playlist = Playlist()
+    for index in range(count):
+        song = Song(f"/music/{index:03}.mp3", song_name=f"Song {index}", song_artist="Artist")
+        song.set_audio_info({'duration': 180.5, 'bitrate': 128, 'sample_rate': 44100, 'channels': 2})
+        playlist.songs_array.append(song)
+    playlist.set_loop(True)
+    return playlist
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / "playlist.snapshot")
+    playlist = make_playlist(100)
+    playlist.current_index = 42
+    playlist.last_current_index = 41
+    playlist.to_snapshot(path)
+
+    restored = Playlist()
+    restored.from_snapshot(path)
+
+    assert len(restored.get_all_songs()) == 100
+    assert restored.current_index == 42
+    assert restored.loop_playlist
+    song = restored.get_all_songs()[7]
+    assert song.get_filename() == "/music/007.mp3"
+    assert song.get_song_name() == "Song 7"
+    assert song.get_artist() == "Artist"
+    assert song.get_duration() == pytest.approx(180.5)
+    assert restored.get_all_songs()[7] is song
+
+
+def test_snapshot_songs_can_be_modified(tmp_path):
+    path = str(tmp_path / "playlist.snapshot")
+    make_playlist(5).to_snapshot(path)
+
+    restored = Playlist()
+    restored.from_snapshot(path)
+    songs = restored.get_all_songs()
+    songs.remove(songs[1])
+    songs.append(Song("/music/new.mp3"))
+
+    assert [song.get_filename() for song in songs] == ["/music/000.mp3", "/music/002.mp3", "/music/003.mp3",
+                                                       "/music/004.mp3", "/music/new.mp3"]
+
+
+def test_rewrite_keeps_open_snapshots_intact(tmp_path):
+    path = str(tmp_path / "playlist.snapshot")
+    make_playlist(50).to_snapshot(path)
+    snapshot = PlaylistSnapshot(path)
+
+    make_playlist(3).to_snapshot(path)
+
+    assert snapshot.count == 50
+    assert snapshot.get_song(49).get_filename() == "/music/049.mp3"
+    assert PlaylistSnapshot(path).count == 3
+    assert not os.path.exists(path + ".tmp")
+
+
+def test_invalid_snapshot(tmp_path):
+    path = tmp_path / "playlist.snapshot"
+    path.write_bytes(b"not a snapshot" + bytes(100))
+
+    with pytest.raises(ValueError):
+        PlaylistSnapshot(str(path))
+
+
+def test_lookahead_with_requests_does_not_decode_the_snapshot(tmp_path):
+    path = str(tmp_path / "playlist.snapshot")
+    make_playlist(500).to_snapshot(path)
+
+    restored = Playlist()
+    restored.from_snapshot(path)
+    restored.start_playing_at_position(10)
+    restored.start_playing()
+    restored.add_song_and_play_next(Song("/music/request1.mp3"), remove_after=True)
+    restored.add_song_and_play_next(Song("/music/request2.mp3"), remove_after=True)
+    pending = [(Song("/music/request3.mp3"), True)]
+
+    upcoming = restored.get_upcoming_songs(6, pending)
+
+    assert len(restored.get_all_songs().songs) < 10
+
+    for song, remove_after in pending:
+        restored.add_song_and_play_next(song, remove_after)
+    played = []
+    for _ in range(6):
+        restored.next_song()
+        played.append(restored.get_current_song())
+
+    assert [song.get_filename() for song in upcoming] == [song.get_filename() for song in played] == [
+        "/music/request1.mp3", "/music/request2.mp3", "/music/request3.mp3", "/music/011.mp3", "/music/012.mp3",
+        "/music/013.mp3"]
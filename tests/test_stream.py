@@ -0,0 +1,113 @@
+import os
+import threading
+
+from streaming import Song
+from streaming.integrity import IntegrityIndex
+
+
+def test_unplayable_songs_are_skipped_before_the_callbacks(make_mp3, make_playlist, make_stream):
+    playlist = make_playlist("song", 3, frames=5, loop=False)
+    playlist.songs_array.insert(1, Song(make_mp3("other.ogg")))
+    stream = make_stream()
+    stream.set_playlist(playlist)
+    stream.set_integrity_index(IntegrityIndex())
+    stream.integrity_index.quarantined[os.path.abspath(playlist.songs_array[3].get_filename())] = "test"
+    announced = []
+
+    @stream.nextsong()
+    def next_song(song):
+        announced.append(os.path.basename(song.get_filename()))
+
+    stream.start()
+
+    assert announced == ["song0.mp3", "song1.mp3"]
+
+
+def test_missing_files_are_skipped(make_playlist, make_stream):
+    playlist = make_playlist("song", 3, frames=5, loop=False)
+    os.remove(playlist.songs_array[1].get_filename())
+    stream = make_stream()
+    stream.set_playlist(playlist)
+    played = []
+
+    @stream.nextsong()
+    def next_song(song):
+        played.append(os.path.basename(song.get_filename()))
+
+    stream.start()
+
+    assert played == ["song0.mp3", "song1.mp3", "song2.mp3"]
+    assert stream.shout.bytes_sent == 2 * 5 * 417
+
+
+def test_unplayable_playlist_backs_off(make_mp3, make_playlist, make_stream):
+    playlist = make_playlist("song", 0)
+    for index in range(3):
+        playlist.songs_array.append(Song(make_mp3(f"song{index}.ogg")))
+    stream = make_stream()
+    stream.set_playlist(playlist)
+    stream.unplayable_delay = 0.05
+    waits = []
+    wait = stream._wait_for_playable_songs
+
+    def counting_wait():
+        waits.append(playlist.current_index)
+        if len(waits) == 3:
+            stream.stop()
+        return wait()
+
+    stream._wait_for_playable_songs = counting_wait
+    thread = threading.Thread(target=stream.start)
+    thread.start()
+    thread.join(5)
+
+    assert not thread.is_alive()
+    assert len(waits) == 3
+
+
+def test_lookahead_leaves_out_unplayable_items(make_mp3, make_playlist, make_stream):
+    playlist = make_playlist("song", 4, frames=5, loop=False)
+    playlist.songs_array.insert(2, Song(make_mp3("other.ogg")))
+    jingles = make_playlist("jingle", 2, frames=1)
+    jingles.songs_array.insert(1, Song(make_mp3("jingle.ogg")))
+    stream = make_stream()
+    stream.jingle_or_advertisement_chance = 1
+    stream.set_playlist(playlist)
+    stream.set_jingles(jingles)
+    stream.set_integrity_index(IntegrityIndex())
+    stream.integrity_index.quarantined[os.path.abspath(playlist.songs_array[3].get_filename())] = "test"
+    played = []
+    stream_audio = stream.stream_audio
+
+    def recording_stream_audio(song, offset=0, kind="song"):
+        if stream.is_playable(song):
+            played.append((kind, os.path.basename(song.get_filename())))
+        stream_audio(song, offset, kind)
+
+    stream.stream_audio = recording_stream_audio
+
+    upcoming = [(kind, os.path.basename(song.get_filename())) for kind, song in stream.get_upcoming(20)]
+    stream.start()
+
+    assert upcoming == played == [("song", "song0.mp3"), ("jingle", "jingle0.mp3"), ("song", "song1.mp3"),
+                                  ("song", "song3.mp3"), ("jingle", "jingle1.mp3")]
+
+
+def test_unplayable_songs_are_not_announced(make_mp3, make_playlist, make_stream):
+    playlist = make_playlist("song", 2, frames=5)
+    playlist.songs_array.insert(1, Song(make_mp3("other.ogg")))
+    stream = make_stream()
+    stream.set_playlist(playlist)
+    stream.set_announce_songs(True)
+    prepared = []
+    done = threading.Event()
+
+    @stream.prepare_announcement()
+    def prepare(song):
+        prepared.append(os.path.basename(song.get_filename()))
+        done.set()
+
+    stream._prepare_next_announcement()
+
+    assert done.wait(5)
+    assert prepared == ["song1.mp3"]
@@ -0,0 +1,72 @@
+import threading
+
+from streaming import Song
+
+
+def prepare_swap(stream, playlist):
+    stream.schedule_playlist(playlist)
+    assert stream.pending_playlist["ready"].wait(5)
+
+
+def test_requests_move_to_the_new_playlist(make_mp3, make_playlist, make_stream):
+    old = make_playlist("old", 3)
+    new = make_playlist("new", 3)
+    stream = make_stream()
+    stream.set_playlist(old)
+    old.start_playing()
+
+    first, second = Song(make_mp3("first.mp3")), Song(make_mp3("second.mp3"))
+    old.add_song_and_play_next(first, remove_after=True)
+    old.add_song_and_play_next(second)
+    prepare_swap(stream, new)
+
+    assert stream._swap_playlist()
+    assert stream.current_playlist is new
+    assert new.get_requested_songs() == [first, second]
+    assert new.remove_forced_song
+    assert old.get_requested_songs() == []
+    assert first not in old.get_all_songs()
+
+    new.next_song()
+    assert new.get_current_song() is first
+
+
+def test_forced_song_that_played_does_not_move(make_mp3, make_playlist, make_stream):
+    old = make_playlist("old", 3)
+    new = make_playlist("new", 3)
+    stream = make_stream()
+    stream.set_playlist(old)
+    old.start_playing()
+
+    first, second = Song(make_mp3("first.mp3")), Song(make_mp3("second.mp3"))
+    old.add_song_and_play_next(first)
+    old.add_song_and_play_next(second)
+    old.next_song()
+    assert old.get_current_song() is first
+    prepare_swap(stream, new)
+
+    assert stream._swap_playlist()
+    assert new.get_requested_songs() == [second]
+
+
+def test_ended_playlist_continues_until_the_new_one_is_ready(make_playlist, make_stream):
+    old = make_playlist("old", 2, loop=False)
+    new = make_playlist("new", 2)
+    stream = make_stream()
+    stream.set_playlist(old)
+    stream.swap_timeout = 0.01
+    pending = {"playlist": new, "at": None, "ready": threading.Event(), "timer": None}
+    stream.pending_playlist = pending
+    old.start_playing()
+    old.next_song()
+    old.next_song()
+    assert not old.is_playing()
+
+    assert not stream._swap_playlist(ended=True)
+    assert stream.current_playlist is old
+    assert old.is_playing()
+    assert stream.pending_playlist is pending
+
+    pending["ready"].set()
+    assert stream._swap_playlist()
+    assert stream.current_playlist is new
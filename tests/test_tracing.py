@@ -0,0 +1,99 @@
+import io
+import time
+
+import pytest
+
+from streaming import Song
+from streaming.outputs import NullOutput
+from streaming.profiler import SamplingProfiler
+from streaming.tracing import Tracer
+
+
+def test_spans_nest_per_thread():
+    tracer = Tracer()
+    with tracer.span("item", file="a.mp3") as item:
+        with tracer.span("open"):
+            pass
+        item.set("bytes", 10)
+
+    open_span, item_span = tracer.get_spans()
+    assert open_span.parent_id == item_span.span_id
+    assert open_span.trace_id == item_span.trace_id
+    assert item_span.parent_id == ""
+    assert item_span.attributes == {"file": "a.mp3", "bytes": 10}
+
+
+def test_exports():
+    tracer = Tracer(service_name="test")
+    with tracer.span("item", skipped=False, bytes=1, ratio=0.5):
+        pass
+
+    chrome = tracer.to_chrome_trace()
+    assert chrome["traceEvents"][0]["name"] == "item"
+    assert chrome["traceEvents"][0]["ph"] == "X"
+
+    otlp = tracer.to_otlp()
+    span = otlp["resourceSpans"][0]["scopeSpans"][0]["spans"][0]
+    assert {attribute["key"]: attribute["value"] for attribute in span["attributes"]} == {
+        "skipped": {"boolValue": False},
+        "bytes": {"intValue": "1"},
+        "ratio": {"doubleValue": 0.5},
+    }
+
+    with pytest.raises(ValueError):
+        tracer.export("unused.json", "xml")
+
+
+def test_max_spans():
+    tracer = Tracer(max_spans=3)
+    for index in range(5):
+        with tracer.span(f"span{index}"):
+            pass
+
+    assert [span.name for span in tracer.get_spans()] == ["span2", "span3", "span4"]
+
+
+class FailingOutput(NullOutput):
+    def send(self, buffer: bytes) -> None:
+        raise OSError("connection lost")
+
+
+def test_failed_send_closes_spans_and_file(make_mp3, make_stream):
+    stream = make_stream(output=FailingOutput())
+    stream.set_tracer(Tracer())
+    audio = io.BytesIO(open(make_mp3("song.mp3", 100), "rb").read())
+    stream._open_audio = lambda song: audio
+
+    with pytest.raises(OSError):
+        stream.stream_audio(Song(make_mp3("song.mp3", 100)))
+
+    assert audio.closed
+    assert stream.tracer.local.stack == []
+    assert {span.name: span.attributes.get("error") for span in stream.tracer.get_spans()}["first_chunk"] == "OSError"
+
+    with stream.tracer.span("next"):
+        pass
+    assert stream.tracer.get_spans()[-1].parent_id == ""
+
+
+def test_item_spans(make_mp3, make_stream):
+    stream = make_stream()
+    stream.set_tracer(Tracer())
+
+    stream.stream_audio(Song(make_mp3("song.mp3", 100), song_name="Song"))
+
+    names = [span.name for span in stream.tracer.get_spans()]
+    assert names == ["open", "metadata_update", "first_chunk", "song"]
+    assert stream.tracer.get_spans()[-1].attributes["bytes"] == 41700
+
+
+def test_profiler_samples_a_thread():
+    profiler = SamplingProfiler(interval=0.001)
+    profiler.start()
+    deadline = time.monotonic() + 0.2
+    while time.monotonic() < deadline:
+        sum(range(1000))
+    profiler.stop()
+
+    assert profiler.sample_count > 0
+    assert profiler.get_top(1)[0]["samples"] > 0
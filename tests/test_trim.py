@@ -0,0 +1,46 @@
+from streaming.parsers.mp3 import parse_frame_header, silent_frame
+from streaming.trim import TrimIndex, _gain_fields, analyze_file, frame_offsets
+
+FRAME = silent_frame(128, 44100, 2)
+
+
+def audio_frame(gain: int) -> bytes:
+    """
+    Returns a frame whose side info claims audio data at the given global gain.
+    """
+    frame = bytearray(FRAME)
+    size = 32
+    bits = int.from_bytes(frame[4:4 + size], "big")
+    for position in _gain_fields(parse_frame_header(FRAME)):
+        bits |= 100 << (size * 8 - position - 12)
+        bits |= gain << (size * 8 - position - 29)
+    frame[4:4 + size] = bits.to_bytes(size, "big")
+    return bytes(frame)
+
+
+def test_quiet_intro_is_kept(tmp_path):
+    # 1 s of digital silence, a quiet intro, the song and 1 s of digital silence.
+    path = str(tmp_path / "song.mp3")
+    with open(path, "wb") as fp:
+        fp.write(FRAME * 40 + audio_frame(120) * 100 + audio_frame(200) * 100 + FRAME * 40)
+
+    with open(path, "rb") as fp:
+        offsets = frame_offsets(fp.read())[1]
+
+    result = analyze_file(path)
+    assert result['start'] == offsets[37]
+    assert result['end'] == offsets[243]
+    assert result['head'] == round(37 * 1152 / 44100, 3)
+
+    # A higher threshold trims the intro as well.
+    assert analyze_file(path, silence_gain=170)['start'] == offsets[137]
+
+
+def test_short_silence_is_kept(tmp_path):
+    path = str(tmp_path / "song.mp3")
+    with open(path, "wb") as fp:
+        fp.write(FRAME * 10 + audio_frame(200) * 100)
+
+    result = analyze_file(path)
+    assert (result['start'], result['head'], result['tail']) == (0, 0.0, 0.0)
+    assert TrimIndex().silence_gain == 1
@@ -0,0 +1,67 @@
+import time
+
+from streaming.outputs import NullOutput
+from streaming.parsers.mp3 import parse_frame_header, silent_frame
+from streaming.watchdog import UnderrunWatchdog
+
+FRAME = silent_frame(128, 44100, 2)
+
+
+def split_frames(data: bytes) -> list[int]:
+    """
+    Returns the length of every frame, fails if the data is not a sequence of whole frames.
+    """
+    lengths = []
+    position = 0
+    while position < len(data):
+        frame = parse_frame_header(data, position)
+        assert frame is not None, f"no frame at {position}"
+        lengths.append(frame['length'])
+        position += frame['length']
+
+    assert position == len(data)
+    return lengths
+
+
+def test_mp3_chunks_end_on_frame_boundaries(make_mp3, make_playlist, make_stream):
+    tag = b"ID3\x03\x00\x00\x00\x00\x00\x05tag!!"
+    path = make_mp3("tagged.mp3", data=tag + FRAME * 50 + FRAME[:100])
+    playlist = make_playlist("song", 1)
+    song = playlist.get_current_song()
+    song.file = path
+
+    for chunk_size in (1000, 100):
+        stream = make_stream()
+        stream.chunk_size = chunk_size
+
+        with open(path, "rb") as temp:
+            chunks = [chunk for chunk, duration in stream._mp3_chunks(temp, song, 0)]
+
+        assert b"".join(chunks) == tag + FRAME * 50 + FRAME[:100]
+        assert chunks[0].startswith(tag)
+        split_frames(chunks[0][len(tag):])
+        for chunk in chunks[1:-1]:
+            split_frames(chunk)
+        assert chunks[-1] == FRAME[:100]
+
+
+def test_filler_is_injected_between_frames(make_playlist, make_stream):
+    sent = []
+
+    def on_send(buffer: bytes) -> None:
+        sent.append(buffer)
+        if len(sent) == 3:
+            # Stall the stream thread long enough for an underrun.
+            time.sleep(0.5)
+
+    stream = make_stream(output=NullOutput(on_send))
+    stream.chunk_size = 1000
+    stream.set_playlist(make_playlist("song", 2, frames=20, loop=False))
+    watchdog = UnderrunWatchdog(threshold=0.1, interval=0.01)
+    stream.set_watchdog(watchdog)
+
+    stream.start()
+
+    assert watchdog.underruns >= 1
+    assert watchdog.injected > 0
+    assert len(split_frames(b"".join(sent))) > 40